@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import streamlit as st
+
+from engine_registry import load_engine_registry
+from emissions_calculator import summarize_emissions
+from geo.airport_index import load_airport_index, AIRPORTS_CSV_PATH
+from instrumentation import span, read_csv
+from job_queue import JobQueue, ArtifactStore
+from pipeline import EmissionsPipeline
+from result_cache import ResultCache
+from plot_emissions import plot_bar_summary, plot_pie_summary, plot_fuel_flow_summary, plot_emissions_line_summary
+
+PROFILE_PATH = "flight-profiles/test_flight_profile.csv"
+
+# Eviction: per-input caches keep the most recent entries and expire after an hour
+MAX_ENTRIES = 64
+TTL_SECONDS = 3600
+
+# Background map rendering: worker threads shared by all sessions, and how many rendered routes are kept
+JOB_WORKERS = 2
+MAX_ARTIFACTS = 16
+
+# On-disk result cache shared by all sessions, processes and restarts (output/cache/results)
+RESULT_CACHE_BYTES = 512 * 2**20
+
+
+def input_key(engine, profile_path, route):
+    # Explicit cache key: hash of (engine, profile, route); the profile is identified by path and mtime
+    payload = json.dumps({
+        "engine": engine,
+        "profile": [profile_path, os.path.getmtime(profile_path)],
+        "route": list(route),
+    })
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+# ---Static Reference Data (cached as resources, shared across sessions)---
+
+@st.cache_resource(max_entries=1)
+def get_engine_registry():
+    with span("load_engine_registry"):
+        return load_engine_registry()
+
+@st.cache_resource(max_entries=1)
+def get_airport_index(airports_csv_path=AIRPORTS_CSV_PATH):
+    with span("load_airport_index") as sp:
+        sp.add_file(airports_csv_path)
+        return load_airport_index(airports_csv_path)
+
+@st.cache_resource(max_entries=1)
+def get_airport_labels(airports_csv_path=AIRPORTS_CSV_PATH):
+    # Airports with both codes, labelled "IATA/ICAO – Airport – City – Country" (vectorized, no row-wise apply)
+    airport_df = get_airport_index(airports_csv_path).airports
+    with span("build_airport_labels"):
+        airport_df = airport_df.dropna(subset=['lat_decimal', 'lon_decimal', 'iata_code', 'icao_code'])
+        labels = (
+            airport_df['iata_code'] + "/" + airport_df['icao_code'] + " – " + airport_df['name']
+            + " – " + airport_df['city'] + " – " + airport_df['country']
+        )
+        return labels.tolist()
+
+@st.cache_data(max_entries=8, ttl=TTL_SECONDS)
+def get_flight_profile(profile_path, mtime):
+    return read_csv(profile_path)
+
+
+# ---Per-Input Results (cached on the (engine, profile, route) key)---
+
+@st.cache_data(max_entries=MAX_ENTRIES, ttl=TTL_SECONDS)
+def get_emissions_summary(key, _engine, _profile_path):
+    profile_df = get_flight_profile(_profile_path, os.path.getmtime(_profile_path))
+    with span("summarize_emissions", engine=_engine):
+        return summarize_emissions(profile_df, _engine)
+
+@st.cache_data(max_entries=MAX_ENTRIES, ttl=TTL_SECONDS)
+def get_summary_figures(key, _engine, _profile_path):
+    summary_df = get_emissions_summary(key, _engine, _profile_path)
+    plots = {
+        "bar": plot_bar_summary,
+        "pie": plot_pie_summary,
+        "fuel_flow": plot_fuel_flow_summary,
+        "emissions_line": plot_emissions_line_summary,
+    }
+    figures = {}
+    for name, plot in plots.items():
+        with span(f"plot.{name}"):
+            figures[name] = plot(summary_df)
+    return figures
+
+
+# ---Background Map Rendering---
+
+@st.cache_resource(max_entries=1)
+def get_job_queue():
+    # One executor and artifact store for the whole server; artifacts are keyed by input_key()
+    return JobQueue(max_workers=JOB_WORKERS, store=ArtifactStore(MAX_ARTIFACTS))
+
+@st.cache_resource(max_entries=1)
+def get_result_cache():
+    return ResultCache(max_bytes=RESULT_CACHE_BYTES)
+
+def render_route_maps(job, route, engine, profile_df, map_mode="circles", cache=None):
+    # Job function: pipeline.Route -> {"summary": DataFrame, "maps": {"emissions": html, "noise": html}}.
+    # Runs on a worker thread, so it must not touch Streamlit (st.cache_* included): pass the ResultCache in.
+    pipeline = EmissionsPipeline(profile_df, engine, make_figures=False, map_mode=map_mode, cache=cache)
+    if cache is not None:
+        key = pipeline.cache_key("maps", route)
+        cached = cache.get(key)
+        if cached is not None:
+            summary = cached.pop("summary")
+            return {"summary": summary, "maps": {name[:-len("_map")]: html for name, html in cached.items()}}
+
+    result = pipeline.run(route, progress=lambda fraction, stage: job.report(0.7 * fraction, stage))
+
+    maps_html = {}
+    for i, (name, m) in enumerate(result.maps.items()):
+        job.report(0.7 + 0.3 * i / len(result.maps), f"Rendering {name} map")
+        maps_html[name] = m.get_root().render()
+
+    if cache is not None:
+        cache.put(key, {"summary": result.summary, **{f"{name}_map": html for name, html in maps_html.items()}})
+    return {"summary": result.summary, "maps": maps_html}
+
+
+def clear_app_caches():
+    get_emissions_summary.clear()
+    get_summary_figures.clear()
+    get_flight_profile.clear()
+    get_job_queue().store.clear()
+    get_result_cache().clear()
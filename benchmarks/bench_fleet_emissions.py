@@ -0,0 +1,60 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Run from anywhere: the calculator uses paths relative to the repository root
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from emissions_calculator import (
+    calc_pollutant_emissions,
+    calc_fleet_emissions,
+    load_engine_arrays,
+    load_profile_durations,
+)
+
+
+def time_legacy_loop(n_calls):
+    start = time.perf_counter()
+    for _ in range(n_calls):
+        calc_pollutant_emissions()
+    return (time.perf_counter() - start) / n_calls
+
+
+def time_batch(n_flights, n_engines, repeats=5):
+    # Synthetic schedule: the test profile with every phase duration jittered per flight
+    base_durations = load_profile_durations(["flight-profiles/test_flight_profile.csv"])
+    rng = np.random.default_rng(0)
+    durations = base_durations * rng.uniform(0.5, 1.5, size=(n_flights, base_durations.shape[1]))
+
+    fuel_flow_rates, emission_indices = load_engine_arrays(["CFM56-5B4/2P"])
+    fuel_flow_rates = np.repeat(fuel_flow_rates, n_engines, axis=0)
+    emission_indices = np.repeat(emission_indices, n_engines, axis=0)
+
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        calc_fleet_emissions(durations, fuel_flow_rates, emission_indices)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch emissions API vs. calc_pollutant_emissions() in a loop")
+    parser.add_argument("--legacy-calls", type=int, default=100)
+    parser.add_argument("--flights", type=int, nargs="+", default=[1, 100, 10_000, 50_000])
+    parser.add_argument("--engines", type=int, default=1)
+    args = parser.parse_args()
+
+    legacy_per_flight = time_legacy_loop(args.legacy_calls)
+    print(f"calc_pollutant_emissions() loop: {legacy_per_flight * 1e3:.3f} ms/flight ({args.legacy_calls} calls)")
+
+    print(f"{'flights':>10} {'engines':>8} {'batch (ms)':>12} {'loop est. (ms)':>15} {'speed-up':>10}")
+    for n_flights in args.flights:
+        batch = time_batch(n_flights, args.engines)
+        loop = legacy_per_flight * n_flights * args.engines
+        print(f"{n_flights:>10} {args.engines:>8} {batch * 1e3:>12.3f} {loop * 1e3:>15.1f} {loop / batch:>9.0f}x")
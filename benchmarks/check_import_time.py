@@ -0,0 +1,124 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+
+# Cold-start budget per entry point. Each module is imported in a fresh interpreter under `python -X importtime`;
+# its cost is the cumulative time of every top-level import the bare interpreter does not already make, and the
+# best of --repeats runs is kept. An entry point fails when it exceeds its stored budget by more than the
+# tolerance, or when it loads a module it must not (the visualization stack for batch code, see FORBIDDEN).
+#
+# Like the benchmark baseline, budgets are machine-specific: refresh benchmarks/import_budget.json with
+# --update-budget when the hardware or the dependency versions change. The script exits with 1 on any failure.
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+BUDGET_PATH = os.path.join(ROOT, "benchmarks", "import_budget.json")
+
+VISUALIZATION = ["folium", "branca", "plotly", "streamlit"]
+
+# Entry point -> packages it must not import
+FORBIDDEN = {
+    "engine_registry": VISUALIZATION + ["sklearn"],
+    "flight_profile": VISUALIZATION + ["sklearn"],
+    "emissions_calculator": VISUALIZATION + ["sklearn"],
+    "geo.route_mapper": VISUALIZATION + ["sklearn"],
+    "geo.airport_index": VISUALIZATION + ["sklearn"],
+    "geo.flight_map_plotter": VISUALIZATION + ["sklearn"],
+    "plot_emissions": VISUALIZATION + ["sklearn"],
+    "noise_footprint": VISUALIZATION + ["sklearn"],
+    "emissions_inventory": VISUALIZATION + ["sklearn"],
+    "what_if": VISUALIZATION + ["sklearn"],
+    "pipeline": VISUALIZATION + ["sklearn"],
+    "scenario_runner": VISUALIZATION + ["sklearn"],
+    "schedule_runner": VISUALIZATION + ["sklearn"],
+    "result_cache": VISUALIZATION + ["sklearn"],
+    "app_cache": ["folium", "branca", "sklearn"],     # streamlit itself loads plotly
+}
+
+
+def _importtime(code):
+    # [(depth, module, cumulative_us)] from one `python -X importtime -c code` run
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        entries.append((depth, name.strip(), int(cumulative)))
+    return entries
+
+def measure(module, repeats, startup):
+    # Best import time (ms) over repeats and every module the import loaded
+    best, loaded = None, set()
+    for _ in range(repeats):
+        entries = _importtime(f"import {module}")
+        total_us = sum(us for depth, name, us in entries if depth == 0 and name not in startup)
+        best = total_us if best is None else min(best, total_us)
+        loaded |= {name for _, name, _ in entries} - startup
+    return best / 1e3, loaded
+
+def forbidden_imports(module, loaded):
+    # Forbidden packages the import loaded (any of their submodules counts)
+    return sorted({name.split(".")[0] for name in loaded} & set(FORBIDDEN[module]))
+
+def environment():
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+    }
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check per-entry-point import time against a stored budget")
+    parser.add_argument("--modules", nargs="+", choices=sorted(FORBIDDEN), default=list(FORBIDDEN))
+    parser.add_argument("--repeats", type=int, default=5, help="Fresh interpreters per module (best is kept)")
+    parser.add_argument("--budget", default=BUDGET_PATH)
+    parser.add_argument("--update-budget", action="store_true", help="Store these timings as the new budget")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--min-slack", type=float, default=50.0, help="Milliseconds over budget always allowed")
+    args = parser.parse_args()
+
+    # Imports the bare interpreter makes on its own (site, encodings, ...) are not charged to the entry points
+    startup = {name for _, name, _ in _importtime("pass")}
+
+    budget = {}
+    if os.path.exists(args.budget):
+        with open(args.budget) as f:
+            budget = json.load(f)["modules"]
+
+    print(f"{'module':<28} {'import':>12} {'budget':>12}")
+    timings, failures = {}, []
+    for module in args.modules:
+        ms, loaded = measure(module, args.repeats, startup)
+        timings[module] = round(ms, 1)
+        limit = budget.get(module)
+        print(f"{module:<28} {ms:>9.1f} ms {'-' if limit is None else f'{limit:.1f} ms':>12}")
+
+        for name in forbidden_imports(module, loaded):
+            failures.append(f"{module} imports {name}")
+        if not args.update_budget and limit is not None and ms > max(limit * (1 + args.tolerance), limit + args.min_slack):
+            failures.append(f"{module} import time {limit:.1f} -> {ms:.1f} ms ({ms / limit:.2f}x)")
+
+    if args.update_budget:
+        _write_json(args.budget, {"environment": environment(), "modules": {**budget, **timings}})
+        print(f"Budget written to {args.budget}")
+    elif not budget:
+        print(f"No budget at {args.budget}; run with --update-budget to create one")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    sys.exit(1 if failures else 0)
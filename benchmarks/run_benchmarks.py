@@ -0,0 +1,556 @@
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+# Run from anywhere: the calculator uses paths relative to the repository root
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+from engine_registry import load_engine_registry, POLLUTANTS
+from noise_certification import load_noise_certification_index
+from emissions_calculator import (
+    calc_pollutant_emissions,
+    calc_noise_emissions,
+    calc_fleet_emissions,
+    calc_noise_attenuation,
+    calc_phase_noise,
+    calc_batch_emissions,
+    calc_batch_noise,
+    iter_emission_timeseries,
+    phase_noise_references,
+    summarize_emissions,
+)
+from geo.airport_index import AIRPORTS_CSV_PATH
+from geo.route_mapper import map_flight_path, build_flight_path, great_circle_points, sample_trajectories
+from geo.flight_map_plotter import (
+    plot_pollutant_emissions_map,
+    plot_noise_emissions_map,
+    build_pollutant_emissions_map,
+    build_noise_emissions_map,
+    build_fleet_emissions_map,
+    build_heat_points,
+)
+from flight_profile import FlightProfileBatch
+from noise_footprint import route_noise_footprint
+from emissions_inventory import EmissionsInventory
+from plot_emissions import (
+    plot_bar_summary,
+    plot_pie_summary,
+    plot_fuel_flow_summary,
+    plot_emissions_line_summary,
+    plot_multi_flight_timeseries,
+)
+
+# The map and plotting stack is imported on first use; load it here so the first case timed does not pay for it
+import folium.plugins, plotly.graph_objects, plotly.subplots, geo.map_layers  # noqa: E401,F401
+
+# Times every stage (calculator, route, plotting, maps) at several fleet sizes and writes wall time, peak traced
+# memory and output size per case to a JSON results file, then compares it with a stored baseline.
+#
+# Cases come in two kinds:
+#   loop  - the existing one-flight entry points (file-based and in-memory), called once per flight. These are
+#           only run up to --loop-cap flights; larger sizes are recorded as skipped.
+#   batch - the vectorized equivalents, run at every size.
+#
+# Flights are synthetic: the test profile with per-flight jittered durations and altitudes, engines drawn from
+# the registry and origin/destination pairs drawn from data/airports.csv.
+#
+# Each case is called once untimed (warm-up), then timed --repeats times keeping the best; --repeats defaults
+# to the baseline's, and runs with a different --repeats or --loop-cap are not compared.
+# Timings are only comparable on the same machine: refresh benchmarks/baseline.json with --update-baseline
+# when the hardware changes or cases are added. Cases without a baseline are listed
+# but not compared. Timings under --min-time (50 ms) vary by up to 2x between identical runs and are not
+# compared either. The script exits with 1 when any case regressed.
+
+PROFILE_PATH = os.path.join("flight-profiles", "test_flight_profile.csv")
+RESULTS_PATH = os.path.join("benchmarks", "results", "latest.json")
+BASELINE_PATH = os.path.join("benchmarks", "baseline.json")
+SIZES = [1, 100, 10_000, 100_000]
+ANTIMERIDIAN_ROUTE = ((35.765, 140.386), (33.942, -118.408))     # RJAA (Tokyo Narita) to KLAX (Los Angeles)
+
+# Files the file-based entry points read or write; restored after every loop case
+OUTPUT_FILES = [
+    os.path.join("output", "emissions", "summary.csv"),
+    os.path.join("output", "emissions", "emissions_summary.csv"),
+    os.path.join("output", "routes", "origin_destination_data.csv"),
+    os.path.join("output", "routes", "flight_path.csv"),
+    os.path.join("output", "routes", "flight_path_emissions_map.html"),
+    os.path.join("output", "routes", "flight_path_noise_map.html"),
+]
+
+
+# ---Synthetic Workload---
+
+class Workload:
+    # Inputs for n flights; built before timing starts, so only the stage itself is measured
+
+    def __init__(self, n_flights, seed=0):
+        rng = np.random.default_rng(seed)
+        self.n_flights = n_flights
+        self.profile_df = pd.read_csv(PROFILE_PATH)
+        self.phases = self.profile_df["Phase"].tolist()
+        n_phases = len(self.phases)
+
+        base_durations = self.profile_df["Duration (min)"].to_numpy(dtype=np.float64) * 60
+        base_altitudes = self.profile_df["Altitude (ft)"].to_numpy(dtype=np.float64)
+        self.durations_s = base_durations * rng.uniform(0.5, 1.5, (n_flights, n_phases))
+        self.altitudes_ft = base_altitudes * rng.uniform(0.8, 1.2, (n_flights, n_phases))
+
+        self.registry = load_engine_registry()
+        self.engine_ids = rng.integers(0, len(self.registry.names), n_flights)
+
+        airports = pd.read_csv(AIRPORTS_CSV_PATH)
+        origin = rng.integers(0, len(airports), n_flights)
+        destin = (origin + rng.integers(1, len(airports), n_flights)) % len(airports)
+        lat = airports["lat_decimal"].to_numpy(dtype=np.float64)
+        lon = airports["lon_decimal"].to_numpy(dtype=np.float64)
+        self.airport_codes = airports["icao_code"].to_numpy()
+        self.origin, self.destin = origin, destin
+        self.origin_lat, self.origin_lon = lat[origin], lon[origin]
+        self.destin_lat, self.destin_lon = lat[destin], lon[destin]
+
+        self.aircraft_engine_data = load_noise_certification_index().lookup("A320", "CFM56-5B4/2P")
+
+    def flight_profile(self, i):
+        profile_df = self.profile_df.copy()
+        profile_df["Duration (min)"] = self.durations_s[i] / 60
+        profile_df["Altitude (ft)"] = self.altitudes_ft[i]
+        return profile_df
+
+    def flight_inputs(self, n):
+        # Per-flight route, profile and summary (with noise) for the first n flights
+        flights = []
+        for i in range(n):
+            profile_df = self.flight_profile(i)
+            summary = summarize_emissions(profile_df)
+            summary.loc[summary["Phase"] != "Total", "Noise Emissions (EPNdB)"] = calc_phase_noise(profile_df, self.aircraft_engine_data)
+            coord_origin = (self.origin_lat[i], self.origin_lon[i])
+            coord_destin = (self.destin_lat[i], self.destin_lon[i])
+            flight_path_df, start_loc = build_flight_path(coord_origin, coord_destin, profile_df)
+            flights.append((coord_origin, coord_destin, profile_df, summary, flight_path_df, start_loc))
+        return flights
+
+    def route_dataframe(self, i):
+        return pd.DataFrame({
+            "IATA_Code": [self.airport_codes[self.origin[i]], self.airport_codes[self.destin[i]]],
+            "Latitude": [self.origin_lat[i], self.destin_lat[i]],
+            "Longitude": [self.origin_lon[i], self.destin_lon[i]],
+        })
+
+
+# ---Output Sizes---
+
+def output_size(output):
+    # Bytes of whatever a case produced
+    if output is None:
+        return 0
+    if isinstance(output, int):
+        return output
+    if isinstance(output, str):
+        return len(output.encode("utf-8"))
+    if isinstance(output, np.ndarray):
+        return output.nbytes
+    if isinstance(output, pd.DataFrame):
+        return int(output.memory_usage(deep=True).sum())
+    if isinstance(output, (list, tuple)):
+        return sum(output_size(o) for o in output)
+    if hasattr(output, "to_json"):
+        return len(output.to_json().encode("utf-8"))
+    raise TypeError(f"Cannot size benchmark output of type {type(output).__name__}")
+
+def _file_size(path):
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+# ---Cases---
+
+CASES = {}     # name -> (function(workload, inputs), loop, setup functions)
+
+def case(name, loop=False, setup=()):
+    # setup runs untimed before the case; the last one's return value is passed to the case after the workload
+    def register(fn):
+        CASES[name] = (fn, loop, setup)
+        return fn
+    return register
+
+def _write_route_files(workload):
+    # Inputs of the file-based route and map entry points: the first flight's route and flight path
+    os.makedirs(os.path.dirname(OUTPUT_FILES[2]), exist_ok=True)
+    workload.route_dataframe(0).to_csv(OUTPUT_FILES[2], index=False)
+    map_flight_path()
+
+def _write_emission_files(workload):
+    calc_pollutant_emissions()
+    shutil.copyfile(OUTPUT_FILES[0], OUTPUT_FILES[1])
+    calc_noise_emissions()
+
+def _flight_inputs(workload):
+    return workload.flight_inputs(workload.n_flights)
+
+
+# File-based entry points: one call per flight, as the app does today
+
+@case("calc_pollutant_emissions", loop=True)
+def bench_calc_pollutant_emissions(workload, flights):
+    for _ in range(workload.n_flights):
+        calc_pollutant_emissions()
+    return _file_size(OUTPUT_FILES[0]) * workload.n_flights
+
+@case("calc_noise_emissions", loop=True, setup=(_write_emission_files,))
+def bench_calc_noise_emissions(workload, flights):
+    for _ in range(workload.n_flights):
+        calc_noise_emissions()
+    return _file_size(OUTPUT_FILES[1]) * workload.n_flights
+
+@case("map_flight_path", loop=True, setup=(_write_route_files,))
+def bench_map_flight_path(workload, flights):
+    for _ in range(workload.n_flights):
+        map_flight_path()
+    return _file_size(OUTPUT_FILES[3]) * workload.n_flights
+
+@case("plot_pollutant_emissions_map", loop=True, setup=(_write_route_files, _write_emission_files))
+def bench_plot_pollutant_emissions_map(workload, flights):
+    for _ in range(workload.n_flights):
+        plot_pollutant_emissions_map((0, 0))
+    return _file_size(OUTPUT_FILES[4]) * workload.n_flights
+
+@case("plot_noise_emissions_map", loop=True, setup=(_write_route_files, _write_emission_files))
+def bench_plot_noise_emissions_map(workload, flights):
+    for _ in range(workload.n_flights):
+        plot_noise_emissions_map((0, 0))
+    return _file_size(OUTPUT_FILES[5]) * workload.n_flights
+
+
+# In-memory single-flight builders: one figure or map per flight
+
+def _bench_figures(plot, flights):
+    return [plot(summary) for *_, summary, _, _ in flights]
+
+@case("plot_bar_summary", loop=True, setup=(_flight_inputs,))
+def bench_plot_bar_summary(workload, flights):
+    return _bench_figures(plot_bar_summary, flights)
+
+@case("plot_pie_summary", loop=True, setup=(_flight_inputs,))
+def bench_plot_pie_summary(workload, flights):
+    return _bench_figures(plot_pie_summary, flights)
+
+@case("plot_fuel_flow_summary", loop=True, setup=(_flight_inputs,))
+def bench_plot_fuel_flow_summary(workload, flights):
+    return _bench_figures(plot_fuel_flow_summary, flights)
+
+@case("plot_emissions_line_summary", loop=True, setup=(_flight_inputs,))
+def bench_plot_emissions_line_summary(workload, flights):
+    return _bench_figures(plot_emissions_line_summary, flights)
+
+@case("build_pollutant_emissions_map", loop=True, setup=(_flight_inputs,))
+def bench_build_pollutant_emissions_map(workload, flights):
+    return [
+        build_pollutant_emissions_map(coord_origin, coord_destin, flight_path_df, summary, start_loc).get_root().render()
+        for coord_origin, coord_destin, _, summary, flight_path_df, start_loc in flights
+    ]
+
+@case("build_noise_emissions_map", loop=True, setup=(_flight_inputs,))
+def bench_build_noise_emissions_map(workload, flights):
+    return [
+        build_noise_emissions_map(coord_destin, flight_path_df, summary, start_loc).get_root().render()
+        for _, coord_destin, _, summary, flight_path_df, start_loc in flights
+    ]
+
+@case("route_noise_footprint", loop=True, setup=(_flight_inputs,))
+def bench_route_noise_footprint(workload, flights):
+    # Plus one route across the antimeridian, whose grid must span the Pacific rather than the rest of the globe
+    routes = [(coord_origin, coord_destin, profile_df) for coord_origin, coord_destin, profile_df, *_ in flights]
+    routes.append((*ANTIMERIDIAN_ROUTE, workload.profile_df))
+    return [
+        route_noise_footprint(coord_origin, coord_destin, profile_df, workload.aircraft_engine_data,
+                              n_lat=100, n_lon=100, step_km=20.0)[2]
+        for coord_origin, coord_destin, profile_df in routes
+    ]
+
+
+# Batch equivalents: every flight in one call
+
+@case("calc_fleet_emissions")
+def bench_calc_fleet_emissions(workload, flights):
+    fuel_burned, emissions = calc_fleet_emissions(
+        workload.durations_s, workload.registry.fuel_flow, workload.registry.emission_indices, workload.engine_ids,
+    )
+    return [fuel_burned, emissions]
+
+@case("calc_noise_attenuation")
+def bench_calc_noise_attenuation(workload, flights):
+    ref_levels, ref_dists = phase_noise_references(workload.phases, workload.aircraft_engine_data)
+    return calc_noise_attenuation(ref_levels, workload.altitudes_ft, ref_dists)
+
+@case("great_circle_flight_paths")
+def bench_great_circle_flight_paths(workload, flights):
+    # Phase midpoints of every flight, as build_flight_path() places them
+    speeds = workload.profile_df["Speed (kts)"].to_numpy(dtype=np.float64)
+    distances = speeds * workload.durations_s
+    cumulative = np.cumsum(distances, axis=1) / distances.sum(axis=1, keepdims=True)
+    midpoints = cumulative - distances / distances.sum(axis=1, keepdims=True) / 2
+    lat, lon = great_circle_points(
+        workload.origin_lat[:, None], workload.origin_lon[:, None],
+        workload.destin_lat[:, None], workload.destin_lon[:, None], midpoints,
+    )
+    return [lat, lon]
+
+@case("sample_trajectories")
+def bench_sample_trajectories(workload, flights):
+    return sample_trajectories(
+        workload.origin_lat, workload.origin_lon, workload.destin_lat, workload.destin_lon,
+        workload.profile_df, step_km=100.0,
+    )
+
+@case("plot_multi_flight_timeseries")
+def bench_plot_multi_flight_timeseries(workload, flights):
+    engine_ids = workload.engine_ids
+    timeseries_df = pd.concat(
+        pd.DataFrame(chunk) for chunk in iter_emission_timeseries(
+            workload.durations_s, workload.registry.fuel_flow[engine_ids],
+            workload.registry.emission_indices[engine_ids], step_s=300.0,
+        )
+    )
+    return plot_multi_flight_timeseries(timeseries_df, "Cumulative Fuel (kg)")
+
+@case("build_fleet_emissions_map")
+def bench_build_fleet_emissions_map(workload, flights):
+    lat, lon = bench_great_circle_flight_paths(workload, flights)
+    fuel_burned, emissions = bench_calc_fleet_emissions(workload, flights)
+    m = build_fleet_emissions_map(
+        lat.ravel(), lon.ravel(), {p: emissions[..., k].ravel() for k, p in enumerate(POLLUTANTS)},
+        (0, 0), flight=np.repeat(np.arange(workload.n_flights), len(workload.phases)),
+    )
+    return m.get_root().render()
+
+@case("build_fleet_noise_heat_points")
+def bench_build_fleet_noise_heat_points(workload, flights):
+    lat, lon = bench_great_circle_flight_paths(workload, flights)
+    noise = np.clip(bench_calc_noise_attenuation(workload, flights) / 70, 0, 1)
+    lat2 = np.column_stack([lat[:, 1:], workload.destin_lat])
+    lon2 = np.column_stack([lon[:, 1:], workload.destin_lon])
+    return np.asarray(build_heat_points(lat.ravel(), lon.ravel(), lat2.ravel(), lon2.ravel(), noise.ravel(), zoom=8))
+
+@case("flight_profile_batch")
+def bench_flight_profile_batch(workload, flights):
+    batch = FlightProfileBatch.repeat(workload.profile_df, workload.n_flights)
+    batch.data["duration_min"] = workload.durations_s.ravel() / 60
+    batch.data["altitude_ft"] = workload.altitudes_ft.ravel()
+    fuel_burned, emissions = calc_batch_emissions(batch, workload.engine_ids, workload.registry)
+    noise = calc_batch_noise(batch, workload.aircraft_engine_data)
+    return [batch.per_flight(fuel_burned), batch.per_flight(emissions), noise]
+
+@case("emissions_inventory")
+def bench_emissions_inventory(workload, flights):
+    _, emissions = bench_calc_fleet_emissions(workload, flights)
+    inventory = EmissionsInventory()
+    inventory.add_flights(
+        workload.origin_lat, workload.origin_lon, workload.destin_lat, workload.destin_lon,
+        workload.profile_df, emissions, step_km=100.0,
+    )
+    return [inventory.cells, inventory.mass]
+
+
+# ---Runner---
+
+@contextmanager
+def preserved_files(paths):
+    # Puts back (or removes) files the file-based entry points overwrite
+    backup_dir = tempfile.mkdtemp()
+    existing = [p for p in paths if os.path.exists(p)]
+    for i, path in enumerate(existing):
+        shutil.copy2(path, os.path.join(backup_dir, str(i)))
+    try:
+        yield
+    finally:
+        for path in paths:
+            if path not in existing and os.path.exists(path):
+                os.remove(path)
+        for i, path in enumerate(existing):
+            shutil.copy2(os.path.join(backup_dir, str(i)), path)
+        shutil.rmtree(backup_dir)
+
+def run_case(name, workload, repeats, measure_memory):
+    fn, loop, setup = CASES[name]
+    with preserved_files(OUTPUT_FILES):
+        flights = None
+        for prepare in setup:
+            flights = prepare(workload)
+
+        # Untimed first call: imports, plotly/folium template set-up and other one-off costs
+        fn(workload, flights)
+
+        # Memory straight after the warm-up, so the peak does not depend on --repeats (some library caches
+        # grow every few calls)
+        peak_bytes = None
+        if measure_memory:
+            gc.collect()
+            tracemalloc.start()
+            try:
+                fn(workload, flights)
+                peak_bytes = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+
+        wall_s = float("inf")
+        for _ in range(repeats):
+            gc.collect()    # Garbage left by earlier calls or cases is not this call's cost
+            start = time.perf_counter()
+            output = fn(workload, flights)
+            wall_s = min(wall_s, time.perf_counter() - start)
+        size = output_size(output)
+        del output
+
+    return {"wall_s": wall_s, "peak_bytes": peak_bytes, "output_bytes": size}
+
+def run_suite(sizes, case_names, loop_cap, repeats, measure_memory):
+    results = []
+    for n_flights in sizes:
+        workload = Workload(n_flights)
+        for name in case_names:
+            record = {"case": name, "flights": n_flights, "kind": "loop" if CASES[name][1] else "batch"}
+            if CASES[name][1] and n_flights > loop_cap:
+                record.update(status="skipped", reason=f"one call per flight; capped at {loop_cap} flights")
+            else:
+                record.update(status="ok", **run_case(name, workload, repeats, measure_memory))
+            results.append(record)
+            _print_record(record)
+    return results
+
+def _print_record(record):
+    if record["status"] != "ok":
+        print(f"{record['case']:<32} {record['flights']:>8}  skipped ({record['reason']})")
+        return
+    peak = "-" if record["peak_bytes"] is None else f"{record['peak_bytes'] / 1e6:10.2f}"
+    print(f"{record['case']:<32} {record['flights']:>8} {record['wall_s'] * 1e3:>12.2f} ms {peak:>10} MB "
+          f"{record['output_bytes'] / 1e3:>12.1f} kB out")
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def environment():
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
+
+
+# ---Baseline Comparison---
+
+def compare(results, baseline, time_tolerance, memory_tolerance, size_tolerance, min_time_s):
+    # -> (regressions, unmatched). Regressions: cases that got slower, used more memory or produced more output
+    # than the baseline allows; timings under min_time_s are too noisy to compare. Unmatched: (case, flights) that
+    # ran but have no baseline to compare with, e.g. cases added since the baseline was recorded.
+    previous = {(r["case"], r["flights"]): r for r in baseline["results"] if r["status"] == "ok"}
+    regressions, unmatched = [], []
+    for record in results:
+        if record["status"] != "ok":
+            continue
+        before = previous.get((record["case"], record["flights"]))
+        if before is None:
+            unmatched.append({"case": record["case"], "flights": record["flights"]})
+            continue
+
+        checks = [("wall_s", time_tolerance), ("output_bytes", size_tolerance)]
+        if record["peak_bytes"] is not None and before.get("peak_bytes") is not None:
+            checks.append(("peak_bytes", memory_tolerance))
+
+        for metric, tolerance in checks:
+            if metric == "wall_s" and max(record[metric], before[metric]) < min_time_s:
+                continue
+            if record[metric] > before[metric] * (1 + tolerance):
+                regressions.append({
+                    "case": record["case"], "flights": record["flights"], "metric": metric,
+                    "baseline": before[metric], "current": record[metric],
+                    "ratio": record[metric] / before[metric] if before[metric] else float("inf"),
+                })
+    return regressions, unmatched
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the calculator, route, plotting and map stages")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="Fleet sizes (flights)")
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES))
+    parser.add_argument("--loop-cap", type=int, default=100, help="Largest fleet run through the one-flight entry points")
+    parser.add_argument("--repeats", type=int, default=None,
+                        help="Timed runs per case (best is kept); defaults to the baseline's, else 3")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc run (peak memory)")
+    parser.add_argument("--output", default=RESULTS_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--time-tolerance", type=float, default=0.25)
+    parser.add_argument("--memory-tolerance", type=float, default=0.25)
+    parser.add_argument("--size-tolerance", type=float, default=0.05)
+    parser.add_argument("--min-time", type=float, default=0.05, help="Seconds below which timings are not compared")
+    args = parser.parse_args()
+
+    baseline = None
+    if not args.update_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    if args.repeats is None:
+        args.repeats = baseline["config"]["repeats"] if baseline is not None else 3
+
+    print(f"{'case':<32} {'flights':>8} {'wall':>15} {'peak':>13} {'output':>17}")
+    results = {
+        "environment": environment(),
+        "config": {"sizes": args.sizes, "loop_cap": args.loop_cap, "repeats": args.repeats},
+        "results": run_suite(args.sizes, args.cases, args.loop_cap, args.repeats, not args.no_memory),
+    }
+
+    if args.update_baseline:
+        _write_json(args.baseline, results)
+        print(f"Baseline written to {args.baseline}")
+        sys.exit(0)
+
+    regressions, unmatched = [], []
+    baseline_config = None if baseline is None else {k: baseline["config"][k] for k in ("repeats", "loop_cap")}
+    run_config = {"repeats": args.repeats, "loop_cap": args.loop_cap}
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --update-baseline to create one")
+    elif run_config != baseline_config:
+        # Best of fewer runs is systematically slower, so the comparison would only report noise
+        print(f"Not compared: run config {run_config} differs from the baseline's {baseline_config}")
+    else:
+        regressions, unmatched = compare(
+            results["results"], baseline, args.time_tolerance, args.memory_tolerance, args.size_tolerance, args.min_time,
+        )
+
+    results["regressions"] = regressions
+    results["unmatched"] = unmatched
+    _write_json(args.output, results)
+    print(f"Results written to {args.output}")
+
+    for r in unmatched:
+        print(f"NO BASELINE {r['case']} @ {r['flights']} flights: not compared; refresh with --update-baseline")
+    for r in regressions:
+        print(f"REGRESSION {r['case']} @ {r['flights']} flights: {r['metric']} {r['baseline']:.6g} -> {r['current']:.6g} ({r['ratio']:.2f}x)")
+    sys.exit(1 if regressions else 0)
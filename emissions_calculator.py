@@ -1,48 +1,172 @@
 import pandas as pd 
 import numpy as np
-import json
 import os
+from engine_registry import load_engine_registry, POLLUTANTS
+from noise_certification import load_noise_certification_index
+from flight_profile import as_flight_profile
+from instrumentation import span, read_csv, to_csv
 
-def calc_pollutant_emissions(): 
-    # ---Reading Data Files---
-    test_flight_profile = pd.read_csv("flight-profiles/test_flight_profile.csv")
-    with open ("data/engines-data.json") as f:
-        data = json.load(f)
+# ---Batch (Fleet-Scale) Emissions---
+# Engine phases are paired positionally with profile phases, exactly like calc_pollutant_emissions()
+
+def load_engine_arrays(engine_names, registry=None):
+    # (M, P) fuel flow rates (kg/s) and (M, P, 3) emission indices (g/kg fuel) from the compiled engine registry
+    if registry is None:
+        registry = load_engine_registry()
+    engine_ids = registry.engine_ids(engine_names)
+    return registry.fuel_flow[engine_ids], registry.emission_indices[engine_ids]
+
+def load_thrust_arrays(engine_names, thrust_pct, registry=None):
+    # Like load_engine_arrays(), but interpolated at the given (P,) thrust settings (% of rated thrust) instead of
+    # taken from the certification phase at the same position: (M, P) kg/s and (M, P, 3) g/kg
+    if registry is None:
+        registry = load_engine_registry()
+    engine_ids = registry.engine_ids(engine_names)
+    return registry.thrust_performance(engine_ids[:, None], np.asarray(thrust_pct, dtype=np.float64)[None, :])
+
+def load_profile_durations(profiles):
+    # Accepts FlightProfiles, DataFrames or file paths; all profiles must have the same number of phases
+    return np.stack([as_flight_profile(profile).durations_s for profile in profiles])     # (N, P) durations (seconds)
+
+def calc_fleet_emissions(profile_durations_s, fuel_flow_rates, emission_indices, engine_ids=None):
+    # profile_durations_s: (N, P) seconds, fuel_flow_rates: (M, P) kg/s, emission_indices: (M, P, 3) g/kg
+    # Without engine_ids every flight is evaluated with every engine -> fuel (N, M, P), emissions (N, M, P, 3)
+    # With engine_ids (N,) each flight uses its own engine -> fuel (N, P), emissions (N, P, 3)
+    durations = np.asarray(profile_durations_s, dtype=np.float64)
+    fuel_flow_rates = np.asarray(fuel_flow_rates, dtype=np.float64)
+    emission_indices = np.asarray(emission_indices, dtype=np.float64)
+
+    if durations.shape[-1] != fuel_flow_rates.shape[-1]:
+        raise ValueError(
+            f"Profiles have {durations.shape[-1]} phases but engines have {fuel_flow_rates.shape[-1]}"
+        )
+
+    if engine_ids is None:
+        fuel_burned = durations[:, None, :] * fuel_flow_rates[None, :, :]        # Fuel burned (kg)
+        emissions = fuel_burned[..., None] * emission_indices[None, :, :, :]   # HC/CO/NOx emissions (g)
+    else:
+        engine_ids = np.asarray(engine_ids, dtype=np.intp)
+        fuel_burned = durations * fuel_flow_rates[engine_ids]
+        emissions = fuel_burned[..., None] * emission_indices[engine_ids]
+
+    return fuel_burned, emissions
+
+def calc_thrust_emissions(durations_s, thrust_pct, engine_ids, registry=None):
+    # Fuel (kg) and emissions (g) with fuel flow and EIs interpolated from the thrust setting of every phase or
+    # trajectory point (see EngineRegistry.thrust_performance). durations_s and thrust_pct: (N, P) or anything
+    # broadcastable against engine_ids[:, None] -> fuel (N, P), emissions (N, P, 3)
+    if registry is None:
+        registry = load_engine_registry()
+    engine_ids = np.asarray(engine_ids, dtype=np.intp)
+    fuel_flow, emission_indices = registry.thrust_performance(engine_ids[:, None], thrust_pct)
+
+    fuel_burned = np.asarray(durations_s, dtype=np.float64) * fuel_flow
+    emissions = fuel_burned[..., None] * emission_indices
+    return fuel_burned, emissions
+
+# ---Ragged Profile Batches---
+# Flights with any number of phases (flight_profile.FlightProfileBatch): results are flat per phase row, flight i
+# owning rows batch.offsets[i]:batch.offsets[i + 1]; batch.per_flight() sums them per flight.
+
+def calc_batch_emissions(batch, engine_ids, registry=None, thrust_model=False):
+    # engine_ids: (N,) registry positions -> fuel (T,) kg, emissions (T, 3) g.
+    # Phases are paired positionally with the engine's certification phases, unless thrust_model=True takes fuel
+    # flow and EIs at each phase's thrust setting.
+    if registry is None:
+        registry = load_engine_registry()
+    engines = np.asarray(engine_ids, dtype=np.intp)[batch.flight_index]
+
+    if thrust_model:
+        fuel_flow, emission_indices = registry.thrust_performance(engines, batch.thrust_pct)
+    else:
+        position = batch.phase_position
+        if len(position) and position.max() >= registry.fuel_flow.shape[1]:
+            raise ValueError(
+                f"Profiles have up to {position.max() + 1} phases but engines have {registry.fuel_flow.shape[1]}"
+            )
+        fuel_flow = registry.fuel_flow[engines, position]
+        emission_indices = registry.emission_indices[engines, position]
+
+    fuel_burned = batch.durations_s * fuel_flow
+    return fuel_burned, fuel_burned[:, None] * emission_indices
+
+def calc_batch_noise(batch, aircraft_engine_data):
+    # Ground noise (EPNdB) under every phase row; references are looked up once per distinct phase name
+    levels, ref_dists = phase_noise_references(batch.phase_names, aircraft_engine_data)
+    return calc_noise_attenuation(levels[batch.phase_codes], batch.altitudes_ft, ref_dists[batch.phase_codes])
+
+# ---Time-Resolved Emissions---
+
+TIMESERIES_FIELDS = ["Flight", "Time (s)", "Phase", "Fuel Flow (kg/s)", "Cumulative Fuel (kg)"] + [f"{p} Rate (g/s)" for p in POLLUTANTS]
+
+def iter_emission_timeseries(profile_durations_s, fuel_flow_rates, emission_indices, step_s=1.0, chunk_size=65536):
+    # Streams a time series sampled every step_s seconds for N flights, one chunk of chunk_size samples at a time
+    # (only the last chunk can be shorter). Flights are concatenated in order; each starts at t = 0.
+    # Inputs are per flight: durations (N, P) s, fuel flow (N, P) kg/s, emission indices (N, P, 3) g/kg,
+    # e.g. the registry rows picked with engine_ids. Each chunk is a dict of 1-D arrays keyed by TIMESERIES_FIELDS,
+    # computed in closed form from the phase tables, so memory does not grow with flight length or count.
+    durations = np.atleast_2d(np.asarray(profile_durations_s, dtype=np.float64))
+    fuel_flow_rates = np.atleast_2d(np.asarray(fuel_flow_rates, dtype=np.float64))
+    emission_indices = np.asarray(emission_indices, dtype=np.float64).reshape(durations.shape + (len(POLLUTANTS),))
+    n_phases = durations.shape[1]
+
+    phase_end_s = np.cumsum(durations, axis=1)
+    phase_start_s = phase_end_s - durations
+    phase_fuel = fuel_flow_rates * durations
+    phase_start_fuel = np.cumsum(phase_fuel, axis=1) - phase_fuel
+    emission_rates = fuel_flow_rates[..., None] * emission_indices                  # (N, P, 3) g/s
+
+    # Samples at 0, step_s, 2 * step_s, ... up to the end of each flight
+    n_samples = np.floor(phase_end_s[:, -1] / step_s).astype(np.int64) + 1
+    offsets = np.concatenate([[0], np.cumsum(n_samples)])
 
-    # ---Extract the phase-wise emission for the CFM56-5B4/2P engine from the JSON datafile---
-    phases = data["CFM56-5B4/2P"]["Phases"]
+    for start in range(0, offsets[-1], chunk_size):
+        sample = np.arange(start, min(start + chunk_size, offsets[-1]))
+        flight = np.searchsorted(offsets, sample, side="right") - 1
+        time_s = (sample - offsets[flight]) * float(step_s)
 
-    # ---Importing Variables from Data---
-    phase_data = []
-    for phase_name, details in phases.items():
-        ei  = details["Emission Indices (g/kg fuel)"]
-        phase_data.append({
-            "Phase": phase_name,
-            "Fuel Flow (kg/s)": details["Fuel Flow (kg/s)"],
-            "HC (g/kg)": ei["HC"],
-            "CO (g/kg)": ei["CO"],
-            "NOx (g/kg)": ei["NOx"]
-        })
+        phase = np.minimum((time_s[:, None] >= phase_end_s[flight]).sum(axis=1), n_phases - 1)
+        fuel_flow = fuel_flow_rates[flight, phase]
 
-    phases_df = pd.DataFrame(phase_data)     # Dataframe containing data for all phases
+        chunk = {
+            "Flight": flight,
+            "Time (s)": time_s,
+            "Phase": phase,
+            "Fuel Flow (kg/s)": fuel_flow,
+            "Cumulative Fuel (kg)": phase_start_fuel[flight, phase] + fuel_flow * (time_s - phase_start_s[flight, phase]),
+        }
+        rates = emission_rates[flight, phase]
+        for k, p in enumerate(POLLUTANTS):
+            chunk[f"{p} Rate (g/s)"] = rates[:, k]
+        yield chunk
 
-    fuel_flow_rates = phases_df["Fuel Flow (kg/s)"] # Extract the fuel flow rates for All Phases (in kg per second)
-    ei_HC = phases_df["HC (g/kg)"]                  # Extract the Emission Index for Hydrocarbons for All Phases (g/kg of fuel)
-    ei_CO = phases_df["CO (g/kg)"]                  # Extract the Emission Index for Carbon Monoxide for All Phases (g/kg of fuel)
-    ei_NOx = phases_df["NOx (g/kg)"]                # Extract the Emission Index for Nitrogen Oxides for All Phases (g/kg of fuel)
+def summarize_emissions(test_flight_profile, engine_name="CFM56-5B4/2P", thrust_model=False):
+    # Phase-wise emissions summary (plus a "Total" row) for one profile (FlightProfile, DataFrame or path), at full precision.
+    # thrust_model=True takes fuel flow and EIs at each row's "Thrust (%)" instead of pairing rows with the
+    # certification phases by position.
 
-    phases = test_flight_profile["Phase"] # Extract Phase data from CSV datafile
-    profile_duration_min = test_flight_profile['Duration (min)'] # Duration for All Phases (minutes)
+    profile = as_flight_profile(test_flight_profile)
+
+    # ---Extract the phase-wise fuel flow and emission indices for the engine from the engine registry---
+    if thrust_model:
+        fuel_flow_rates, emission_indices = load_thrust_arrays([engine_name], profile.thrust_pct)
+    else:
+        fuel_flow_rates, emission_indices = load_engine_arrays([engine_name])
+
+    phases = list(profile.phases)
+    profile_duration_seconds = profile.durations_s[None, :] # Duration for All Phases (seconds)
 
 
     # ---Calculations--- 
-    profile_duration_seconds = profile_duration_min * 60  # Duration for All Phases (seconds)
+    fuel_burned, emissions = calc_fleet_emissions(profile_duration_seconds, fuel_flow_rates, emission_indices)
 
-    fuel_burned = fuel_flow_rates * profile_duration_seconds # Fuel burned for All Phases (kg)
+    profile_duration_seconds = profile_duration_seconds[0]
+    fuel_flow_rates = fuel_flow_rates[0]
+    fuel_burned = fuel_burned[0, 0]         # Fuel burned for All Phases (kg)
 
-    hc_emissions = ei_HC * fuel_burned      # HC emissions in Fuel Burned
-    co_emissions = ei_CO * fuel_burned      # CO emissions in Fuel Burned
-    nox_emissions = ei_NOx * fuel_burned    # NOx emissions in Fuel Burned
+    hc_emissions = emissions[0, 0, :, 0]    # HC emissions in Fuel Burned
+    co_emissions = emissions[0, 0, :, 1]    # CO emissions in Fuel Burned
+    nox_emissions = emissions[0, 0, :, 2]   # NOx emissions in Fuel Burned
 
     total_duration = profile_duration_seconds.sum()     # Total Duration of Flight
     total_fuel_burned = fuel_burned.sum()               # Total Fuel Burned
@@ -58,7 +182,6 @@ def calc_pollutant_emissions():
         "HC Emissions (g)":total_hc_emissions,
         "NOx Emissions (g)":total_nox_emissions,
         "CO Emissions (g)":total_co_emissions,
-        "Noise Emissions (EPNdB)":total_co_emissions,
     }])
 
     # ---Create Phase-wise Emissions Summary DataFrame---
@@ -70,11 +193,20 @@ def calc_pollutant_emissions():
         "HC Emissions (g)":hc_emissions,
         "NOx Emissions (g)":nox_emissions,
         "CO Emissions (g)":co_emissions,
-        "Noise Emissions (EMNdB)":co_emissions
+        "Noise Emissions (EPNdB)":np.nan      # Filled in per phase by the noise calculation
     })
 
     phases_summary_df = pd.concat([phases_summary_df, total_data], ignore_index=True) # Adding the total data column calculated to the main dataframe
 
+    return phases_summary_df
+
+def calc_pollutant_emissions(): 
+    # ---Reading Data Files---
+    test_flight_profile = read_csv("flight-profiles/test_flight_profile.csv")
+
+    with span("summarize_emissions"):
+        phases_summary_df = summarize_emissions(test_flight_profile, "CFM56-5B4/2P")
+
     phases_summary_df = phases_summary_df.round(3) # Rounding off the calculated data to 3 decimal places
 
 
@@ -82,53 +214,64 @@ def calc_pollutant_emissions():
     output_dir = "output/emissions"
     output_file = os.path.join(output_dir, "summary.csv")
 
-    phases_summary_df.to_csv(output_file, index=False)
     os.makedirs(output_dir, exist_ok=True)
+    to_csv(phases_summary_df, output_file, index=False)
+
+# ---Noise Attenuation---
+
+FT_TO_M = 0.3048
+
+# Reference level (fixed EPNdB value or certification sheet column) and reference distance (m) per profile phase
+PHASE_NOISE_REFERENCES = {
+    "Idle/Taxi": (70, 100),
+    "Take-Off": ("Lateral/Full Power(EPNdB)", 2000),
+    "Climb Out": ("FO(EPNdB)", 6500),
+    "Cruise": (50, 10000),
+    "Descent": ("Approach(EPNdB)", 2000),
+}
 
-def calc_noise_emissions():
+def phase_noise_references(phases, aircraft_engine_data):
+    # Reference levels (EPNdB) and distances (m) for a sequence of profile phases
+    phase_noise, ref_dists = [], []
+    for phase in phases:
+        level, ref_dist = PHASE_NOISE_REFERENCES[phase]
+        phase_noise.append(aircraft_engine_data[level] if isinstance(level, str) else level)
+        ref_dists.append(ref_dist)
+    return np.array(phase_noise, dtype=np.float64), np.array(ref_dists, dtype=np.float64)
+
+def calc_noise_attenuation(ref_levels, alt_ft, ref_dists):
+    # Spherical spreading from the reference distance: L = L_ref - 20 * log10(alt / ref_dist)
+    # Broadcasts over any shape: (P,) phases, (T,) trajectory points, (N, P) flights x phases, ...
+    # At zero altitude the ratio is taken as 1, so the ground level equals the reference level
+    alt_m = np.asarray(alt_ft, dtype=np.float64) * FT_TO_M
+    ref_dists = np.asarray(ref_dists, dtype=np.float64)
+
+    shape = np.broadcast_shapes(alt_m.shape, ref_dists.shape)
+    ratio = np.divide(alt_m, ref_dists, out=np.ones(shape), where=alt_m > 0)
+
+    return np.asarray(ref_levels, dtype=np.float64) - 20 * np.log10(ratio)
+
+def calc_phase_noise(test_flight_profile, aircraft_engine_data):
+    # Ground noise (EPNdB) under each phase of the profile
+    profile = as_flight_profile(test_flight_profile)
+
+    phase_noise, ref_dists = phase_noise_references(profile.phases, aircraft_engine_data)
+
+    return np.round(calc_noise_attenuation(phase_noise, profile.altitudes_ft, ref_dists), 2)
+
+def calc_noise_emissions(aircraft="A320", engine="CFM56-5B4/2P"):
     # ---Reading Data Files---
-    test_flight_profile = pd.read_csv("flight-profiles/test_flight_profile.csv")
-    aircraft_engine_combinations = pd.read_csv("data/aircraft_engine_combinations.csv", sep=';')
-    emissions_df = pd.read_csv("output/emissions/emissions_summary.csv")
-
-    # ---Extracting Data---
-    phases = test_flight_profile["Phase"]
-    alt_ft = test_flight_profile["Altitude (ft)"]
-
-    # Example: filter and sort for A320-214 + CFM56-5B4/2P
-    aircraft_engine_combinations = aircraft_engine_combinations[~aircraft_engine_combinations["Engine"].str.contains(",", na=False)]
-
-    df_filtered = aircraft_engine_combinations[
-        (aircraft_engine_combinations['TYPE'].str.contains("A320")) & 
-        (aircraft_engine_combinations['Engine'].str.contains("CFM56-5B4/2P"))
-    ]
-
-    # Sort by certification date or margin
-    df_filtered_sorted = df_filtered.sort_values("Certif Date", ascending=False)
-
-    aircraft_engine_data = df_filtered_sorted.iloc[0]
-
-    nEngines = aircraft_engine_data["Number of engines"]
-    phase_noise = [
-        70,
-        aircraft_engine_data["Lateral/Full Power(EPNdB)"],
-        aircraft_engine_data["FO(EPNdB)"],
-        50,
-        aircraft_engine_data["Approach(EPNdB)"]
-        ]
-    
-    ground_noise = []
-    ref_dists = [100, 2000, 6500, 10000, 2000]
-
-    for i in range(len(phases)):
-        alt_m = alt_ft[i] * 0.3048
-        ref = ref_dists[i]
-        noise_db = phase_noise[i] if alt_m == 0 else phase_noise[i] - 20 * np.log10(alt_m / ref)
-        ground_noise.append(round(noise_db, 2))
+    test_flight_profile = read_csv("flight-profiles/test_flight_profile.csv")
+    emissions_df = read_csv("output/emissions/emissions_summary.csv")
+
+    # Latest certification for the aircraft/engine combination, from the prebuilt index
+    aircraft_engine_data = load_noise_certification_index().lookup(aircraft, engine)
+
+    with span("calc_phase_noise"):
+        ground_noise = calc_phase_noise(test_flight_profile, aircraft_engine_data)
 
 
     emissions_df_no_total = emissions_df[emissions_df["Phase"] != "Total"].copy()
     emissions_df_no_total["Noise Emissions (EPNdB)"] = ground_noise
     emissions_df_final = pd.concat([emissions_df_no_total, emissions_df[emissions_df["Phase"] == "Total"]], ignore_index=True)
-    emissions_df_final.to_csv("output/emissions/emissions_summary.csv", index=False)
-
+    to_csv(emissions_df_final, "output/emissions/emissions_summary.csv", index=False)
@@ -0,0 +1,169 @@
+import numpy as np
+import pandas as pd
+
+from engine_registry import POLLUTANTS
+from flight_profile import as_flight_profile
+from geo.route_mapper import _trajectory_arrays, great_circle_points
+from instrumentation import span
+
+# Gridded emissions inventory: HC/CO/NOx mass (g) accumulated from many flights into global lat/lon/altitude cells.
+#
+#     inventory = EmissionsInventory()
+#     for chunk in schedule:                      # e.g. a year of operations, a few thousand flights at a time
+#         _, emissions = calc_fleet_emissions(durations_s, fuel_flow, emission_indices, engine_ids)
+#         inventory.add_flights(origin_lat, origin_lon, dest_lat, dest_lon, profile_df, emissions)
+#     inventory.save("output/emissions/inventory.npz")
+#
+# Most cells of a global 3D grid never see a flight, so only occupied cells are stored: sorted flat cell indices
+# with one row of masses each. Every batch is reduced to its own occupied cells with a bincount scatter-add;
+# batches are merged into the store once enough of them are pending, so memory follows occupied cells, not flights.
+
+DEFAULT_ALT_EDGES_FT = [0, 1000, 3000, 10000, 20000, 30000, 40000]   # Lower layer edges; the top layer is open
+
+
+class EmissionsInventory:
+
+    def __init__(self, lat_step=0.5, lon_step=0.5, alt_edges_ft=DEFAULT_ALT_EDGES_FT, compact_every=2_000_000):
+        self.lat_step = float(lat_step)
+        self.lon_step = float(lon_step)
+        self.alt_edges_ft = np.asarray(alt_edges_ft, dtype=np.float64)
+        self.shape = (int(np.ceil(180 / self.lat_step)), int(np.ceil(360 / self.lon_step)), len(self.alt_edges_ft))
+        self.compact_every = compact_every   # Pending (cell, mass) rows that trigger a merge into the store
+        self.n_flights = 0
+
+        self._cells = np.empty(0, dtype=np.int64)              # Sorted flat indices of occupied cells
+        self._mass = np.empty((0, len(POLLUTANTS)))            # (cells, 3) g
+        self._pending = []
+        self._pending_rows = 0
+
+    def cell_index(self, lat, lon, alt_ft):
+        # Flat cell index of every point (longitudes wrap, altitudes above the top edge land in the top layer)
+        n_lat, n_lon, n_alt = self.shape
+        i = np.clip(((np.asarray(lat, dtype=np.float64) + 90) // self.lat_step).astype(np.int64), 0, n_lat - 1)
+        j = ((np.asarray(lon, dtype=np.float64) + 180) // self.lon_step).astype(np.int64) % n_lon
+        k = np.clip(np.searchsorted(self.alt_edges_ft, alt_ft, side="right") - 1, 0, n_alt - 1)
+        return (i * n_lon + j) * n_alt + k
+
+    def add_points(self, lat, lon, alt_ft, mass_g):
+        # Scatter-adds (n, 3) masses at (n,) positions
+        cells, inverse = np.unique(self.cell_index(lat, lon, alt_ft), return_inverse=True)
+        mass_g = np.asarray(mass_g, dtype=np.float64)
+        sums = np.column_stack([np.bincount(inverse, weights=mass_g[:, k], minlength=len(cells)) for k in range(mass_g.shape[1])])
+
+        self._pending.append((cells, sums))
+        self._pending_rows += len(cells)
+        if self._pending_rows >= self.compact_every:
+            self.compact()
+
+    def add_flights(self, origin_lat, origin_lon, dest_lat, dest_lon, profile_df, emissions_g, step_km=10.0, chunk_size=5000):
+        # emissions_g: (N, P, 3) per-flight, per-phase masses, e.g. from calc_fleet_emissions(); flights are flown
+        # along sample_trajectories() and each phase's mass is spread evenly over its points. Phases too short to
+        # get a point (taxi, or shorter than step_km) put all of it at their along-track midpoint.
+        # Flights are sampled chunk_size at a time, so memory is bounded by the chunk's trajectory points.
+        emissions_g = np.asarray(emissions_g, dtype=np.float64)
+        origin_lat, origin_lon, dest_lat, dest_lon = np.broadcast_arrays(
+            *(np.atleast_1d(np.asarray(a, dtype=np.float64)) for a in (origin_lat, origin_lon, dest_lat, dest_lon))
+        )
+
+        profile = as_flight_profile(profile_df)
+        phase_distances = profile.speeds_kts * profile.durations_s
+        cumulative = np.concatenate([[0], np.cumsum(phase_distances)]) / phase_distances.sum()
+        altitudes_ft = profile.altitudes_ft
+
+        with span("inventory.add_flights", flights=len(emissions_g)):
+            for start in range(0, len(emissions_g), chunk_size):
+                chunk = slice(start, start + chunk_size)
+                lat1, lon1, lat2, lon2 = origin_lat[chunk], origin_lon[chunk], dest_lat[chunk], dest_lon[chunk]
+                flat_emissions = emissions_g[chunk].reshape(-1, emissions_g.shape[-1])
+                n_phases = emissions_g.shape[1]
+
+                # The same points as sample_trajectories(), kept as arrays with phases by position
+                points = _trajectory_arrays(lat1, lon1, lat2, lon2, profile, step_km)
+
+                # Flight-phase of every point and how many points share it
+                key = points["Flight"] * n_phases + points["Phase"]
+                counts = np.bincount(key, minlength=len(flat_emissions))
+                self.add_points(
+                    points["Latitude"], points["Longitude"], points["Altitude (ft)"], flat_emissions[key] / counts[key, None],
+                )
+
+                missing = np.flatnonzero(counts == 0)
+                if len(missing):
+                    flight, phase = np.divmod(missing, n_phases)
+                    lat, lon = great_circle_points(
+                        lat1[flight], lon1[flight], lat2[flight], lon2[flight], (cumulative[phase] + cumulative[phase + 1]) / 2,
+                    )
+                    self.add_points(lat, lon, altitudes_ft[phase], flat_emissions[missing])
+
+        self.n_flights += len(emissions_g)
+
+    def compact(self):
+        # Merges pending batches into the store
+        if not self._pending:
+            return
+        cells = np.concatenate([self._cells] + [c for c, _ in self._pending])
+        mass = np.concatenate([self._mass] + [m for _, m in self._pending])
+        self._cells, inverse = np.unique(cells, return_inverse=True)
+        self._mass = np.column_stack([np.bincount(inverse, weights=mass[:, k], minlength=len(self._cells)) for k in range(mass.shape[1])])
+        self._pending = []
+        self._pending_rows = 0
+
+    @property
+    def cells(self):
+        self.compact()
+        return self._cells
+
+    @property
+    def mass(self):
+        self.compact()
+        return self._mass
+
+    def total(self):
+        # (3,) g over all cells
+        return self.mass.sum(axis=0)
+
+    # ---Views---
+
+    def to_dataframe(self):
+        # One row per occupied cell: cell centre, altitude layer bounds and masses
+        i, j, k = np.unravel_index(self.cells, self.shape)
+        upper = np.append(self.alt_edges_ft[1:], np.inf)
+        return pd.DataFrame({
+            "Latitude": -90 + (i + 0.5) * self.lat_step,
+            "Longitude": -180 + (j + 0.5) * self.lon_step,
+            "Altitude Min (ft)": self.alt_edges_ft[k],
+            "Altitude Max (ft)": upper[k],
+            **{f"{p} Emissions (g)": self.mass[:, n] for n, p in enumerate(POLLUTANTS)},
+        })
+
+    def column_totals(self):
+        # Occupied lat/lon columns summed over altitude: (lat, lon, (n, 3) g), e.g. for build_fleet_emissions_map()
+        columns, inverse = np.unique(self.cells // self.shape[2], return_inverse=True)
+        mass = np.column_stack([np.bincount(inverse, weights=self.mass[:, k], minlength=len(columns)) for k in range(self.mass.shape[1])])
+        i, j = np.divmod(columns, self.shape[1])
+        return -90 + (i + 0.5) * self.lat_step, -180 + (j + 0.5) * self.lon_step, mass
+
+    def to_dense(self, pollutant="NOx"):
+        # Full (lat, lon, alt) array of one pollutant; only sensible for coarse grids
+        dense = np.zeros(self.shape)
+        dense.flat[self.cells] = self.mass[:, POLLUTANTS.index(pollutant)]
+        return dense
+
+    # ---Storage---
+
+    def save(self, path):
+        np.savez_compressed(
+            path, cells=self.cells, mass=self.mass, lat_step=self.lat_step, lon_step=self.lon_step,
+            alt_edges_ft=self.alt_edges_ft, pollutants=np.array(POLLUTANTS), n_flights=self.n_flights,
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            if list(data["pollutants"]) != POLLUTANTS:
+                raise ValueError(f"Inventory pollutants {list(data['pollutants'])} do not match {POLLUTANTS}")
+            inventory = cls(float(data["lat_step"]), float(data["lon_step"]), data["alt_edges_ft"])
+            inventory._cells = data["cells"]
+            inventory._mass = data["mass"]
+            inventory.n_flights = int(data["n_flights"])
+        return inventory
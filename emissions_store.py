@@ -0,0 +1,91 @@
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from engine_registry import POLLUTANTS
+
+# Columnar emissions output: a Parquet dataset with two tables under one root,
+#   <root>/phases/  one row per flight and phase, at full float precision
+#   <root>/totals/  one row per flight (what used to be the "Total" row of the summary CSV)
+# both hive-partitioned by the chosen key columns (date, engine, origin, ...), so readers can load only the
+# columns and partitions they need.
+
+DATASET_DIR = os.path.join("output", "emissions", "dataset")
+PARTITION_COLS = ["date", "engine"]
+PLOT_COLUMNS = [
+    "Phase", "Duration (s)", "Fuel Flow (kg/s)", "Fuel Burned (kg)",
+    "HC Emissions (g)", "NOx Emissions (g)", "CO Emissions (g)",
+]
+
+
+def _write_table(df, path, partition_cols):
+    # Unique file names, so repeated writes and concurrent writers append rather than overwrite
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_to_dataset(
+        table, path, partition_cols=partition_cols or None,
+        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+    )
+
+
+def write_emissions_summary(summary_df, root=DATASET_DIR, partition_cols=PARTITION_COLS, **keys):
+    # One summary DataFrame (phase rows plus "Total" row, as returned by summarize_emissions) for one flight.
+    # keys (flight_id, date, engine, origin, destination, ...) become columns, e.g. for partitioning.
+    keys.setdefault("flight_id", uuid.uuid4().hex)
+    is_total = summary_df["Phase"] == "Total"
+
+    phases_df = summary_df[~is_total].assign(**keys)
+    totals_df = summary_df[is_total].drop(columns=["Phase", "Fuel Flow (kg/s)"], errors="ignore").assign(**keys)
+
+    _write_table(phases_df, os.path.join(root, "phases"), partition_cols)
+    _write_table(totals_df, os.path.join(root, "totals"), partition_cols)
+    return keys["flight_id"]
+
+
+def fleet_emission_tables(flights_df, phases, profile_durations_s, fuel_burned, emissions):
+    # (phases_df, totals_df) in the dataset layout for batch results from calc_fleet_emissions(..., engine_ids=...):
+    # (N, P) fuel and (N, P, 3) emissions. flights_df has one row per flight with the key columns
+    # (flight_id, date, engine, origin, ...).
+    n_flights, n_phases = fuel_burned.shape
+    flight = np.repeat(np.arange(n_flights), n_phases)
+
+    phases_df = flights_df.iloc[flight].reset_index(drop=True)
+    phases_df["Phase"] = np.tile(np.asarray(phases, dtype=object), n_flights)
+    durations = np.broadcast_to(profile_durations_s, fuel_burned.shape)
+    phases_df["Duration (s)"] = durations.ravel()
+    phases_df["Fuel Flow (kg/s)"] = np.divide(fuel_burned, durations, out=np.zeros_like(fuel_burned), where=durations > 0).ravel()
+    phases_df["Fuel Burned (kg)"] = fuel_burned.ravel()
+    for k, p in enumerate(POLLUTANTS):
+        phases_df[f"{p} Emissions (g)"] = emissions[..., k].ravel()
+
+    totals_df = flights_df.reset_index(drop=True).copy()
+    totals_df["Duration (s)"] = durations.sum(axis=1)
+    totals_df["Fuel Burned (kg)"] = fuel_burned.sum(axis=1)
+    for k, p in enumerate(POLLUTANTS):
+        totals_df[f"{p} Emissions (g)"] = emissions[..., k].sum(axis=1)
+    return phases_df, totals_df
+
+
+def write_fleet_emissions(flights_df, phases, profile_durations_s, fuel_burned, emissions,
+                          root=DATASET_DIR, partition_cols=PARTITION_COLS):
+    # Appends batch results (see fleet_emission_tables) to the dataset
+    phases_df, totals_df = fleet_emission_tables(flights_df, phases, profile_durations_s, fuel_burned, emissions)
+    _write_table(phases_df, os.path.join(root, "phases"), partition_cols)
+    _write_table(totals_df, os.path.join(root, "totals"), partition_cols)
+
+
+def read_emissions(root=DATASET_DIR, table="phases", columns=None, filters=None):
+    # Reads only the requested columns; filters on partition keys (e.g. [("engine", "=", "CFM56-5B4/2P")])
+    # prune whole directories before any file is opened
+    return pd.read_parquet(os.path.join(root, table), columns=columns, filters=filters)
+
+
+def read_summary_for_plots(flight_id, root=DATASET_DIR, filters=None):
+    # One flight in the summary layout the plot_emissions functions expect (phase rows plus a "Total" row)
+    filters = [("flight_id", "=", flight_id)] + list(filters or [])
+    phases_df = read_emissions(root, "phases", PLOT_COLUMNS, filters)
+    totals_df = read_emissions(root, "totals", [c for c in PLOT_COLUMNS if c not in ("Phase", "Fuel Flow (kg/s)")], filters)
+    return pd.concat([phases_df, totals_df.assign(Phase="Total")], ignore_index=True)[PLOT_COLUMNS]
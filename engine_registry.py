@@ -0,0 +1,354 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+ENGINES_JSON_PATH = os.path.join(ROOT, "data", "engines-data.json")
+ENGINES_CSV_PATH = os.path.join(ROOT, "data", "engine-data.csv")
+NOISE_SHEET_PATH = os.path.join(ROOT, "123.csv")
+CACHE_DIR = os.path.join(ROOT, "output", "cache", "engine_registry")
+
+CACHE_VERSION = 3
+PRUNE_AFTER_SECONDS = 3600     # Superseded compiled versions are deleted once this old (readers may still be on them)
+
+PHASES = ["IDLE", "TAKE-OFF", "CLIMB OUT", "CRUISE", "APPROACH"]   # Phase IDs, in engines-data.json order
+POLLUTANTS = ["HC", "CO", "NOx"]                                    # Last axis of the EI matrix
+SCALARS = ["Bypass Ratio", "Pressure Ratio", "Rated Thrust (kN)"]   # Columns of the per-engine scalar matrix
+LTO_PHASES = ["IDLE", "APPROACH", "CLIMB OUT", "TAKE-OFF"]          # ICAO certification points of the thrust model
+ARRAYS = ["fuel_flow", "emission_indices", "power_setting", "scalars", "thrust_knots", "thrust_coeffs"]
+
+_registries = {}    # In-process registries keyed by cache directory
+
+
+class EngineRegistry:
+    # Engine facts compiled into contiguous arrays indexed by integer engine and phase IDs:
+    #   fuel_flow (M, P) kg/s, emission_indices (M, P, 3) g/kg, power_setting (M, P) %, scalars (M, 3)
+    # Phases an engine has no data for are NaN.
+    # Thrust model (BFFM2-style) through the 4 LTO points in order of power setting: thrust_knots (M, 4) log10
+    # power (%), and per segment between knots thrust_coeffs (M, 3, 4, 2) with log10 y = a + b * log10 power for
+    # y = fuel flow, HC, CO, NOx EIs.
+
+    def __init__(self, names, info, arrays, signature):
+        self.names = names
+        self.info = info
+        self.signature = signature
+
+        self.fuel_flow = arrays["fuel_flow"]
+        self.emission_indices = arrays["emission_indices"]
+        self.power_setting = arrays["power_setting"]
+        self.scalars = arrays["scalars"]
+        self.thrust_knots = arrays["thrust_knots"]
+        self.thrust_coeffs = arrays["thrust_coeffs"]
+
+        # Evaluation layout: one contiguous array per knot, and (engine, segment) rows of intercepts and slopes
+        self._knot_columns = np.ascontiguousarray(np.asarray(self.thrust_knots).T)
+        n_quantities = self.thrust_coeffs.shape[2]
+        self._intercepts = np.ascontiguousarray(self.thrust_coeffs[..., 0]).reshape(-1, n_quantities)
+        self._slopes = np.ascontiguousarray(self.thrust_coeffs[..., 1]).reshape(-1, n_quantities)
+
+        self.ids = {name: i for i, name in enumerate(names)}
+        self.phase_ids = {phase: i for i, phase in enumerate(PHASES)}
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    def engine_id(self, name):
+        return self.ids[name]
+
+    def engine_ids(self, names):
+        return np.fromiter((self.ids[name] for name in names), dtype=np.intp)
+
+    def phase_id(self, phase):
+        return self.phase_ids[phase.upper()]
+
+    def thrust_performance(self, engine_ids, thrust_pct):
+        # Fuel flow (kg/s) and emission indices (g/kg) at any thrust setting (% of rated thrust), for arrays of
+        # engine IDs and thrust settings of any (broadcastable) shape -> fuel flow (...), EIs (..., 3).
+        # Thrust is clamped to the engine's certified range; between certification points both curves are
+        # piecewise linear in log-log space.
+        engine_ids, thrust_pct = np.broadcast_arrays(np.asarray(engine_ids, dtype=np.intp), np.asarray(thrust_pct, dtype=np.float64))
+        shape = engine_ids.shape
+        engine_ids, thrust_pct = engine_ids.ravel(), thrust_pct.ravel()
+
+        knots = self._knot_columns
+        with np.errstate(divide="ignore"):
+            log_thrust = np.log10(thrust_pct)
+        np.clip(log_thrust, knots[0][engine_ids], knots[-1][engine_ids], out=log_thrust)
+
+        # Row of (engine, segment) coefficients; the end segments extend outwards
+        rows = engine_ids * self.thrust_coeffs.shape[1]
+        for inner_knot in knots[1:-1]:
+            rows += log_thrust >= inner_knot[engine_ids]
+
+        values = self._slopes[rows]                                                 # (n, 1 + 3)
+        values *= log_thrust[:, None]
+        values += self._intercepts[rows]
+        np.power(10, values, out=values)
+
+        return values[:, 0].reshape(shape), values[:, 1:].reshape(shape + (len(POLLUTANTS),))
+
+    def engine_info(self, name):
+        # Same shape as an entry of engines-data.json
+        i = self.ids[name]
+        engine_info = dict(self.info[name])
+        for j, column in enumerate(SCALARS):
+            if column not in engine_info and not np.isnan(self.scalars[i, j]):
+                engine_info[column] = float(self.scalars[i, j])
+
+        engine_info["Phases"] = {}
+        for j, phase in enumerate(PHASES):
+            if np.isnan(self.fuel_flow[i, j]):
+                continue
+            engine_info["Phases"][phase] = {
+                "Power Setting (%)": float(self.power_setting[i, j]),
+                "Fuel Flow (kg/s)": float(self.fuel_flow[i, j]),
+                "Emission Indices (g/kg fuel)": {
+                    p: float(self.emission_indices[i, j, k]) for k, p in enumerate(POLLUTANTS)
+                },
+            }
+        return engine_info
+
+
+# ---Compiling Sources---
+
+def _compile_sources(json_path, csv_path, noise_sheet_path):
+    with open(json_path) as f:
+        engines_json = json.load(f)
+
+    names = list(engines_json)
+    info = {name: {k: v for k, v in details.items() if k != "Phases"} for name, details in engines_json.items()}
+
+    # Rows of engine-data.csv, keyed by registry name; matched to JSON engines on (family, model)
+    engines_csv = pd.read_csv(csv_path, skipinitialspace=True)
+    family_model = {(d.get("Engine Family"), str(d.get("Engine Model"))): name for name, d in info.items()}
+    csv_names = [
+        family_model.get((family, str(model)), f"{family}-{model}")
+        for family, model in zip(engines_csv["Engine Family"], engines_csv["Engine Model"])
+    ]
+    for name, (_, row) in zip(csv_names, engines_csv.iterrows()):
+        if name not in info:
+            names.append(name)
+            info[name] = {
+                "Engine Family": row["Engine Family"],
+                "Engine Model": str(row["Engine Model"]),
+                "Combustor": row["Combustor"],
+                "Fuel": row["Fuel"],
+            }
+
+    n_engines, n_phases = len(names), len(PHASES)
+    arrays = {
+        "fuel_flow": np.full((n_engines, n_phases), np.nan),
+        "emission_indices": np.full((n_engines, n_phases, len(POLLUTANTS)), np.nan),
+        "power_setting": np.full((n_engines, n_phases), np.nan),
+        "scalars": np.full((n_engines, len(SCALARS)), np.nan),
+    }
+    ids = {name: i for i, name in enumerate(names)}
+    phase_ids = {phase: j for j, phase in enumerate(PHASES)}
+
+    # engine-data.csv first, so engines-data.json wins wherever both have a value
+    for name, (_, row) in zip(csv_names, engines_csv.iterrows()):
+        i, j = ids[name], phase_ids[row["Phase"].strip().upper()]
+        arrays["fuel_flow"][i, j] = row["Fuel Flow (kg/s)"]
+        arrays["power_setting"][i, j] = row["Power Setting (%)"]
+        arrays["emission_indices"][i, j] = [row[f"Emission Index {p} (g / kg fuel)"] for p in POLLUTANTS]
+        arrays["scalars"][i] = [row[column] for column in SCALARS]
+
+    for name, details in engines_json.items():
+        i = ids[name]
+        for phase, phase_details in details["Phases"].items():
+            j = phase_ids[phase.upper()]
+            ei = phase_details["Emission Indices (g/kg fuel)"]
+            arrays["fuel_flow"][i, j] = phase_details["Fuel Flow (kg/s)"]
+            arrays["power_setting"][i, j] = phase_details["Power Setting (%)"]
+            arrays["emission_indices"][i, j] = [ei[p] for p in POLLUTANTS]
+        for k, column in enumerate(SCALARS):
+            if column in details:
+                arrays["scalars"][i, k] = details[column]
+
+    # EASA noise sheet: fill rated thrust / bypass ratio still missing for known engines
+    if noise_sheet_path is not None and os.path.exists(noise_sheet_path):
+        noise_sheet = pd.read_csv(noise_sheet_path, usecols=["Engine", "TO Thrust/Power(kN/kW)", "Bpr Nbl"])
+        noise_sheet = noise_sheet[noise_sheet["Engine"].isin(ids)].drop_duplicates("Engine")
+        for engine, thrust, bypass in noise_sheet.itertuples(index=False):
+            i = ids[engine]
+            if np.isnan(arrays["scalars"][i, 0]):
+                arrays["scalars"][i, 0] = bypass
+            if np.isnan(arrays["scalars"][i, 2]):
+                arrays["scalars"][i, 2] = thrust
+
+    arrays.update(_fit_thrust_model(arrays))
+    return names, info, arrays
+
+MIN_EI = 1e-3   # g/kg; EIs certified as 0 are floored before taking logs
+
+def _fit_log_log(x, y):
+    # Piecewise-linear fits of log10 y against log10 x through each row's points, sorted by x.
+    # x (M, K), y (M, K) or (M, K, Q) -> knots (M, K) log10 x, coefficients (M, K - 1[, Q], 2) as (intercept, slope)
+    order = np.argsort(x, axis=1)
+    log_x = np.log10(np.take_along_axis(x, order, axis=1))
+    log_y = np.log10(np.take_along_axis(y, order if y.ndim == 2 else order[..., None], axis=1))
+
+    dx = np.diff(log_x, axis=1)
+    dy = np.diff(log_y, axis=1)
+    x0 = log_x[:, :-1]
+    if y.ndim == 3:
+        dx, x0 = dx[..., None], x0[..., None]
+    slope = np.divide(dy, dx, out=np.zeros_like(dy), where=dx > 0)    # Coinciding points: flat segment
+    intercept = log_y[:, :-1] - slope * x0
+    return log_x, np.stack([intercept, slope], axis=-1)
+
+def _fit_thrust_model(arrays):
+    # BFFM2 interpolates log fuel flow against log thrust and log EI against log fuel flow between the LTO points.
+    # Fuel flow rises with thrust, so both share the same knots and compose into one fit per quantity against
+    # log thrust: one segment lookup per point gives fuel flow and all three EIs.
+    lto = [PHASES.index(phase) for phase in LTO_PHASES]
+    power_setting = arrays["power_setting"][:, lto]
+    fuel_flow = arrays["fuel_flow"][:, lto]
+    emission_indices = np.maximum(arrays["emission_indices"][:, lto], MIN_EI)
+
+    values = np.concatenate([fuel_flow[..., None], emission_indices], axis=-1)     # (M, 4, 1 + 3)
+    thrust_knots, thrust_coeffs = _fit_log_log(power_setting, values)
+    return {"thrust_knots": thrust_knots, "thrust_coeffs": thrust_coeffs}
+
+
+# ---On-Disk Cache---
+
+def _file_hash(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+def _source_stats(sources):
+    stats = {}
+    for path in sources:
+        if os.path.exists(path):
+            st = os.stat(path)
+            stats[path] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+    return stats
+
+def _check_sources(meta, sources):
+    # Cheap mtime/size check first; fall back to content hashes (e.g. after a fresh checkout).
+    # Returns ("fresh" | "restamped" | "stale", current stats)
+    stats = _source_stats(sources)
+    cached = meta["sources"]
+    if set(stats) != set(cached):
+        return "stale", stats
+    if all(cached[path]["mtime_ns"] == s["mtime_ns"] and cached[path]["size"] == s["size"] for path, s in stats.items()):
+        return "fresh", cached
+    for path in stats:
+        stats[path]["sha256"] = _file_hash(path)
+        if stats[path]["sha256"] != cached[path]["sha256"]:
+            return "stale", stats
+    return "restamped", stats
+
+def _compile_consistent(json_path, csv_path, noise_sheet_path, sources):
+    # (names, info, arrays, stats) with content hashes taken before compiling; compiles again if a source changed
+    # meanwhile, so the hashes (and the signature naming the version) describe exactly what was compiled
+    while True:
+        stats = _source_stats(sources)
+        for path, s in stats.items():
+            s["sha256"] = _file_hash(path)
+        names, info, arrays = _compile_sources(json_path, csv_path, noise_sheet_path)
+        if _source_stats(sources) == {path: {"mtime_ns": s["mtime_ns"], "size": s["size"]} for path, s in stats.items()}:
+            return names, info, arrays, stats
+
+def _write_cache(cache_dir, names, info, arrays, stats):
+    # Each compiled version goes into its own directory, named by content, which is never modified afterwards;
+    # meta.json (names, info) is switched over to it last. A reader in another process therefore always loads the
+    # arrays of the meta.json it read, even while a newer version is being written.
+    os.makedirs(cache_dir, exist_ok=True)
+    data_dir = f"v{CACHE_VERSION}-{_signature(stats)}"
+    if not os.path.isdir(os.path.join(cache_dir, data_dir)):
+        tmp_dir = os.path.join(cache_dir, f".tmp-{os.getpid()}-{uuid.uuid4().hex}")
+        os.makedirs(tmp_dir)
+        for key in ARRAYS:
+            np.save(os.path.join(tmp_dir, f"{key}.npy"), np.ascontiguousarray(arrays[key]))
+        try:
+            os.rename(tmp_dir, os.path.join(cache_dir, data_dir))
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)     # Another process compiled the same version first
+
+    _write_meta(cache_dir, {"version": CACHE_VERSION, "data_dir": data_dir, "sources": stats, "names": names, "info": info})
+    _prune_versions(cache_dir, keep=data_dir)
+
+def _prune_versions(cache_dir, keep):
+    # Superseded versions (and leftovers of interrupted writers) once they are old enough that no reader can still
+    # be switching to them, and arrays of the old single-directory layout
+    cutoff = time.time() - PRUNE_AFTER_SECONDS
+    for entry in os.scandir(cache_dir):
+        try:
+            if entry.is_dir() and entry.name != keep and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+            elif entry.is_file() and entry.name.endswith(".npy"):
+                os.remove(entry.path)
+        except OSError:
+            pass
+
+def _write_meta(cache_dir, meta):
+    tmp_path = os.path.join(cache_dir, f"meta.{os.getpid()}.tmp.json")
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, os.path.join(cache_dir, "meta.json"))
+
+def _read_meta(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, "meta.json")) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get("version") == CACHE_VERSION and "data_dir" in meta else None
+
+def _load_arrays(cache_dir, meta):
+    return {key: np.load(os.path.join(cache_dir, meta["data_dir"], f"{key}.npy"), mmap_mode="r") for key in ARRAYS}
+
+def _signature(stats):
+    # Version of the engine data: changes whenever any source's content changes
+    return hashlib.sha256("".join(s["sha256"] for _, s in sorted(stats.items())).encode()).hexdigest()[:16]
+
+def load_engine_registry(
+    json_path=ENGINES_JSON_PATH,
+    csv_path=ENGINES_CSV_PATH,
+    noise_sheet_path=NOISE_SHEET_PATH,
+    cache_dir=CACHE_DIR,
+):
+    sources = [p for p in (json_path, csv_path, noise_sheet_path) if p is not None]
+
+    # Reuse the in-process registry while none of the sources has been touched
+    registry = _registries.get(cache_dir)
+    if registry is not None and registry._stats == _source_stats(sources):
+        return registry
+
+    meta = _read_meta(cache_dir)
+    status, stats = _check_sources(meta, sources) if meta is not None else ("stale", None)
+
+    if status == "restamped":
+        # Same content, new mtimes: refresh the stamps so the next check is stat-only
+        meta["sources"] = stats
+        _write_meta(cache_dir, meta)
+    elif status == "stale":
+        names, info, arrays, stats = _compile_consistent(json_path, csv_path, noise_sheet_path, sources)
+        _write_cache(cache_dir, names, info, arrays, stats)
+        meta = _read_meta(cache_dir)
+
+    try:
+        arrays = _load_arrays(cache_dir, meta)
+    except OSError:
+        # The version meta.json named was pruned by a newer compile in between; the new meta.json names its successor
+        meta = _read_meta(cache_dir)
+        arrays = _load_arrays(cache_dir, meta)
+    registry = EngineRegistry(meta["names"], meta["info"], arrays, _signature(meta["sources"]))
+    registry._stats = {path: {"mtime_ns": s["mtime_ns"], "size": s["size"]} for path, s in meta["sources"].items()}
+    _registries[cache_dir] = registry
+    return registry
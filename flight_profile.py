@@ -0,0 +1,178 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Compact flight profiles. A profile is a handful of phases with four numbers each, so instead of a DataFrame it
+# is kept as a tuple of phase names plus one NumPy structured array (32 bytes per phase). Many flights with any
+# number of phases go into a FlightProfileBatch: one flat structured array for all phases, phase names as small
+# integer codes into a shared name table, and offsets marking where each flight starts (flight i owns rows
+# offsets[i]:offsets[i + 1]).
+#
+# The calculators (summarize_emissions, calc_phase_noise, build_flight_path, sample_trajectories, ...) accept a
+# FlightProfile, a profile DataFrame or a CSV path; as_flight_profile() does the conversion.
+
+# CSV column -> structured array field
+PROFILE_FIELDS = {
+    "Duration (min)": "duration_min",
+    "Altitude (ft)": "altitude_ft",
+    "Speed (kts)": "speed_kts",
+    "Thrust (%)": "thrust_pct",
+}
+PROFILE_DTYPE = np.dtype([(field, np.float64) for field in PROFILE_FIELDS.values()])
+
+
+def _records(columns, n):
+    # Structured array from {field: values}; missing fields (e.g. no "Thrust (%)" column) are NaN
+    data = np.empty(n, dtype=PROFILE_DTYPE)
+    for field in PROFILE_DTYPE.names:
+        data[field] = columns.get(field, np.nan)
+    return data
+
+
+class FlightProfile:
+    __slots__ = ("phases", "data")
+
+    def __init__(self, phases, data):
+        self.phases = tuple(phases)     # Phase names, in flight order
+        self.data = data                # (P,) PROFILE_DTYPE
+
+    @classmethod
+    def from_arrays(cls, phases, duration_min, altitude_ft, speed_kts, thrust_pct=np.nan):
+        columns = {"duration_min": duration_min, "altitude_ft": altitude_ft, "speed_kts": speed_kts, "thrust_pct": thrust_pct}
+        return cls(phases, _records(columns, len(phases)))
+
+    @classmethod
+    def from_dataframe(cls, profile_df):
+        columns = {field: profile_df[column].to_numpy(dtype=np.float64) for column, field in PROFILE_FIELDS.items() if column in profile_df}
+        return cls(profile_df["Phase"].tolist(), _records(columns, len(profile_df)))
+
+    @classmethod
+    def from_csv(cls, path):
+        return cls.from_dataframe(pd.read_csv(path))
+
+    def to_dataframe(self):
+        return pd.DataFrame({"Phase": list(self.phases), **{column: self.data[field] for column, field in PROFILE_FIELDS.items()}})
+
+    def __len__(self):
+        return len(self.phases)
+
+    def __repr__(self):
+        return f"FlightProfile({len(self)} phases: {', '.join(self.phases)})"
+
+    @property
+    def durations_s(self):
+        return self.data["duration_min"] * 60
+
+    @property
+    def altitudes_ft(self):
+        return self.data["altitude_ft"]
+
+    @property
+    def speeds_kts(self):
+        return self.data["speed_kts"]
+
+    @property
+    def thrust_pct(self):
+        return self.data["thrust_pct"]
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+
+def as_flight_profile(profile):
+    # FlightProfile from a FlightProfile, a profile DataFrame or a CSV path
+    if isinstance(profile, FlightProfile):
+        return profile
+    if isinstance(profile, (str, os.PathLike)):
+        return FlightProfile.from_csv(profile)
+    return FlightProfile.from_dataframe(profile)
+
+
+class FlightProfileBatch:
+    __slots__ = ("phase_names", "phase_codes", "data", "offsets")
+
+    def __init__(self, phase_names, phase_codes, data, offsets):
+        self.phase_names = tuple(phase_names)                    # Name table shared by all flights
+        self.phase_codes = np.asarray(phase_codes, dtype=np.int16)   # (T,) positions in phase_names
+        self.data = data                                         # (T,) PROFILE_DTYPE, all flights back to back
+        self.offsets = np.asarray(offsets, dtype=np.int64)       # (N + 1,)
+
+    @classmethod
+    def from_profiles(cls, profiles):
+        # Any mix of FlightProfiles, DataFrames and paths; phase counts may differ between flights
+        profiles = [as_flight_profile(p) for p in profiles]
+        names = {}
+        codes = [names.setdefault(phase, len(names)) for p in profiles for phase in p.phases]
+        data = np.concatenate([p.data for p in profiles]) if profiles else np.empty(0, dtype=PROFILE_DTYPE)
+        offsets = np.concatenate([[0], np.cumsum([len(p) for p in profiles])])
+        return cls(list(names), codes, data, offsets)
+
+    @classmethod
+    def repeat(cls, profile, n_flights):
+        # n_flights copies of one profile, e.g. to be perturbed in place through .data
+        profile = as_flight_profile(profile)
+        n_phases = len(profile)
+        return cls(
+            profile.phases, np.tile(np.arange(n_phases), n_flights), np.tile(profile.data, n_flights),
+            np.arange(n_flights + 1) * n_phases,
+        )
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        # One flight's profile (its data is a view into the batch)
+        start, stop = self.offsets[i], self.offsets[i + 1]
+        return FlightProfile([self.phase_names[c] for c in self.phase_codes[start:stop]], self.data[start:stop])
+
+    def __repr__(self):
+        return f"FlightProfileBatch({len(self)} flights, {len(self.data)} phases)"
+
+    @property
+    def phase_counts(self):
+        return np.diff(self.offsets)
+
+    @property
+    def flight_index(self):
+        # (T,) flight of every phase row
+        return np.repeat(np.arange(len(self)), self.phase_counts)
+
+    @property
+    def phase_position(self):
+        # (T,) position of every phase row within its flight
+        return np.arange(len(self.data)) - np.repeat(self.offsets[:-1], self.phase_counts)
+
+    @property
+    def phases(self):
+        # (T,) phase names
+        return np.asarray(self.phase_names, dtype=object)[self.phase_codes]
+
+    @property
+    def durations_s(self):
+        return self.data["duration_min"] * 60
+
+    @property
+    def altitudes_ft(self):
+        return self.data["altitude_ft"]
+
+    @property
+    def speeds_kts(self):
+        return self.data["speed_kts"]
+
+    @property
+    def thrust_pct(self):
+        return self.data["thrust_pct"]
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes + self.phase_codes.nbytes + self.offsets.nbytes
+
+    def per_flight(self, values):
+        # Sums of (T,) or (T, K) per-phase values per flight -> (N,) or (N, K)
+        values = np.asarray(values, dtype=np.float64)
+        flight = self.flight_index
+        if values.ndim == 1:
+            return np.bincount(flight, weights=values, minlength=len(self))
+        return np.column_stack([np.bincount(flight, weights=values[:, k], minlength=len(self)) for k in range(values.shape[1])])
@@ -0,0 +1,84 @@
+import os
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_KM = 6371.0088
+
+AIRPORTS_CSV_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "airports.csv")
+
+_indexes = {}   # In-process indexes keyed by (path, mtime)
+
+
+class AirportIndex:
+    # Airports with O(1) IATA/ICAO lookup and a haversine BallTree on (lat, lon) for spatial queries.
+    # Query results are row positions into self.airports; distances are in km. The tree (and scikit-learn) is
+    # only loaded by the first spatial query, so code lookups stay cheap to import and build.
+
+    def __init__(self, airports_df):
+        self.airports = airports_df.dropna(subset=["lat_decimal", "lon_decimal"]).reset_index(drop=True)
+        self.lat = self.airports["lat_decimal"].to_numpy(dtype=np.float64)
+        self.lon = self.airports["lon_decimal"].to_numpy(dtype=np.float64)
+
+        self._tree = None
+
+        # ICAO codes are unique; the first airport wins for the few duplicated IATA codes
+        self._codes = {}
+        for column in ["icao_code", "iata_code"]:
+            codes = self.airports[column]
+            for position, code in zip(codes.index[codes.notna()], codes.dropna()):
+                self._codes.setdefault(code.upper(), position)
+
+    def __len__(self):
+        return len(self.airports)
+
+    def __contains__(self, code):
+        return isinstance(code, str) and code.upper() in self._codes
+
+    def position(self, code):
+        return self._codes[code.upper()]
+
+    def positions(self, codes):
+        # Vector of row positions for IATA/ICAO codes, -1 where a code is unknown
+        return np.fromiter(
+            (self._codes.get(code.upper(), -1) if isinstance(code, str) else -1 for code in codes),
+            dtype=np.intp,
+        )
+
+    def lookup(self, code):
+        return self.airports.iloc[self.position(code)]
+
+    def coordinates(self, positions):
+        return self.lat[positions], self.lon[positions]
+
+    def _ball_tree(self):
+        if self._tree is None:
+            from sklearn.neighbors import BallTree
+            self._tree = BallTree(np.radians(np.column_stack([self.lat, self.lon])), metric="haversine")
+        return self._tree
+
+    def _query_points(self, lat, lon):
+        lat, lon = np.broadcast_arrays(np.atleast_1d(lat), np.atleast_1d(lon))
+        return np.radians(np.column_stack([lat.ravel(), lon.ravel()]))
+
+    # Both spatial queries return (positions, distances in km) as numpy arrays
+
+    def nearest(self, lat, lon, k=1):
+        # Positions and distances of the k nearest airports, shape (n_points, k)
+        dist, positions = self._ball_tree().query(self._query_points(lat, lon), k=k)
+        return positions, dist * EARTH_RADIUS_KM
+
+    def within_radius(self, lat, lon, radius_km):
+        # Positions and distances of all airports within radius_km, nearest first: object arrays of shape
+        # (n_points,) holding one array per query point
+        positions, dist = self._ball_tree().query_radius(
+            self._query_points(lat, lon), r=radius_km / EARTH_RADIUS_KM, return_distance=True, sort_results=True
+        )
+        return positions, dist * EARTH_RADIUS_KM
+
+
+def load_airport_index(airports_csv_path=AIRPORTS_CSV_PATH):
+    # Built once per process and reused until the CSV changes
+    key = (os.path.abspath(airports_csv_path), os.path.getmtime(airports_csv_path))
+    if key not in _indexes:
+        _indexes[key] = AirportIndex(pd.read_csv(airports_csv_path))
+    return _indexes[key]
@@ -1,28 +1,77 @@
 import os
 import pandas as pd
 import numpy as np
-import folium
-from folium.plugins import MiniMap, HeatMap, PolyLineTextPath
 
-def plot_pollutant_emissions_map(start_loc):
-    # File paths
-    current_dir = os.path.dirname(__file__)
-    airports_csv_path = os.path.join(current_dir, "..", "output/routes", "origin_destination_data.csv")
-    flight_path_csv_path = os.path.join(current_dir, "..", "output/routes", "flight_path.csv")
-    emissions_summary_csv_path = os.path.join(current_dir, "..", "output/emissions", "emissions_summary.csv")
+from instrumentation import span, read_csv, save_map
 
-    # Load data
-    airports_df = pd.read_csv(airports_csv_path)
-    flight_path_df = pd.read_csv(flight_path_csv_path)
-    emissions_summary_df = pd.read_csv(emissions_summary_csv_path)
-    emissions_summary_df = emissions_summary_df[emissions_summary_df["Phase"] != "Total"]
+# ---Heat-Point Generation---
 
-    # Getting Airport Coords
-    origin_data = airports_df.iloc[0]
-    destin_data = airports_df.iloc[1]
+EARTH_RADIUS_KM = 6371.0088
+WEB_MERCATOR_M_PER_PX = 156543.03392   # Metres per pixel at the equator at zoom 0
 
-    coord_origin = (float(origin_data["Latitude"]), float(origin_data["Longitude"]))
-    coord_destin = (float(destin_data["Latitude"]), float(destin_data["Longitude"]))
+def build_heat_points(lat1, lon1, lat2, lon2, values, zoom=8, px_per_point=8, max_points=10000):
+    # Points interpolated along straight segments (lat1, lon1) -> (lat2, lon2), each carrying its segment's value.
+    # Each segment gets one point every px_per_point pixels at the given zoom level; if that exceeds max_points
+    # in total, every segment keeps one point and the rest of the budget is shared in proportion to its length.
+    # With more segments than max_points, an evenly spaced subset of them gets one point each, so the result never
+    # holds more than max_points points. Works on segments from any number of flights.
+    lat1, lon1, lat2, lon2, values = np.broadcast_arrays(
+        *(np.asarray(a, dtype=np.float64) for a in (lat1, lon1, lat2, lon2, values))
+    )
+
+    # Segment lengths (km, equirectangular) and ground resolution (km per pixel) at the segment's mid-latitude
+    mid_lat = np.radians((lat1 + lat2) / 2)
+    dx = np.radians(lon2 - lon1) * np.cos(mid_lat)
+    dy = np.radians(lat2 - lat1)
+    length_km = EARTH_RADIUS_KM * np.hypot(dx, dy)
+    km_per_px = WEB_MERCATOR_M_PER_PX * np.cos(mid_lat) / 2 ** zoom / 1000
+
+    n_points = np.ceil(length_km / (km_per_px * px_per_point)).astype(np.int64) + 1
+    if len(n_points) > max_points:
+        keep = np.unique(np.linspace(0, len(n_points) - 1, max_points).round().astype(np.int64))
+        lat1, lon1, lat2, lon2, values = (a[keep] for a in (lat1, lon1, lat2, lon2, values))
+        n_points = np.ones(len(keep), dtype=np.int64)
+    elif n_points.sum() > max_points:
+        extra = n_points - 1
+        n_points = 1 + np.floor(extra * (max_points - len(n_points)) / extra.sum()).astype(np.int64)
+
+    # Fraction along its segment for every point, without a per-point loop
+    seg = np.repeat(np.arange(len(n_points)), n_points)
+    first = np.cumsum(n_points) - n_points
+    step = np.arange(len(seg)) - first[seg]
+    t = step / np.maximum(n_points[seg] - 1, 1)
+
+    lat = lat1[seg] + t * (lat2[seg] - lat1[seg])
+    lon = lon1[seg] + t * (lon2[seg] - lon1[seg])
+
+    # Rounded to ~1 m / 0.1 % so the embedded JSON stays small
+    return np.column_stack([lat.round(5), lon.round(5), values[seg].round(3)]).tolist()
+
+# ---Map Builders---
+# folium (and geo.map_layers, which subclasses its Layer) is imported inside the builders, so route and heat-point
+# code can be used without loading the map stack.
+
+def build_fleet_emissions_map(lat, lon, emissions, start_loc, flight=None, scale_factor=1.2, zoom_start=5):
+    # One map for many flights, e.g. the phase points of a day's schedule
+    import folium
+    from folium.plugins import MiniMap
+    from geo.map_layers import EmissionCircles
+
+    m = folium.Map(location=start_loc, zoom_start=zoom_start, prefer_canvas=True)
+    EmissionCircles(lat, lon, emissions, scale_factor, flight).add_to(m)
+    m.add_child(MiniMap(toggle_display=True))
+    return m
+
+def build_pollutant_emissions_map(coord_origin, coord_destin, flight_path_df, emissions_summary_df, start_loc,
+                                  origin_label="JFK Airport (Origin)", destin_label="YYZ Airport (Destination)",
+                                  mode="circles"):
+    # mode="circles" adds one folium.Circle (with its own popup) per point and pollutant;
+    # mode="canvas" draws all of them from one EmissionCircles layer
+    import folium
+    from folium.plugins import MiniMap, PolyLineTextPath
+    from geo.map_layers import EmissionCircles
+
+    emissions_summary_df = emissions_summary_df[emissions_summary_df["Phase"] != "Total"]
 
     # Emission data per phase
     co_em = emissions_summary_df["CO Emissions (g)"].tolist()
@@ -30,7 +79,7 @@ def plot_pollutant_emissions_map(start_loc):
     hc_em = emissions_summary_df["HC Emissions (g)"].tolist()
 
     # Start point for map
-    m = folium.Map(location=start_loc, zoom_start=7)
+    m = folium.Map(location=start_loc, zoom_start=7, prefer_canvas=(mode == "canvas"))
 
     # Add polyline for route
     route = folium.PolyLine(
@@ -50,20 +99,26 @@ def plot_pollutant_emissions_map(start_loc):
     # Add origin marker
     folium.Marker(
         location=coord_origin,
-        popup="JFK Airport (Origin)",
+        popup=origin_label,
         icon=folium.Icon(color='blue', icon='plane-departure', prefix='fa')
     ).add_to(m)
 
     # Add destination marker
     folium.Marker(
         location=coord_destin,
-        popup="YYZ Airport (Destination)",
+        popup=destin_label,
         icon=folium.Icon(color='red', icon='plane-arrival', prefix='fa')
     ).add_to(m)
 
     # Scale factor for circle radius (meters per gram)
     scale_factor = 1.2  # Adjust this value to get appropriate visibility
 
+    if mode == "canvas":
+        emissions = {"CO": co_em, "NOx": nox_em, "HC": hc_em}
+        EmissionCircles(flight_path_df["Latitude"], flight_path_df["Longitude"], emissions, scale_factor).add_to(m)
+        m.add_child(MiniMap(toggle_display=True))
+        return m
+
     # Add circles for emissions
     for idx, row in flight_path_df.iterrows():
         lat, lon = row["Latitude"], row["Longitude"]
@@ -100,22 +155,19 @@ def plot_pollutant_emissions_map(start_loc):
 
     m.add_child(MiniMap(toggle_display=True))
 
-    # Save to file
-    m.save("output/routes/flight_path_emissions_map.html")
+    return m
 
-def plot_noise_emissions_map(start_loc):
-    # Paths
+def plot_pollutant_emissions_map(start_loc):
+    # File paths
     current_dir = os.path.dirname(__file__)
     airports_csv_path = os.path.join(current_dir, "..", "output/routes", "origin_destination_data.csv")
-    flight_path_csv = os.path.join(current_dir, "..", "output/routes", "flight_path.csv")
-    emissions_csv = os.path.join(current_dir, "..", "output/emissions", "emissions_summary.csv")
+    flight_path_csv_path = os.path.join(current_dir, "..", "output/routes", "flight_path.csv")
+    emissions_summary_csv_path = os.path.join(current_dir, "..", "output/emissions", "emissions_summary.csv")
 
     # Load data
-    airports_df = pd.read_csv(airports_csv_path)
-    flight_df = pd.read_csv(flight_path_csv)
-    emissions_df = pd.read_csv(emissions_csv)
-    emissions_df = emissions_df[emissions_df["Phase"] != "Total"]
-    ground_noise = emissions_df["Noise Emissions (EPNdB)"].tolist()
+    airports_df = read_csv(airports_csv_path)
+    flight_path_df = read_csv(flight_path_csv_path)
+    emissions_summary_df = read_csv(emissions_summary_csv_path)
 
     # Getting Airport Coords
     origin_data = airports_df.iloc[0]
@@ -124,32 +176,90 @@ def plot_noise_emissions_map(start_loc):
     coord_origin = (float(origin_data["Latitude"]), float(origin_data["Longitude"]))
     coord_destin = (float(destin_data["Latitude"]), float(destin_data["Longitude"]))
 
-    # Prepare interpolated points
-    heat_data = []
-    n_points_per_phase = 1000
+    with span("build_pollutant_emissions_map"):
+        m = build_pollutant_emissions_map(coord_origin, coord_destin, flight_path_df, emissions_summary_df, start_loc)
 
-    for i in range(len(flight_df)):
-        lat1, lon1 = flight_df.iloc[i]["Latitude"], flight_df.iloc[i]["Longitude"]
-        
-        if i < len(flight_df) - 1:
-            lat2, lon2 = flight_df.iloc[i + 1]["Latitude"], flight_df.iloc[i + 1]["Longitude"]
-        else:
-            lat2, lon2 = coord_destin  # use destination coordinates for last segment
+    # Save to file
+    save_map(m, "output/routes/flight_path_emissions_map.html")
+
+def build_noise_emissions_map(coord_destin, flight_df, emissions_df, start_loc):
+    import folium
+    from folium.plugins import MiniMap, HeatMap
+
+    emissions_df = emissions_df[emissions_df["Phase"] != "Total"]
+    ground_noise = emissions_df["Noise Emissions (EPNdB)"].tolist()
 
-        noise = ground_noise[i]
+    # Segments run from each phase point to the next one, the last one ends at the destination
+    seg_lat1 = flight_df["Latitude"].to_numpy(dtype=np.float64)
+    seg_lon1 = flight_df["Longitude"].to_numpy(dtype=np.float64)
+    seg_lat2 = np.append(seg_lat1[1:], coord_destin[0])
+    seg_lon2 = np.append(seg_lon1[1:], coord_destin[1])
 
-        for t in np.linspace(0, 1, n_points_per_phase):
-            lat = lat1 + t * (lat2 - lat1)
-            lon = lon1 + t * (lon2 - lon1)
-            # Normalize EPNdB to 0–1 range
-            normalized_noise = max(0, min(1, (noise) / 70))  # Assume 30 dB min audible, 100 dB max possible
-            heat_data.append([lat, lon, normalized_noise])
+    # Normalize EPNdB to 0–1 range
+    normalized_noise = np.clip(np.asarray(ground_noise, dtype=np.float64) / 70, 0, 1)
 
+    heat_data = build_heat_points(seg_lat1, seg_lon1, seg_lat2, seg_lon2, normalized_noise, zoom=8)
 
     # Initialize map
     m = folium.Map(location=start_loc, zoom_start=6)
     HeatMap(heat_data, radius=25, blur=15, max_zoom=8, min_opacity=0.1).add_to(m)
     m.add_child(MiniMap(toggle_display=True))
 
+    return m
+
+def build_noise_footprint_map(grid_lat, grid_lon, levels, start_loc, vmin=None, vmax=None, opacity=0.6):
+    # Received-level grid from noise_footprint.calc_noise_footprint() as one image overlay; NaN cells are transparent
+    import folium
+    from folium.plugins import MiniMap
+    from branca.colormap import linear
+
+    levels = np.asarray(levels, dtype=np.float64)
+    finite = np.isfinite(levels)
+    vmin = np.nanmin(levels) if vmin is None else vmin
+    vmax = np.nanmax(levels) if vmax is None else vmax
+    colormap = linear.YlOrRd_09.scale(vmin, vmax)
+    colormap.caption = "Received noise (EPNdB)"
+
+    # Colour lookup table instead of a colormap call per cell
+    n_colors = 256
+    table = np.array([colormap.rgba_bytes_tuple(v) for v in np.linspace(vmin, vmax, n_colors)], dtype=np.uint8)
+    index = np.clip((np.nan_to_num(levels, nan=vmin) - vmin) / max(vmax - vmin, 1e-9) * (n_colors - 1), 0, n_colors - 1)
+    image = table[index.astype(np.int64)]
+    image[..., 3] = np.where(finite, 255, 0)
+
+    m = folium.Map(location=start_loc, zoom_start=8)
+    folium.raster_layers.ImageOverlay(
+        image[::-1],                                    # Rows run north to south in the image
+        bounds=[[grid_lat[0], grid_lon[0]], [grid_lat[-1], grid_lon[-1]]],
+        opacity=opacity,
+        mercator_project=True,
+    ).add_to(m)
+    colormap.add_to(m)
+    m.add_child(MiniMap(toggle_display=True))
+
+    return m
+
+def plot_noise_emissions_map(start_loc):
+    # Paths
+    current_dir = os.path.dirname(__file__)
+    airports_csv_path = os.path.join(current_dir, "..", "output/routes", "origin_destination_data.csv")
+    flight_path_csv = os.path.join(current_dir, "..", "output/routes", "flight_path.csv")
+    emissions_csv = os.path.join(current_dir, "..", "output/emissions", "emissions_summary.csv")
+
+    # Load data
+    airports_df = read_csv(airports_csv_path)
+    flight_df = read_csv(flight_path_csv)
+    emissions_df = read_csv(emissions_csv)
+
+    # Getting Airport Coords
+    origin_data = airports_df.iloc[0]
+    destin_data = airports_df.iloc[1]
+
+    coord_origin = (float(origin_data["Latitude"]), float(origin_data["Longitude"]))
+    coord_destin = (float(destin_data["Latitude"]), float(destin_data["Longitude"]))
+
+    with span("build_noise_emissions_map"):
+        m = build_noise_emissions_map(coord_destin, flight_df, emissions_df, start_loc)
+
     # Save to file
-    m.save("output/routes/flight_path_noise_map.html")
+    save_map(m, "output/routes/flight_path_noise_map.html")
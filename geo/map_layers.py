@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+from folium.map import Layer
+from branca.element import Template
+
+# Custom folium layers. Kept apart from flight_map_plotter so that importing the plotter does not load folium;
+# the map builders import this module when they are first called.
+
+# ---Compact Emission Layer---
+
+# All emission circles in one canvas-rendered layer. The data is embedded column-wise (one array of latitudes, one
+# of longitudes, one of grams per pollutant) instead of as one object per circle, and the circles, their styling
+# and their popups are created in the browser from those arrays. Coordinates are rounded to ~1 m and grams to
+# 0.1 g, so a day of flights stays at a few MB of HTML.
+
+POLLUTANT_COLORS = {"CO": "#56B4E9", "NOx": "#E69F00", "HC": "#009E73"}
+POLLUTANT_LABELS = {"CO": "CO", "NOx": "NOₓ", "HC": "HC"}
+
+class EmissionCircles(Layer):
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function (data) {
+                var group = L.featureGroup();
+                var renderer = L.canvas({padding: 0.5});
+                data.lat.forEach(function (lat, i) {
+                    data.pollutants.forEach(function (pollutant, k) {
+                        var grams = data.grams[k][i];
+                        L.circle([lat, data.lon[i]], {
+                            renderer: renderer,
+                            radius: grams * data.scale_factor,
+                            color: data.colors[k],
+                            fillColor: data.colors[k],
+                            fillOpacity: 0.4,
+                            weight: 1
+                        }).bindPopup(function () {
+                            var text = data.labels[k] + ": " + grams.toFixed(1) + " g";
+                            return data.flight ? "Flight " + data.flights[data.flight[i]] + "<br>" + text : text;
+                        }).addTo(group);
+                    });
+                });
+                return group;
+            })({{ this.data|tojson }});
+        {% endmacro %}
+    """)
+
+    def __init__(self, lat, lon, emissions, scale_factor=1.2, flight=None, name="Emissions", show=True):
+        # lat, lon: (n,) points of any number of flights
+        # emissions: {"CO": (n,), "NOx": (n,), "HC": (n,)} grams at each point; circles are drawn in this order
+        # flight: optional (n,) flight labels shown in the popups
+        super().__init__(name=name, overlay=True, control=True, show=show)
+        self._name = "EmissionCircles"
+
+        pollutants = list(emissions)
+        self.data = {
+            "lat": np.round(np.asarray(lat, dtype=np.float64), 5).tolist(),
+            "lon": np.round(np.asarray(lon, dtype=np.float64), 5).tolist(),
+            "pollutants": pollutants,
+            "labels": [POLLUTANT_LABELS.get(p, p) for p in pollutants],
+            "colors": [POLLUTANT_COLORS.get(p, "#555555") for p in pollutants],
+            "grams": [np.round(np.asarray(emissions[p], dtype=np.float64), 1).tolist() for p in pollutants],
+            "scale_factor": scale_factor,
+            "flight": None,
+        }
+        if flight is not None:
+            # Labels stored once per flight, points refer to them by position
+            codes, flights = pd.factorize(np.asarray(flight))
+            self.data["flight"] = codes.tolist()
+            self.data["flights"] = [str(f) for f in flights]
@@ -2,51 +2,150 @@ import os
 import pandas as pd
 import numpy as np
 
-def map_flight_path():
-    current_dir = os.path.dirname(__file__)
-    airports_csv_path = os.path.join(current_dir, "..", "output/routes", "origin_destination_data.csv")
-    test_flight_profile_csv_path = os.path.join(current_dir, "..", "flight-profiles", "test_flight_profile.csv")
+from flight_profile import as_flight_profile
+from instrumentation import span, read_csv, to_csv
 
-    airports_df = pd.read_csv(airports_csv_path)
-    test_flight_profile_df = pd.read_csv(test_flight_profile_csv_path)
+EARTH_RADIUS_KM = 6371.0088
 
-    origin_data = airports_df.iloc[0]
-    destin_data = airports_df.iloc[1]
+# ---Great-Circle Geometry---
 
-    coord_origin = (float(origin_data["Latitude"]), float(origin_data["Longitude"]))
-    coord_destin = (float(destin_data["Latitude"]), float(destin_data["Longitude"]))
+def _unit_vectors(lat, lon):
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
 
-    start_loc = (coord_origin[0]+coord_destin[0])/2, (coord_origin[1]+coord_destin[1])/2
+def great_circle_distance_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lon1, lat2, lon2))
+    h = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(h, 0, 1)))
 
-    # --- Temporarily adding equidistant spacing between coordinates
-    phase_speeds = test_flight_profile_df["Speed (kts)"].tolist()
-    phase_durations = test_flight_profile_df["Duration (min)"].tolist()
+def _great_circle_setup(lat1, lon1, lat2, lon2):
+    # Endpoint unit vectors and the central angle between them
+    a = _unit_vectors(np.asarray(lat1, dtype=np.float64), np.asarray(lon1, dtype=np.float64))
+    b = _unit_vectors(np.asarray(lat2, dtype=np.float64), np.asarray(lon2, dtype=np.float64))
+    omega = np.arctan2(np.linalg.norm(np.cross(a, b), axis=-1), np.sum(a * b, axis=-1))
+    return a, b, omega
 
-    # Calculate cumulative ratios
-    phase_distances = [phase_speeds[i] * phase_durations[i] for i in range(len(phase_speeds))]
-    phase_distance_ratios = [d / sum(phase_distances) for d in phase_distances]
-    cumulative_ratios = np.cumsum([0] + phase_distance_ratios)
+def _slerp(a, b, omega, fractions):
+    # Spherical linear interpolation; coincident endpoints fall back to linear weights
+    f = np.asarray(fractions, dtype=np.float64)[..., None]
+    omega = omega[..., None]
+    sin_omega = np.sin(omega)
+    safe = sin_omega > 1e-12
+    sin_omega = np.where(safe, sin_omega, 1)
+    wa = np.where(safe, np.sin((1 - f) * omega) / sin_omega, 1 - f)
+    wb = np.where(safe, np.sin(f * omega) / sin_omega, f)
+    p = wa * a + wb * b
 
-    # Use midpoints of each segment for placement
-    midpoints = [(cumulative_ratios[i] + cumulative_ratios[i + 1]) / 2 for i in range(len(phase_distance_ratios))]
+    lat = np.degrees(np.arctan2(p[..., 2], np.hypot(p[..., 0], p[..., 1])))
+    lon = np.degrees(np.arctan2(p[..., 1], p[..., 0]))
+    return lat, lon
 
-    # Interpolate to get lat/lon at midpoints
-    lat_list = np.interp(midpoints, [0, 1], [coord_origin[0], coord_destin[0]])
-    lon_list = np.interp(midpoints, [0, 1], [coord_origin[1], coord_destin[1]])
+def great_circle_points(lat1, lon1, lat2, lon2, fractions):
+    # Positions at the given fractions (0 = origin, 1 = destination) along the geodesic; all inputs broadcast
+    a, b, omega = _great_circle_setup(lat1, lon1, lat2, lon2)
+    return _slerp(a, b, omega, fractions)
 
+# ---Trajectory Sampling---
 
-    phases = test_flight_profile_df["Phase"].tolist()
-    durations = test_flight_profile_df["Duration (min)"].tolist()
+def _trajectory_arrays(origin_lat, origin_lon, dest_lat, dest_lon, profile_df, step_km):
+    # Column arrays behind sample_trajectories(), with phases as positions in the profile
+    profile = as_flight_profile(profile_df)
+    origin_lat, origin_lon, dest_lat, dest_lon = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(a, dtype=np.float64)) for a in (origin_lat, origin_lon, dest_lat, dest_lon))
+    )
+
+    durations_s = profile.durations_s
+    altitudes_ft = profile.altitudes_ft
+    phase_distances = profile.speeds_kts * durations_s
+    phase_ratios = phase_distances / phase_distances.sum()
+    cumulative_ratios = np.concatenate([[0], np.cumsum(phase_ratios)])
+    phase_start_s = np.concatenate([[0], np.cumsum(durations_s)])[:-1]
+
+    # Ragged layout: flight i owns points offsets[i]:offsets[i + 1]
+    a, b, omega = _great_circle_setup(origin_lat, origin_lon, dest_lat, dest_lon)
+    route_km = omega * EARTH_RADIUS_KM
+    n_points = np.ceil(route_km / step_km).astype(np.int64) + 1
+    offsets = np.concatenate([[0], np.cumsum(n_points)])
+    flight = np.repeat(np.arange(len(n_points)), n_points)
+    k = np.arange(offsets[-1]) - offsets[flight]
+
+    distance_km = np.minimum(k * step_km, route_km[flight])
+    fractions = np.divide(distance_km, route_km[flight], out=np.zeros_like(distance_km), where=route_km[flight] > 0)
+
+    # Phase and time from the along-track fraction
+    phase = np.clip(np.searchsorted(cumulative_ratios, fractions, side="right") - 1, 0, len(phase_ratios) - 1)
+    within = np.divide(
+        fractions - cumulative_ratios[phase], phase_ratios[phase],
+        out=np.ones_like(fractions), where=phase_ratios[phase] > 0,
+    )
+    time_s = phase_start_s[phase] + within * durations_s[phase]
+
+    lat, lon = _slerp(a[flight], b[flight], omega[flight], fractions)
+
+    return {
+        "Flight": flight,
+        "Phase": phase,
+        "Time (s)": time_s,
+        "Distance (km)": distance_km,
+        "Altitude (ft)": altitudes_ft[phase],
+        "Latitude": lat,
+        "Longitude": lon,
+    }
+
+def sample_trajectories(origin_lat, origin_lon, dest_lat, dest_lon, profile_df, step_km=10.0):
+    # Dense great-circle trajectories for many O-D pairs flown with the same profile, one row per point.
+    # Points are spaced step_km apart along track (plus the destination); phases share the route in proportion
+    # to speed x duration, as in map_flight_path(). Phases that cover no distance (e.g. taxi) get no points.
+    profile = as_flight_profile(profile_df)
+    columns = _trajectory_arrays(origin_lat, origin_lon, dest_lat, dest_lon, profile, step_km)
+    columns["Phase"] = np.asarray(profile.phases, dtype=object)[columns["Phase"]]
+    return pd.DataFrame(columns)
+
+def build_flight_path(coord_origin, coord_destin, test_flight_profile_df):
+    # One point per phase (segment midpoints on the great circle) and the map centre, without touching disk.
+    # Accepts a FlightProfile, a profile DataFrame or a path.
+    profile = as_flight_profile(test_flight_profile_df)
+    start_loc = tuple(float(c) for c in great_circle_points(*coord_origin, *coord_destin, 0.5))
+
+    # --- Temporarily adding equidistant spacing between coordinates
+    # Cumulative share of the route at each phase boundary (phase distance = speed x duration)
+    phase_distances = profile.speeds_kts * profile.data["duration_min"]
+    cumulative_ratios = np.concatenate([[0], np.cumsum(phase_distances / phase_distances.sum())])
+
+    # Use midpoints of each segment for placement
+    midpoints = (cumulative_ratios[:-1] + cumulative_ratios[1:]) / 2
+
+    # Great-circle positions at midpoints
+    lat_list, lon_list = great_circle_points(*coord_origin, *coord_destin, midpoints)
 
     flight_path_df = pd.DataFrame({
-        "Phase": phases,
-        "Duration (min)": durations,
+        "Phase": list(profile.phases),
+        "Duration (min)": profile.data["duration_min"],
         "Latitude": lat_list,
         "Longitude": lon_list
     })
 
+    return flight_path_df, start_loc
+
+def map_flight_path():
+    current_dir = os.path.dirname(__file__)
+    airports_csv_path = os.path.join(current_dir, "..", "output/routes", "origin_destination_data.csv")
+    test_flight_profile_csv_path = os.path.join(current_dir, "..", "flight-profiles", "test_flight_profile.csv")
+
+    airports_df = read_csv(airports_csv_path)
+    test_flight_profile_df = read_csv(test_flight_profile_csv_path)
+
+    origin_data = airports_df.iloc[0]
+    destin_data = airports_df.iloc[1]
+
+    coord_origin = (float(origin_data["Latitude"]), float(origin_data["Longitude"]))
+    coord_destin = (float(destin_data["Latitude"]), float(destin_data["Longitude"]))
+
+    with span("build_flight_path"):
+        flight_path_df, start_loc = build_flight_path(coord_origin, coord_destin, test_flight_profile_df)
+
     output_path = os.path.join(current_dir, "..", "output", "routes", "flight_path.csv")
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    flight_path_df.to_csv(output_path, index=False)
+    to_csv(flight_path_df, output_path, index=False)
 
     return start_loc
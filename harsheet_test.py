@@ -1,29 +1,48 @@
-import plotly.graph_objects as go
 import streamlit as st
 import pandas as pd
-import json
-from plot_emissions import plot_fuel_flow_summary
+import numpy as np
 import os
-import streamlit.components.v1 as components
-from streamlit.components.v1 import iframe
+import uuid
+from app_cache import (
+    PROFILE_PATH, input_key, get_engine_registry, get_airport_index, get_airport_labels,
+    get_flight_profile, get_emissions_summary, get_summary_figures, get_job_queue, get_result_cache, render_route_maps,
+)
+from job_queue import DONE, FAILED
+from pipeline import Route
+from plot_emissions import (
+    update_bar_summary, update_pie_summary, update_fuel_flow_summary, update_emissions_line_summary,
+    plot_duration_sweep,
+)
+from what_if import WhatIfEvaluator
+import instrumentation
+from instrumentation import span
 
 st.set_page_config(page_title="Flight Emissions Configuration", layout="centered")
 
+# Diagnostics: while the toggle in the diagnostics panel is on (default: AERO_INSTRUMENT=1), this rerun's spans
+# go to a recorder of its own; other sessions in the same server process are not affected
+if st.session_state.get("record_spans", instrumentation.is_enabled()):
+    span_recorder = instrumentation.Recorder().activate()
+else:
+    span_recorder = None
+    instrumentation.deactivate()
+
 # Load engine data
-with open("data/engines-data.json") as f:
-    engine_data = json.load(f)
+with span("get_engine_registry"):
+    engine_registry = get_engine_registry()
 
 # Load phases
-phases_df = pd.read_csv("output/emissions/emissions_summary.csv")
-phase_options = phases_df[phases_df['Phase'] != 'Total']['Phase'].tolist()
-engine_options = list(engine_data.keys())
+with span("get_flight_profile"):
+    profile_df = get_flight_profile(PROFILE_PATH, os.path.getmtime(PROFILE_PATH))
+phase_options = profile_df['Phase'].tolist()
+engine_options = engine_registry.names
 
 # Title
 st.title("Configure Flight Phases")
 
 # Engine selection
 selected_engine = st.selectbox("Select Engine", engine_options)
-engine_info = engine_data[selected_engine]
+engine_info = engine_registry.engine_info(selected_engine)
 
 
 col1, col2 = st.columns(2)
@@ -52,24 +71,9 @@ with st.expander("📊 Phase Emission Details", expanded=False):
         st.markdown(emission_md)
     
 
-# Phase selection
-selected_phase = st.selectbox("Select Phase:", phase_options)
-phase_duration = st.number_input(f"Enter duration for {selected_phase} (in s)", min_value=0)
-
-# Load and process airport data
-airport_df = pd.read_csv("data/airports.csv")
-
-# Drop rows where lat/lon & iata/icao code is missing
-airport_df = airport_df.dropna(subset=['lat_decimal', 'lon_decimal', 'iata_code', 'icao_code'])
-
-# Format labels
-airport_df['label'] = airport_df.apply(
-    lambda row: f"{row['iata_code']}/{row['icao_code']} – {row['name']} – {row['city']} – {row['country']}",
-    axis=1
-)
-
-# Insert placeholder at the top
-airport_labels = ["-- Select an Airport --"] + airport_df['label'].tolist()
+# Load airport labels (rows with missing lat/lon or iata/icao code are dropped)
+with span("get_airport_labels"):
+    airport_labels = ["-- Select an Airport --"] + get_airport_labels()
 
 # Display section header
 st.markdown("### ✈️ Select Airports")
@@ -78,36 +82,98 @@ st.caption("Format: IATA/ICAO – Airport – City – Country")
 # Select origin
 origin_label = st.selectbox("Select Origin Airport", airport_labels, key="origin")
 
-# Filter destination options to exclude origin
-filtered_dest_df = airport_df[airport_df['label'] != origin_label]
-
 # Select destination
 destination_label = st.selectbox("Select Destination Airport", airport_labels, key="destination")
 
-def embed_emission_map(map_path, height = 600):
-    if os.path.exists(map_path):
-        with open(map_path, 'r', encoding= 'utf-8') as f:
-            html_data = f.read()
-        components.html(html_data, height = height, scrolling= False)
-    else:
-        st.error("Map file not found")
+def embed_map(name, html_data, height = 600):
+    import streamlit.components.v1 as components
 
-def embed_noise_map(noise_map_path, height = 600):
-    if os.path.exists(noise_map_path):
-        with open(noise_map_path, 'r', encoding= 'utf-8') as f:
-            html_data = f.read()
+    with span(f"embed_{name}_map") as sp:
         components.html(html_data, height = height, scrolling= False)
-    else:
-        st.error("Map file not found")        
-        
+        sp.add_bytes(len(html_data.encode("utf-8")))
+
+@st.fragment(run_every=0.5)
+def map_progress(results_key):
+    # Polls the background map job; once it has finished, a full rerun picks the maps up from the artifact store
+    job = get_job_queue().get(results_key)
+    if job is None or job.status == DONE:
+        st.rerun()
+    st.progress(job.progress, text=f"🗺️ {job.message}")
+
+
+def retry_maps():
+    # Button callback: the next submit replaces the failed map job
+    st.session_state["retry_maps"] = True
+
+def reset_what_if():
+    # Button callback (runs before the rerun): back to the profile's durations, sliders included
+    st.session_state["what_if"]["evaluator"].reset()
+    for key in [k for k in st.session_state if k.startswith("what_if_duration_")]:
+        del st.session_state[key]
+
+@st.fragment
+def what_if_charts(results_key, engine):
+    # Phase-duration what-if. Runs as a fragment, so moving the slider reruns only this function: the session's
+    # evaluator updates the edited phase row and the totals, and the figures get the new data in place.
+    state = st.session_state.get("what_if")
+    if state is None or state["key"] != results_key:
+        with span("what_if_setup"):
+            state = {
+                "key": results_key,
+                "evaluator": WhatIfEvaluator(
+                    profile_df, engine, get_emissions_summary(results_key, engine, PROFILE_PATH), engine_registry,
+                ),
+                "figures": get_summary_figures(results_key, engine, PROFILE_PATH),
+            }
+        st.session_state["what_if"] = state
+    evaluator, figures = state["evaluator"], state["figures"]
+
+    # Phase selection
+    selected_phase = st.selectbox("Select Phase:", phase_options, key="what_if_phase")
+    i = evaluator.phase_index(selected_phase)
+    max_duration = int(max(3 * evaluator.base_durations[i], 600))
+    phase_duration = st.slider(
+        f"Duration for {selected_phase} (in s)", 0, max_duration, int(round(evaluator.durations[i])),
+        key=f"what_if_duration_{i}",
+    )
+    st.button("Reset durations", on_click=reset_what_if)
+
+    with span("what_if_update"):
+        summary = evaluator.set_duration(selected_phase, phase_duration)
+        update_bar_summary(figures["bar"], summary)
+        update_pie_summary(figures["pie"], summary)
+        update_fuel_flow_summary(figures["fuel_flow"], summary)
+        update_emissions_line_summary(figures["emissions_line"], summary)
+        sweep_fig = plot_duration_sweep(
+            evaluator.sweep(selected_phase, np.linspace(0, max_duration, 200)), selected_phase, phase_duration,
+        )
+
+    with span("render_charts"):
+        st.markdown("### 🔁 What-If: Flight Totals vs. Phase Duration")
+        st.plotly_chart(sweep_fig, use_container_width=True)
+
+        st.markdown("### 📊 Bar Plot: Emissions by Phase")
+        st.plotly_chart(figures["bar"], use_container_width=True)
+
+        st.markdown("### 🥧 Pie Chart: Emission Contribution Breakdown")
+        st.plotly_chart(figures["pie"], use_container_width=True)
+
+        st.markdown("### ⛽ Area Plot: Fuel Flow Over Time")
+        st.plotly_chart(figures["fuel_flow"], use_container_width=True)
+
+        st.markdown("### 📉 Line Plot: Emissions Over Time")
+        st.plotly_chart(figures["emissions_line"], use_container_width=True)
+
 
 if origin_label != "-- Select an Airport --" and destination_label != "-- Select an Airport --":
-    origin_info_df = airport_df[airport_df['label'] == origin_label]
-    dest_info_df = airport_df[airport_df['label'] == destination_label]
+    # Resolve the selections through the airport index by ICAO code (labels start with "IATA/ICAO – ")
+    airport_index = get_airport_index()
+    origin_icao = origin_label.split(" – ")[0].split("/")[-1]
+    dest_icao = destination_label.split(" – ")[0].split("/")[-1]
 
-    if not origin_info_df.empty and not dest_info_df.empty:
-        origin_info = origin_info_df.iloc[0]
-        dest_info = dest_info_df.iloc[0]
+    if origin_icao in airport_index and dest_icao in airport_index:
+        origin_info = airport_index.lookup(origin_icao)
+        dest_info = airport_index.lookup(dest_icao)
 
         st.markdown(f"✈️ **Route:** {origin_info['iata_code']} → {dest_info['iata_code']}")
 
@@ -124,46 +190,80 @@ if origin_label != "-- Select an Airport --" and destination_label != "-- Select
             }
         ])
 
-        summary_df = pd.read_csv("output/emissions/emissions_summary.csv")
+        route = (origin_info['icao_code'], dest_info['icao_code'])
+        results_key = input_key(selected_engine, PROFILE_PATH, route)
+
+        # Map jobs belong to this session; a job for another route or engine is no longer wanted
+        job_queue = get_job_queue()
+        job_group = st.session_state.setdefault("job_group", uuid.uuid4().hex)
+        if st.session_state.get("saved_results_key") != results_key:
+            job_queue.release(job_group)
 
         with st.form("save_form"):
             submit = st.form_submit_button("Save to CSV")
-            if submit:
-                csv_path = "output/origin_destination_data.csv"
-                input_data.to_csv(csv_path, index=False)
-                st.success("Save Successful!")
-
-                st.markdown("---")
-                st.subheader("📈 Emission Visualizations")
 
-                from plot_emissions import plot_bar_summary, plot_pie_summary, plot_fuel_flow_summary, plot_emissions_line_summary
+        if submit:
+            csv_path = "output/origin_destination_data.csv"
+            instrumentation.to_csv(input_data, csv_path, index=False)
+            st.session_state["saved_results_key"] = results_key
+            st.success("Save Successful!")
 
-                st.markdown("### 📊 Bar Plot: Emissions by Phase")
-                st.plotly_chart(plot_bar_summary(summary_df), use_container_width=True)
+        # Results stay up for the saved inputs, so what-if edits (and other reruns) don't hide them
+        if st.session_state.get("saved_results_key") == results_key:
+            st.markdown("---")
+            st.subheader("📈 Emission Visualizations")
 
-                st.markdown("### 🥧 Pie Chart: Emission Contribution Breakdown")
-                st.plotly_chart(plot_pie_summary(summary_df), use_container_width=True)
+            # Maps are built off the script thread; the charts below stay interactive meanwhile
+            with span("submit_map_job"):
+                map_job = job_queue.submit(
+                    results_key, render_route_maps, Route.from_dataframe(input_data), selected_engine, profile_df,
+                    cache=get_result_cache(), group=job_group, retry=st.session_state.pop("retry_maps", False),
+                )
 
-                st.markdown("### ⛽ Area Plot: Fuel Flow Over Time")
-                st.plotly_chart(plot_fuel_flow_summary(summary_df), use_container_width=True)
+            what_if_charts(results_key, selected_engine)
 
-                st.markdown("### 📉 Line Plot: Emissions Over Time")
-                st.plotly_chart(plot_emissions_line_summary(summary_df), use_container_width=True)
-                
+            if map_job.status == DONE:
                 st.markdown("## 🗺️ Emission Route Map")
-                emission_map_path = ("output/routes/flight_path_emissions_map.html")
-                embed_emission_map(emission_map_path)
+                embed_map("emission", map_job.result["maps"]["emissions"])
 
                 st.markdown('## 🔊 Noise Map Visualization')
-                noise_map_path = ("output/routes/flight_path_noise_map.html")
-                embed_noise_map(noise_map_path)
+                embed_map("noise", map_job.result["maps"]["noise"])
+            elif map_job.status == FAILED:
+                st.error(f"Map rendering failed: {map_job.error}")
+                st.button("Retry", key="retry_maps_button", on_click=retry_maps)
+            else:
+                map_progress(results_key)
     else:
         st.error("Could not find selected airport details. Please reselect.")
 else:
     st.warning("Please select both origin and destination airports.")
 
+# Diagnostics panel: per-stage breakdown of this rerun
+with st.expander("🩺 Diagnostics", expanded=False):
+    st.toggle("Record timings and memory", value=instrumentation.is_enabled(), key="record_spans",
+              help="Applies from the next rerun. Timings include Streamlit cache hits and misses; "
+                   "memory tracing slows Python-heavy stages down. Peak memory is left blank for stages that "
+                   "overlapped with another session's.")
+    spans = list(span_recorder.finished) if span_recorder is not None else []
+    if spans:
+        spans_df = instrumentation.spans_to_dataframe(spans)
+        st.dataframe(
+            pd.DataFrame({
+                "Stage": spans_df["name"],
+                "Wall (ms)": (spans_df["wall_s"] * 1e3).round(2),
+                "Bytes": spans_df["bytes"],
+                "Peak memory (KB)": (spans_df["peak_bytes"] / 1024).round(1),
+            }),
+            hide_index=True, use_container_width=True,
+        )
+        st.caption(f"Top-level total: {sum(s.wall_s for s in spans if s.parent is None) * 1e3:.1f} ms")
+        st.download_button(
+            "Download spans (JSON lines)",
+            instrumentation.to_jsonl(spans),
+            file_name="spans.jsonl", mime="application/json",
+        )
+    else:
+        st.caption("No spans recorded for this rerun. Turn recording on, or set AERO_INSTRUMENT=1.")
 
-
-
-
-
+if span_recorder is not None:
+    span_recorder.close()
@@ -0,0 +1,321 @@
+import collections
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+import tracemalloc
+import weakref
+
+import pandas as pd
+
+# Lightweight spans around pipeline stages and I/O calls: wall time, bytes read/written and tracemalloc peak.
+#
+#     with span("read_csv", path=path) as sp:
+#         df = pd.read_csv(path)
+#         sp.add_file(path)
+#
+# Spans nest (per thread); each one's peak is the highest traced memory above what was allocated when it opened,
+# including its children. tracemalloc is process-wide, so peaks are only measured while one thread (or Recorder)
+# has spans open: a span that opens while another thread has measured spans open, or that is overlapped by one,
+# gets peak_bytes=None rather than a peak mixed with (or reset by) the other thread. Allocations of threads
+# that record no spans at all are still counted. Turned on process-wide by AERO_INSTRUMENT=1 (or enable()); when off, span() returns a
+# shared no-op object, so instrumented code pays one flag check. With AERO_INSTRUMENT_FILE set, every finished
+# top-level span tree is appended to that file as JSON lines.
+#
+# Without a Recorder, each thread keeps only its last THREAD_SPAN_LIMIT finished spans (server and worker
+# threads live as long as the process), and a tree exported to AERO_INSTRUMENT_FILE is dropped once written.
+#
+# A Recorder collects spans for one context only (e.g. one Streamlit session's rerun) without switching
+# recording on for anyone else:
+#
+#     recorder = Recorder().activate()       # spans in this context (thread) now go to the recorder
+#     ...
+#     recorder.finished
+#
+# tracemalloc runs only while something wants memory peaks (enable() with trace_memory, or a live Recorder with
+# trace_memory); once neither does, it is stopped again if this module started it.
+
+ENV_FLAG = "AERO_INSTRUMENT"
+ENV_FILE = "AERO_INSTRUMENT_FILE"
+THREAD_SPAN_LIMIT = 1000
+
+_enabled = os.environ.get(ENV_FLAG, "").lower() not in ("", "0", "false", "no")
+_trace_memory = True
+_export_path = os.environ.get(ENV_FILE) or None
+_ids = itertools.count(1)
+_local = threading.local()
+_recorder = contextvars.ContextVar("aero_recorder", default=None)
+
+_tracing_lock = threading.Lock()
+_started_tracing = False     # tracemalloc was started here (and is ours to stop)
+_memory_recorders = 0        # Live recorders that trace memory
+_memory_spans = {}           # id(span state) -> its open spans that measure memory
+_memory_overlaps = 0         # Spans opened while another state had measured spans open
+
+
+def _update_tracing():
+    # Starts or stops tracemalloc to match what is wanted right now
+    global _started_tracing
+    with _tracing_lock:
+        wanted = (_enabled and _trace_memory) or _memory_recorders > 0
+        if wanted and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracing = True
+        elif not wanted and _started_tracing:
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+            _started_tracing = False
+
+def enable(trace_memory=True, export_path=None):
+    global _enabled, _trace_memory, _export_path
+    _enabled = True
+    _trace_memory = trace_memory
+    if export_path is not None:
+        _export_path = export_path
+    _update_tracing()
+
+def disable():
+    global _enabled
+    _enabled = False
+    _update_tracing()
+
+def is_enabled():
+    return _enabled
+
+if _enabled:
+    enable(export_path=_export_path)
+
+
+class _SpanState:
+    # Open spans and finished spans of one thread (the last max_finished), or of one Recorder (all of them)
+    def __init__(self, trace_memory, max_finished=None):
+        self.stack = []
+        self.finished = [] if max_finished is None else collections.deque(maxlen=max_finished)
+        self.trace_memory = trace_memory
+
+
+def _release_memory_recorder():
+    global _memory_recorders
+    with _tracing_lock:
+        _memory_recorders -= 1
+    _update_tracing()
+
+
+class Recorder(_SpanState):
+
+    def __init__(self, trace_memory=True):
+        super().__init__(trace_memory)
+        self._release = None
+        if trace_memory:
+            global _memory_recorders
+            with _tracing_lock:
+                _memory_recorders += 1
+            # Released by close() or, at the latest, when the recorder is garbage collected
+            self._release = weakref.finalize(self, _release_memory_recorder)
+            _update_tracing()
+
+    def activate(self):
+        # Spans in the current context go to this recorder from now on
+        _recorder.set(self)
+        return self
+
+    def close(self):
+        if self._release is not None:
+            self._release()
+
+def deactivate():
+    # Back to the process-wide switch for the current context
+    _recorder.set(None)
+
+
+def _state():
+    recorder = _recorder.get()
+    if recorder is not None:
+        return recorder
+    if not hasattr(_local, "state"):
+        _local.state = _SpanState(trace_memory=None, max_finished=THREAD_SPAN_LIMIT)
+    return _local.state
+
+def finished_spans():
+    # Spans closed so far in this context (the active recorder, else this thread), in the order they closed
+    # (children before their parent)
+    return list(_state().finished)
+
+def reset():
+    # Forget finished spans in this context
+    _state().finished.clear()
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def add_bytes(self, n):
+        pass
+
+    def add_file(self, path):
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    __slots__ = ("id", "parent", "name", "depth", "attrs", "bytes", "start", "wall_s", "peak_bytes",
+                 "_t0", "_mem0", "_peak_seen", "_overlaps0", "_owner")
+
+    def __init__(self, name, attrs):
+        self.id = next(_ids)
+        self.name = name
+        self.attrs = attrs
+        self.bytes = 0
+        self.parent = None
+        self.depth = 0
+        self.wall_s = None
+        self.peak_bytes = None
+
+    def add_bytes(self, n):
+        self.bytes += int(n)
+
+    def add_file(self, path):
+        # Size of a file just read or written
+        self.bytes += os.path.getsize(path)
+
+    def __enter__(self):
+        self._owner = _state()     # Where the span is recorded, fixed for its lifetime
+        stack = self._owner.stack
+        if stack:
+            self.parent = stack[-1].id
+            self.depth = len(stack)
+
+        self._mem0 = None
+        trace_memory = self._owner.trace_memory
+        if (_trace_memory if trace_memory is None else trace_memory) and tracemalloc.is_tracing():
+            self._open_memory()
+
+        stack.append(self)
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.wall_s = time.perf_counter() - self._t0
+        stack = self._owner.stack
+        stack.pop()
+
+        if self._mem0 is not None:
+            self._close_memory(stack)
+
+        self._owner.finished.append(self)
+        if not stack and _export_path:
+            export_jsonl(_export_path, self._tree())
+            if not isinstance(self._owner, Recorder):
+                # Every finished span of a thread with no open spans belongs to this tree (or an exported one)
+                self._owner.finished.clear()
+        return False
+
+    def _open_memory(self):
+        # Starts measuring unless another thread's (or Recorder's) spans are measuring, since reset_peak() would
+        # wipe their peaks; either way every span measuring now is marked as overlapped
+        global _memory_overlaps
+        owner, stack = id(self._owner), self._owner.stack
+        with _tracing_lock:
+            if any(key != owner for key in _memory_spans):
+                _memory_overlaps += 1
+                return
+            _memory_spans[owner] = _memory_spans.get(owner, 0) + 1
+            current, peak = tracemalloc.get_traced_memory()
+            # The enclosing span's peak so far would be lost by the reset below
+            if stack and stack[-1]._mem0 is not None:
+                stack[-1]._peak_seen = max(stack[-1]._peak_seen, peak)
+            tracemalloc.reset_peak()
+            self._mem0 = current
+            self._peak_seen = current
+            self._overlaps0 = _memory_overlaps
+
+    def _close_memory(self, stack):
+        owner = id(self._owner)
+        with _tracing_lock:
+            _memory_spans[owner] -= 1
+            if not _memory_spans[owner]:
+                del _memory_spans[owner]
+            if _memory_overlaps != self._overlaps0:
+                return      # Another thread's spans ran meanwhile: the peak is not this span's alone
+            peak = max(self._peak_seen, tracemalloc.get_traced_memory()[1])
+        self.peak_bytes = peak - self._mem0
+        if stack and stack[-1]._mem0 is not None:
+            stack[-1]._peak_seen = max(stack[-1]._peak_seen, peak)
+
+    def _tree(self):
+        # This span and all of its finished descendants
+        ids, spans = {self.id}, []
+        for s in reversed(self._owner.finished):
+            if s.id in ids or s.parent in ids:
+                ids.add(s.id)
+                spans.append(s)
+        return spans[::-1]
+
+    def to_dict(self):
+        return {
+            "id": self.id, "parent": self.parent, "name": self.name, "depth": self.depth,
+            "start": self.start, "wall_s": self.wall_s, "bytes": self.bytes, "peak_bytes": self.peak_bytes,
+            **self.attrs,
+        }
+
+
+def span(name, **attrs):
+    if not _enabled and _recorder.get() is None:
+        return _NULL_SPAN
+    return Span(name, attrs)
+
+
+# ---Export---
+
+def to_jsonl(spans=None):
+    # One JSON object per line (default: this thread's finished spans)
+    spans = finished_spans() if spans is None else spans
+    return "".join(json.dumps(s.to_dict(), default=str) + "\n" for s in spans)
+
+def export_jsonl(path, spans=None):
+    # Appends spans to a JSON lines file
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(to_jsonl(spans))
+
+def spans_to_dataframe(spans=None):
+    # Spans in start order, names prefixed by nesting depth (leading spaces are stripped by most table widgets)
+    spans = finished_spans() if spans is None else spans
+    df = pd.DataFrame([s.to_dict() for s in spans], columns=["id", "parent", "name", "depth", "start", "wall_s", "bytes", "peak_bytes"])
+    df = df.sort_values("start", kind="mergesort").reset_index(drop=True)
+    df["peak_bytes"] = df["peak_bytes"].astype("float64")     # NaN where not measured
+    df["name"] = ["· " * d + n for d, n in zip(df["depth"], df["name"])]
+    return df
+
+
+# ---Instrumented I/O---
+
+def read_csv(path, **kwargs):
+    with span("read_csv", path=str(path)) as sp:
+        df = pd.read_csv(path, **kwargs)
+        sp.add_file(path)
+    return df
+
+def to_csv(df, path, **kwargs):
+    with span("write_csv", path=str(path)) as sp:
+        df.to_csv(path, **kwargs)
+        sp.add_file(path)
+
+def read_text(path):
+    with span("read_text", path=str(path)) as sp:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        sp.add_file(path)
+    return text
+
+def save_map(m, path):
+    with span("save_map", path=str(path)) as sp:
+        m.save(path)
+        sp.add_file(path)
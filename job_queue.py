@@ -0,0 +1,174 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Background jobs for slow, input-keyed work (map rendering) so the Streamlit script thread never waits on it.
+#
+#     queue = JobQueue()
+#     job = queue.submit(key, render, route, group=session_id)    # returns at once
+#     job.progress, job.message                                     # polled by the page
+#     job.result                                                    # once job.status == "done"
+#
+# Job functions take the Job as their first argument and call job.report(fraction, message) between stages;
+# report() raises JobCancelled once the job has been cancelled, which is how a running job stops (threads cannot
+# be interrupted). Finished results go to an in-memory LRU ArtifactStore under the job's key, so submitting the
+# same inputs again returns a finished job straight away.
+#
+# A failed job stays (so every rerun can show its error rather than starting it again) until it is submitted
+# with retry=True.
+#
+# Groups (e.g. one per browser session) hold on to at most one job: submitting a different key for the group
+# supersedes its previous job, which is cancelled once no other group still wants it.
+
+PENDING, RUNNING, DONE, FAILED, CANCELLED = "pending", "running", "done", "failed", "cancelled"
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class ArtifactStore:
+    # Thread-safe LRU of finished results keyed by input hash
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._items:
+                return default
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class Job:
+
+    def __init__(self, key):
+        self.key = key
+        self.status = PENDING
+        self.progress = 0.0
+        self.message = "Queued"
+        self.result = None
+        self.error = None
+        self.future = None
+        self.groups = set()
+        self._cancel = threading.Event()
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    def report(self, fraction, message=None):
+        # Called by the job function; stops it here when the job has been cancelled
+        if self._cancel.is_set():
+            raise JobCancelled(self.key)
+        self.progress = min(max(float(fraction), 0.0), 1.0)
+        if message is not None:
+            self.message = message
+
+    def cancel(self):
+        self._cancel.set()
+        if self.future is not None and self.future.cancel():
+            self.status = CANCELLED
+            self.message = "Cancelled"
+
+
+class JobQueue:
+
+    def __init__(self, max_workers=2, store=None):
+        self.store = ArtifactStore() if store is None else store
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="aero-job")
+        self._jobs = {}      # key -> queued, running or failed job
+        self._groups = {}    # group -> key of the job it holds
+        self._lock = threading.Lock()
+
+    def submit(self, key, fn, *args, group=None, retry=False, **kwargs):
+        # The job for key: finished from the store, the one already queued, running or failed, or a new one.
+        # retry=True replaces a failed job with a new run
+        with self._lock:
+            if group is not None and self._groups.get(group) not in (None, key):
+                self._release(group)
+
+            if key in self.store:
+                job = Job(key)
+                job.status, job.progress, job.message, job.result = DONE, 1.0, "Done", self.store.get(key)
+                return job
+
+            job = self._jobs.get(key)
+            if job is None or job.cancel_requested or (retry and job.status == FAILED):
+                job = Job(key)
+                self._jobs[key] = job
+                job.future = self._executor.submit(self._run, job, fn, args, kwargs)
+
+            if group is not None:
+                job.groups.add(group)
+                self._groups[group] = key
+            return job
+
+    def get(self, key):
+        # The queued, running or failed job for key, if any
+        with self._lock:
+            return self._jobs.get(key)
+
+    def release(self, group):
+        # The group no longer wants its job (e.g. the user changed the route)
+        with self._lock:
+            self._release(group)
+
+    def _release(self, group):
+        key = self._groups.pop(group, None)
+        job = self._jobs.get(key)
+        if job is None:
+            return
+        job.groups.discard(group)
+        if not job.groups:
+            job.cancel()
+            if job.status == CANCELLED:
+                self._jobs.pop(key, None)
+
+    def _run(self, job, fn, args, kwargs):
+        try:
+            job.report(0.0, "Starting")
+            job.status = RUNNING
+            result = fn(job, *args, **kwargs)
+            self.store.put(job.key, result)
+            job.result, job.progress, job.message, job.status = result, 1.0, "Done", DONE
+        except JobCancelled:
+            job.status, job.message = CANCELLED, "Cancelled"
+        except Exception as e:
+            job.error, job.message, job.status = e, f"Failed: {e}", FAILED
+        finally:
+            # Failed jobs stay until retried, so the page can show the error instead of resubmitting on every rerun
+            with self._lock:
+                if job.status != FAILED and self._jobs.get(job.key) is job:
+                    del self._jobs[job.key]
+
+    def shutdown(self):
+        for job in list(self._jobs.values()):
+            job.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
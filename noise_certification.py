@@ -0,0 +1,73 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from engine_registry import ROOT, NOISE_SHEET_PATH
+
+# Full EASA noise database (';'-separated); 123.csv is a ','-separated extract with the same columns
+NOISE_DATABASE_PATH = os.path.join(ROOT, "data", "aircraft_engine_combinations.csv")
+
+LEVEL_COLUMNS = ["FO(EPNdB)", "Lateral/Full Power(EPNdB)", "Approach(EPNdB)"]
+
+_indexes = {}   # In-process indexes keyed by (path, mtime)
+
+
+class NoiseCertificationIndex:
+    # One certification row per (aircraft type, engine): the latest certification, heaviest MTOM first.
+    # Aircraft can be given as TYPE ("A320") or TYPE-Version ("A320-214"); lookups are dict hits.
+
+    def __init__(self, sheet_df):
+        # Rows listing several engines ("CFM56-5B4/2P, ...") are not single combinations
+        sheet_df = sheet_df[~sheet_df["Engine"].str.contains(",", na=False)].dropna(subset=["TYPE", "Engine"])
+        sheet_df = sheet_df.sort_values(["Certif Date", "MTOM(kg)"], ascending=False, kind="mergesort")
+
+        self.rows = sheet_df.reset_index(drop=True)
+        self.levels = self.rows[LEVEL_COLUMNS].to_numpy(dtype=np.float64)          # (K, 3) FO, Lateral, Approach
+        self.n_engines = self.rows["Number of engines"].to_numpy(dtype=np.float64)
+
+        # First (best) row wins for every key
+        self._positions = {}
+        types = self.rows["TYPE"].astype(str).str.strip()
+        versions = self.rows["Version"].astype(str).str.strip()
+        engines = self.rows["Engine"].astype(str).str.strip()
+        for position, (aircraft_type, version, engine) in enumerate(zip(types, versions, engines)):
+            self._positions.setdefault((aircraft_type, engine), position)
+            self._positions.setdefault((f"{aircraft_type}-{version}", engine), position)
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, key):
+        return key in self._positions
+
+    def position(self, aircraft, engine):
+        return self._positions[(aircraft, engine)]
+
+    def positions(self, aircraft, engines):
+        # Row positions for arrays of combinations, -1 where a combination is not in the sheet
+        return np.fromiter((self._positions.get(key, -1) for key in zip(aircraft, engines)), dtype=np.intp)
+
+    def lookup(self, aircraft, engine):
+        # Full certification row (pandas Series) for one combination
+        return self.rows.iloc[self.position(aircraft, engine)]
+
+    def certification_levels(self, aircraft, engine):
+        # {"FO(EPNdB)": ..., "Lateral/Full Power(EPNdB)": ..., "Approach(EPNdB)": ...}
+        return dict(zip(LEVEL_COLUMNS, self.levels[self.position(aircraft, engine)]))
+
+
+def _read_sheet(path):
+    with open(path, encoding="utf-8") as f:
+        header = f.readline()
+    return pd.read_csv(path, sep=";" if header.count(";") > header.count(",") else ",")
+
+def load_noise_certification_index(path=None):
+    # Defaults to the full database when present, otherwise the 123.csv extract
+    if path is None:
+        path = NOISE_DATABASE_PATH if os.path.exists(NOISE_DATABASE_PATH) else NOISE_SHEET_PATH
+
+    key = (os.path.abspath(path), os.path.getmtime(path))
+    if key not in _indexes:
+        _indexes[key] = NoiseCertificationIndex(_read_sheet(path))
+    return _indexes[key]
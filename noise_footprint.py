@@ -0,0 +1,116 @@
+import numpy as np
+
+from emissions_calculator import FT_TO_M, phase_noise_references
+from geo.route_mapper import EARTH_RADIUS_KM, _unit_vectors, sample_trajectories
+from instrumentation import span
+
+# Ground noise footprint: received level on a lat/lon receptor grid from a sampled trajectory.
+#
+# Every trajectory point radiates its phase's certification level L_i, referenced to distance r_i (as in
+# calc_noise_emissions), with spherical spreading: a receptor at slant distance d hears L_i - 20 log10(d / r_i).
+# With K_i = 10^(L_i / 10) * r_i^2 that is 10 log10(K_i / d^2), so the loudest point for a receptor is the one
+# with the largest K_i / d^2, and logs are only taken once per receptor. Points on the ground are placed at their
+# reference distance, so a receptor right under them gets L_i, like calc_noise_attenuation() at zero altitude.
+#
+# The grid is evaluated in tiles of receptors (and chunks of points), so memory stays bounded for any grid size.
+
+EARTH_RADIUS_M = EARTH_RADIUS_KM * 1000
+
+
+def trajectory_sources(trajectory_df, aircraft_engine_data):
+    # Unit vectors (n, 3), source strengths K (n,) and effective heights (n,) m for a sample_trajectories() frame
+    levels, ref_dists = phase_noise_references(trajectory_df["Phase"], aircraft_engine_data)
+    alt_m = trajectory_df["Altitude (ft)"].to_numpy(dtype=np.float64) * FT_TO_M
+    heights = np.where(alt_m > 0, alt_m, ref_dists)
+
+    points = _unit_vectors(trajectory_df["Latitude"].to_numpy(dtype=np.float64), trajectory_df["Longitude"].to_numpy(dtype=np.float64))
+    strengths = 10 ** (levels / 10) * ref_dists ** 2
+    return points, strengths, heights
+
+def _longitude_span(lon):
+    # (west, east) of the shortest arc covering all longitudes: the circle minus the widest gap between them.
+    # For routes across the antimeridian east exceeds 180 (e.g. 139.8 -> 241.6 for Tokyo to Los Angeles).
+    lon = np.sort(np.mod(lon + 180, 360) - 180)
+    gaps = np.diff(np.append(lon, lon[0] + 360))
+    widest = np.argmax(gaps)
+    if widest == len(lon) - 1:
+        return lon[0], lon[-1]
+    return lon[widest + 1], lon[widest] + 360
+
+def grid_bounds(trajectory_df, margin_km=20.0, max_altitude_ft=None):
+    # (lat_min, lat_max, lon_min, lon_max) around the trajectory (or only its points at or below max_altitude_ft,
+    # e.g. the departure and arrival legs), widened by margin_km. The longitudes span the trajectory's shortest
+    # arc, so lon_max can exceed 180 when it crosses the antimeridian.
+    if max_altitude_ft is not None:
+        trajectory_df = trajectory_df[trajectory_df["Altitude (ft)"] <= max_altitude_ft]
+    lat = trajectory_df["Latitude"].to_numpy(dtype=np.float64)
+    lon_min, lon_max = _longitude_span(trajectory_df["Longitude"].to_numpy(dtype=np.float64))
+
+    margin_lat = np.degrees(margin_km / EARTH_RADIUS_KM)
+    margin_lon = margin_lat / max(np.cos(np.radians(np.abs(lat).max())), 1e-6)
+    return (
+        max(lat.min() - margin_lat, -90.0), min(lat.max() + margin_lat, 90.0),
+        lon_min - margin_lon, lon_max + margin_lon,
+    )
+
+def calc_noise_footprint(trajectory_df, aircraft_engine_data, grid_lat, grid_lon, tile_size=256,
+                         max_block=4_000_000, min_level=None):
+    # Received level (EPNdB) on the grid_lat x grid_lon receptor grid -> (len(grid_lat), len(grid_lon)).
+    # tile_size: receptors per tile side; max_block: receptor x point pairs evaluated at once.
+    # min_level: levels below it are not needed (returned as NaN), which lets each tile skip points that cannot
+    # reach it there.
+    grid_lat = np.asarray(grid_lat, dtype=np.float64)
+    grid_lon = np.asarray(grid_lon, dtype=np.float64)
+    points, strengths, heights = trajectory_sources(trajectory_df, aircraft_engine_data)
+
+    # Squared slant distance: chord^2 + h^2 = 2 R^2 (1 - u . v) + h^2, so per pair only a dot product is needed
+    offsets = 2 * EARTH_RADIUS_M ** 2 + heights ** 2
+    scale = 2 * EARTH_RADIUS_M ** 2
+    min_ratio = 0.0 if min_level is None else 10 ** (min_level / 10)
+
+    levels = np.full((len(grid_lat), len(grid_lon)), np.nan)
+    for i0 in range(0, len(grid_lat), tile_size):
+        for j0 in range(0, len(grid_lon), tile_size):
+            tile_lat, tile_lon = np.meshgrid(grid_lat[i0:i0 + tile_size], grid_lon[j0:j0 + tile_size], indexing="ij")
+            receptors = _unit_vectors(tile_lat.ravel(), tile_lon.ravel())            # (r, 3)
+
+            keep = slice(None)
+            if min_level is not None:
+                # Closest any receptor of the tile can be to each point: distance to the tile's centre minus its radius
+                centre = receptors.mean(axis=0)
+                centre /= np.linalg.norm(centre)
+                radius = np.sqrt(np.max(np.sum((receptors - centre) ** 2, axis=1)))
+                chord = np.maximum(np.linalg.norm(points - centre, axis=1) - radius, 0)
+                keep = strengths / ((chord * EARTH_RADIUS_M) ** 2 + heights ** 2) >= min_ratio
+                if not keep.any():
+                    continue
+
+            tile_points, tile_strengths, tile_offsets = points[keep], strengths[keep], offsets[keep]
+            best = np.zeros(len(receptors))
+            chunk = max(1, max_block // len(receptors))
+            for k0 in range(0, len(tile_points), chunk):
+                ratio = receptors @ tile_points[k0:k0 + chunk].T                        # (r, chunk) u . v
+                ratio *= -scale
+                ratio += tile_offsets[k0:k0 + chunk]                                     # d^2
+                np.divide(tile_strengths[k0:k0 + chunk], ratio, out=ratio)               # K / d^2
+                np.maximum(best, ratio.max(axis=1), out=best)
+
+            with np.errstate(divide="ignore"):
+                tile_levels = 10 * np.log10(best)
+            if min_level is not None:
+                tile_levels[best < min_ratio] = np.nan
+            levels[i0:i0 + tile_size, j0:j0 + tile_size] = tile_levels.reshape(tile_lat.shape)
+
+    return levels
+
+def route_noise_footprint(coord_origin, coord_destin, profile_df, aircraft_engine_data, n_lat=1000, n_lon=1000,
+                          step_km=1.0, margin_km=20.0, max_altitude_ft=None, min_level=None):
+    # Footprint of one flight: samples the route every step_km and evaluates an n_lat x n_lon grid around it.
+    # Returns (grid_lat, grid_lon, levels)
+    trajectory_df = sample_trajectories(*coord_origin, *coord_destin, profile_df, step_km=step_km)
+    lat_min, lat_max, lon_min, lon_max = grid_bounds(trajectory_df, margin_km, max_altitude_ft)
+    grid_lat = np.linspace(lat_min, lat_max, n_lat)
+    grid_lon = np.linspace(lon_min, lon_max, n_lon)
+    with span("noise_footprint", receptors=n_lat * n_lon, points=len(trajectory_df)):
+        levels = calc_noise_footprint(trajectory_df, aircraft_engine_data, grid_lat, grid_lon, min_level=min_level)
+    return grid_lat, grid_lon, levels
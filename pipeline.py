@@ -0,0 +1,254 @@
+import datetime
+import os
+import uuid
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from engine_registry import load_engine_registry
+from emissions_calculator import summarize_emissions, calc_phase_noise
+from flight_profile import as_flight_profile
+from noise_certification import load_noise_certification_index
+from geo.route_mapper import build_flight_path
+from instrumentation import span
+from result_cache import content_digest, result_key
+
+# In-memory pipeline: route mapping -> pollutant and noise calculation -> plotting -> map rendering.
+# Stages hand typed results to each other; writing files is left to optional sinks. With a ResultCache, the
+# emissions summary and flight path are read from (and stored to) disk, keyed on their inputs.
+# Plotting, map building and the Parquet store (pyarrow) are imported by the stages that use them, so batch runs
+# with make_figures=False, make_maps=False and no ParquetSink do not load them.
+
+
+# ---Typed Results---
+
+@dataclass(frozen=True)
+class Airport:
+    code: str
+    latitude: float
+    longitude: float
+
+    @property
+    def coord(self):
+        return (self.latitude, self.longitude)
+
+
+@dataclass(frozen=True)
+class Route:
+    origin: Airport
+    destination: Airport
+
+    @classmethod
+    def from_dataframe(cls, airports_df):
+        # Two rows shaped like output/origin_destination_data.csv (IATA_Code, Latitude, Longitude)
+        origin_data, destin_data = airports_df.iloc[0], airports_df.iloc[1]
+        return cls(
+            Airport(origin_data["IATA_Code"], float(origin_data["Latitude"]), float(origin_data["Longitude"])),
+            Airport(destin_data["IATA_Code"], float(destin_data["Latitude"]), float(destin_data["Longitude"])),
+        )
+
+    @classmethod
+    def from_codes(cls, origin, destination, airport_index):
+        airports = []
+        for code in (origin, destination):
+            airport = airport_index.lookup(code)
+            airports.append(Airport(code, float(airport["lat_decimal"]), float(airport["lon_decimal"])))
+        return cls(*airports)
+
+    def to_dataframe(self):
+        return pd.DataFrame([
+            {"IATA_Code": a.code, "Latitude": a.latitude, "Longitude": a.longitude}
+            for a in (self.origin, self.destination)
+        ])
+
+
+@dataclass
+class FlightPath:
+    points: pd.DataFrame    # One row per phase: Phase, Duration (min), Latitude, Longitude
+    start_loc: tuple        # Map centre
+
+
+@dataclass
+class PipelineResult:
+    route: Route
+    engine: str
+    aircraft: str
+    flight_path: FlightPath
+    summary: pd.DataFrame                           # Phase-wise emissions and noise, plus the "Total" row
+    figures: dict = field(default_factory=dict)     # plot_emissions figures by name
+    maps: dict = field(default_factory=dict)        # folium maps: "emissions", "noise"
+
+
+# ---Sinks---
+
+class FileSink:
+    # Persists each run in its own directory (<output_dir>/<run_id>/...), so concurrent runs never share files.
+    # Layout inside a run directory mirrors output/: routes/ and emissions/.
+
+    def __init__(self, output_dir=os.path.join("output", "runs"), write_figures=False):
+        self.output_dir = output_dir
+        self.write_figures = write_figures
+
+    def write(self, result, run_id=None):
+        run_dir = os.path.join(self.output_dir, run_id or uuid.uuid4().hex[:12])
+        routes_dir = os.path.join(run_dir, "routes")
+        emissions_dir = os.path.join(run_dir, "emissions")
+        os.makedirs(routes_dir, exist_ok=True)
+        os.makedirs(emissions_dir, exist_ok=True)
+
+        result.route.to_dataframe().to_csv(os.path.join(routes_dir, "origin_destination_data.csv"), index=False)
+        result.flight_path.points.to_csv(os.path.join(routes_dir, "flight_path.csv"), index=False)
+        result.summary.to_csv(os.path.join(emissions_dir, "emissions_summary.csv"), index=False)
+
+        map_files = {"emissions": "flight_path_emissions_map.html", "noise": "flight_path_noise_map.html"}
+        for name, m in result.maps.items():
+            m.save(os.path.join(routes_dir, map_files[name]))
+
+        if self.write_figures:
+            for name, fig in result.figures.items():
+                fig.write_json(os.path.join(emissions_dir, f"{name}.json"))
+
+        return run_dir
+
+
+class ParquetSink:
+    # Appends each run's summary to the partitioned Parquet emissions dataset (see emissions_store)
+
+    def __init__(self, root=None, partition_cols=None, date=None):
+        from emissions_store import DATASET_DIR, PARTITION_COLS
+
+        self.root = DATASET_DIR if root is None else root
+        self.partition_cols = PARTITION_COLS if partition_cols is None else partition_cols
+        self.date = date
+
+    def write(self, result, run_id=None):
+        from emissions_store import write_emissions_summary
+
+        return write_emissions_summary(
+            result.summary, self.root, self.partition_cols,
+            flight_id=run_id or uuid.uuid4().hex,
+            date=self.date or datetime.date.today().isoformat(),
+            engine=result.engine,
+            aircraft=result.aircraft,
+            origin=result.route.origin.code,
+            destination=result.route.destination.code,
+        )
+
+
+# ---Pipeline---
+
+class EmissionsPipeline:
+    # Everything that does not depend on the route (engine data, certification levels, the emissions summary)
+    # is computed once per pipeline and reused by every run.
+
+    def __init__(self, profile_df, engine="CFM56-5B4/2P", aircraft="A320", noise_index=None,
+                 make_figures=True, make_maps=True, map_mode="circles", sinks=(), cache=None):
+        self.profile_df = profile_df
+        self.profile = as_flight_profile(profile_df)
+        self.engine = engine
+        self.aircraft = aircraft
+        self.make_figures = make_figures
+        self.make_maps = make_maps
+        self.map_mode = map_mode
+        self.sinks = list(sinks)
+        self.cache = cache
+
+        if noise_index is None:
+            noise_index = load_noise_certification_index()
+        self.aircraft_engine_data = noise_index.lookup(aircraft, engine)
+
+        self._summary = None
+
+    def cache_key(self, stage, route=None):
+        # Result cache key of a stage: its inputs, including the engine data version and certification row
+        inputs = {"profile": content_digest(list(self.profile.phases), self.profile.data)}
+        if stage != "flight_path":
+            inputs.update(
+                engine=self.engine, aircraft=self.aircraft, engine_data=load_engine_registry().signature,
+                certification=content_digest(self.aircraft_engine_data),
+            )
+        if route is not None:
+            inputs["route"] = [(a.code, a.latitude, a.longitude) for a in (route.origin, route.destination)]
+        if stage == "maps":
+            inputs["map_mode"] = self.map_mode
+        return result_key(stage, **inputs)
+
+    def map_route(self, route):
+        if self.cache is not None:
+            key = self.cache_key("flight_path", route)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return FlightPath(cached["points"], tuple(cached["start_loc"]))
+
+        points, start_loc = build_flight_path(route.origin.coord, route.destination.coord, self.profile)
+        if self.cache is not None:
+            self.cache.put(key, {"points": points, "start_loc": list(start_loc)})
+        return FlightPath(points, start_loc)
+
+    def calc_emissions(self):
+        # Pollutants and per-phase ground noise; independent of the route
+        if self._summary is None and self.cache is not None:
+            cached = self.cache.get(self.cache_key("summary"))
+            if cached is not None:
+                self._summary = cached["summary"]
+        if self._summary is None:
+            summary = summarize_emissions(self.profile, self.engine)
+            phase_rows = summary["Phase"] != "Total"
+            summary.loc[phase_rows, "Noise Emissions (EPNdB)"] = calc_phase_noise(self.profile, self.aircraft_engine_data)
+            self._summary = summary
+            if self.cache is not None:
+                self.cache.put(self.cache_key("summary"), {"summary": summary})
+        return self._summary.copy()
+
+    def plot(self, summary):
+        from plot_emissions import plot_bar_summary, plot_pie_summary, plot_fuel_flow_summary, plot_emissions_line_summary
+
+        return {
+            "bar": plot_bar_summary(summary),
+            "pie": plot_pie_summary(summary),
+            "fuel_flow": plot_fuel_flow_summary(summary),
+            "emissions_line": plot_emissions_line_summary(summary),
+        }
+
+    def render_maps(self, route, flight_path, summary):
+        from geo.flight_map_plotter import build_pollutant_emissions_map, build_noise_emissions_map
+
+        return {
+            "emissions": build_pollutant_emissions_map(
+                route.origin.coord, route.destination.coord, flight_path.points, summary, flight_path.start_loc,
+                origin_label=f"{route.origin.code} Airport (Origin)",
+                destin_label=f"{route.destination.code} Airport (Destination)",
+                mode=self.map_mode,
+            ),
+            "noise": build_noise_emissions_map(route.destination.coord, flight_path.points, summary, flight_path.start_loc),
+        }
+
+    def run(self, route, progress=None):
+        # progress(fraction, stage) is called before each stage, e.g. a background Job's report()
+        def report(fraction, stage):
+            if progress is not None:
+                progress(fraction, stage)
+
+        with span("pipeline.run", origin=route.origin.code, destination=route.destination.code, engine=self.engine):
+            report(0.0, "Mapping route")
+            with span("map_route"):
+                flight_path = self.map_route(route)
+            report(0.1, "Calculating emissions")
+            with span("calc_emissions"):
+                summary = self.calc_emissions()
+
+            result = PipelineResult(route, self.engine, self.aircraft, flight_path, summary)
+            if self.make_figures:
+                report(0.3, "Plotting")
+                with span("plot"):
+                    result.figures = self.plot(summary)
+            if self.make_maps:
+                report(0.5, "Building maps")
+                with span("render_maps"):
+                    result.maps = self.render_maps(route, flight_path, summary)
+
+            for sink in self.sinks:
+                report(0.9, f"Writing {type(sink).__name__}")
+                with span("sink.write", sink=type(sink).__name__):
+                    sink.write(result)
+        return result
@@ -1,61 +1,69 @@
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+import numpy as np
 import pandas as pd
 
-def plot_bar_summary(summary_df):
-    phases = summary_df["Phase"]
-    co_emm = summary_df["CO Emissions (g)"]
-    nox_emm = summary_df["NOx Emissions (g)"]
-    hc_emm = summary_df["HC Emissions (g)"]
+# ---Figure Templates---
+# Each figure's layout and trace styling is built once and cached. plot_*() copies the template and fills in
+# the data; update_*() swaps new data into an existing figure in place, without rebuilding the layout.
+# plotly is imported by the template builders and _from_template(), so it loads on the first plot, not on import.
+
+WEBGL_THRESHOLD = 1000  # Points per trace above which line/area traces are drawn with WebGL (Scattergl)
+
+_templates = {}
+
+def _use_webgl(n_points):
+    return n_points > WEBGL_THRESHOLD
+
+def _from_template(name, build, *args):
+    import plotly.graph_objects as go
+
+    key = (name,) + args
+    if key not in _templates:
+        _templates[key] = build(*args)
+    return go.Figure(_templates[key])
+
+
+def _build_bar_template():
+    import plotly.graph_objects as go
 
     fig = go.Figure([
         go.Bar(
-            name='HC Emissions', 
+            name='HC Emissions',
             legendgroup='HC',
-            x=phases, 
-            y=hc_emm, 
-            text=hc_emm.apply(lambda x: f'{x:.3f}'), 
-            textposition='inside', 
+            textposition='inside',
             textfont=dict(
                     size=10,              # Font size of the text on bars
                     color='white'         # Font color (e.g., 'white' if inside bar)
                 ),
             hovertemplate='Pollutant: HC<br>Phase: %{x}<br>Emissions: %{y:.3f} g<extra></extra>',
-            marker=dict(color='#009E73') 
+            marker=dict(color='#009E73')
             ),
         go.Bar(
-            name='NOx Emissions', 
+            name='NOx Emissions',
             legendgroup='NOx',
-            x=phases, 
-            y=nox_emm,
-            text=nox_emm.apply(lambda x: f'{x:.3f}'),
             textposition='inside',
             textfont=dict(
                     size=10,              # Font size of the text on bars
                     color='white'         # Font color (e.g., 'white' if inside bar)
                 ),
             hovertemplate='Pollutant: NOx<br>Phase: %{x}<br>Emissions: %{y:.3f} g<extra></extra>',
-            marker=dict(color='#E69F00') 
+            marker=dict(color='#E69F00')
             ),
         go.Bar(
-            name='CO Emissions', 
+            name='CO Emissions',
             legendgroup='CO',
-            x=phases, 
-            y=co_emm,
-            text=co_emm.apply(lambda x: f'{x:.3f}'),
             textposition='inside',
             textfont=dict(
                     size=10,              # Font size of the text on bars
                     color='white'         # Font color (e.g., 'white' if inside bar)
                 ),
             hovertemplate='Pollutant: CO<br>Phase: %{x}<br>Emissions: %{y:.3f} g<extra></extra>',
-            marker=dict(color='#56B4E9') 
+            marker=dict(color='#56B4E9')
             )
     ])
 
     fig.update_layout(
         barmode='group',
-        yaxis_type='log', 
+        yaxis_type='log',
         template='simple_white',
         title='<b>Engine Emissions by Flight Phase for CFM56-5B4/2P</b><br><sup>Log scale used to highlight variation across pollutants</sup>',
 
@@ -75,7 +83,7 @@ def plot_bar_summary(summary_df):
             family="Arial"
         ),
         font=dict(
-            size=13, 
+            size=13,
             family="Arial"
         ),
         legend=dict(
@@ -91,7 +99,7 @@ def plot_bar_summary(summary_df):
         xaxis=dict(
             title='Flight Phase'
         ),
-        
+
         # Formatting y-axis
         yaxis=dict(
             type='log',
@@ -106,54 +114,27 @@ def plot_bar_summary(summary_df):
 
     return fig
 
+def update_bar_summary(fig, summary_df):
+    phases = summary_df["Phase"]
+    co_emm = summary_df["CO Emissions (g)"]
+    nox_emm = summary_df["NOx Emissions (g)"]
+    hc_emm = summary_df["HC Emissions (g)"]
 
-def plot_pie_summary(summary_df):
-    # Filter data
-    summary_df_excl_total = summary_df[summary_df["Phase"] != "Total"]
-    summary_df_total = summary_df[summary_df["Phase"] == "Total"]
-
-    # Extract values
-    phases = summary_df_excl_total["Phase"]
-    co_em = summary_df_excl_total["CO Emissions (g)"]
-    nox_em = summary_df_excl_total["NOx Emissions (g)"]
-    hc_em = summary_df_excl_total["HC Emissions (g)"]
-
-
-    # Sort by value descending
-    sorted_co_data = sorted(zip(phases, co_em), key=lambda x: x[1], reverse=True)
-    sorted_nox_data = sorted(zip(phases, nox_em), key=lambda x: x[1], reverse=True)
-    sorted_hc_data = sorted(zip(phases, hc_em), key=lambda x: x[1], reverse=True)
-
-    # Your color palette from largest to smallest
-    color_palette_co = ["#4197CA", "#64B6E2", "#9AD3F1", "#BCE3F6", "#DEF2FA"]
-    color_palette_nox = ["#CB8712", "#E69F00", "#F1B733", "#F7CD66", "#FCE399"]
-    color_palette_hc = ["#00664E", "#009E73", "#33B384", "#66C495", "#99D6B1"]
-
-    # Unzip
-    sorted_co_phases, sorted_co_em = zip(*sorted_co_data)
-    sorted_nox_phases, sorted_nox_em = zip(*sorted_nox_data)
-    sorted_hc_phases, sorted_hc_em = zip(*sorted_hc_data)
-
-    # Assign colors
-    sorted_colors_co = color_palette_co[:len(sorted_co_em)]
-    sorted_colors_nox = color_palette_nox[:len(sorted_co_em)]
-    sorted_colors_hc = color_palette_hc[:len(sorted_co_em)]
-
-    sorted_nox_phases = [f"NOx / {phase}" for phase in sorted_nox_phases]
-    sorted_co_phases = [f"CO / {phase}" for phase in sorted_co_phases]
-    sorted_hc_phases = [f"HC / {phase}" for phase in sorted_hc_phases]
+    with fig.batch_update():
+        for trace, emm in zip(fig.data, (hc_emm, nox_emm, co_emm)):
+            trace.x = phases
+            trace.y = emm
+            trace.text = emm.apply(lambda x: f'{x:.3f}')
 
-    em_data = sorted_nox_em + sorted_co_em + sorted_hc_em
-    em_phases = sorted_nox_phases + sorted_co_phases + sorted_hc_phases
-    em_colors = color_palette_nox + color_palette_co + color_palette_hc
+    return fig
 
-    total_co = summary_df_total["CO Emissions (g)"]
-    total_nox = summary_df_total["NOx Emissions (g)"]
-    total_hc = summary_df_total["HC Emissions (g)"]
+def plot_bar_summary(summary_df):
+    return update_bar_summary(_from_template("bar", _build_bar_template), summary_df)
 
-    total_em = pd.concat([total_nox, total_co, total_hc])
 
-    fig=go.Figure()
+def _build_pie_template():
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
 
     # Create subplot layout
     fig = make_subplots(
@@ -163,8 +144,8 @@ def plot_pie_summary(summary_df):
             [{"type": "domain"}, {"type": "domain"}, {"type": "domain"}, {"type": "domain"}]
         ],
         subplot_titles=(
-            "<b>NOₓ Emissions (g)</b><br><sup>Emission of NOx tracked across Phases</sup>", 
-            "<b>CO Emissions (g)</b><br><sup>Emission of CO tracked across Phases</sup>", 
+            "<b>NOₓ Emissions (g)</b><br><sup>Emission of NOx tracked across Phases</sup>",
+            "<b>CO Emissions (g)</b><br><sup>Emission of CO tracked across Phases</sup>",
             "<b>HC Emissions (g)</b><br><sup>Emission of HC tracked across Phases</sup>",
             '<b>Engine Emissions Breakdown (g)</b><br><sup>Outer Ring: Total Data; Inner Ring: Phase-Wise Data</sup>'
         )
@@ -173,10 +154,9 @@ def plot_pie_summary(summary_df):
     # INNER - TOTAL
     fig.add_trace(
         go.Pie(
-            domain=dict(x=[0.0, 0.5]), 
+            domain=dict(x=[0.0, 0.5]),
             labels=["NOx", "CO", "HC"],
             textinfo='none',
-            values=total_em,
             hole=0.3,
             sort=False,
             direction='clockwise',
@@ -198,8 +178,6 @@ def plot_pie_summary(summary_df):
     fig.add_trace(
         go.Pie(
             domain=dict(x=[0.0, 0.5]),
-            labels=em_phases,
-            values=em_data,
             textinfo='none',
             hole=0.75,
             sort=False,
@@ -208,10 +186,9 @@ def plot_pie_summary(summary_df):
             showlegend=False,
             hovertemplate='Pollutant / Phase: %{label}<br>Percentage: %{percent}<br>Emissions: %{value:.1f} g<extra></extra>',
             marker=dict(
-                colors=em_colors,
                 line=dict(
                     color='white',
-                    width=0.5 
+                    width=0.5
                 )
             )
         ),
@@ -220,14 +197,11 @@ def plot_pie_summary(summary_df):
 
     fig.add_trace(
         go.Pie(
-            labels=sorted_nox_phases,
-            values=sorted_nox_em,
             name="NOx",
             pull=[0.05],
             textinfo='none',
             legendgroup="NOx",
             showlegend=True,
-            marker=dict(colors=sorted_colors_nox),
             hovertemplate='Phase: %{label}<br>Percentage: %{percent}<br>Emissions: %{value:.1f} g<extra></extra>',
             domain=dict(y=[0.66, 0.86]),  # Shifted further down
             sort=False,
@@ -239,14 +213,11 @@ def plot_pie_summary(summary_df):
 
     fig.add_trace(
         go.Pie(
-            labels=sorted_co_phases,
-            values=sorted_co_em,
             name="CO",
             pull=[0.05],
             textinfo='none',
             legendgroup="CO",
             showlegend=True,
-            marker=dict(colors=sorted_colors_co),
             hovertemplate='Phase: %{label}<br>Percentage: %{percent}<br>Emissions: %{value:.1f} g<extra></extra>',
             domain=dict(y=[0.36, 0.56]),  # Shifted further down
             sort=False,
@@ -258,14 +229,11 @@ def plot_pie_summary(summary_df):
 
     fig.add_trace(
         go.Pie(
-            labels=sorted_hc_phases,
-            values=sorted_hc_em,
             name="HC",
             pull=[0.05],
             textinfo='none',
             legendgroup="HC",
             showlegend=True,
-            marker=dict(colors=sorted_colors_hc),
             hovertemplate='Phase: %{label}<br>Percentage: %{percent}<br>Emissions: %{value:.1f} g<extra></extra>',
             domain=dict(y=[0.06, 0.26]),  # Shifted further down
             sort=False,
@@ -283,7 +251,7 @@ def plot_pie_summary(summary_df):
         legend=dict(
             orientation='h',
             yanchor='bottom',
-            y=-0.15, 
+            y=-0.15,
             xanchor='center',
             x=0.5,
             title=None,
@@ -295,47 +263,97 @@ def plot_pie_summary(summary_df):
 
     return fig
 
-def plot_fuel_flow_summary(summary_df):
-    summary_df_excl_total = summary_df[summary_df['Phase'] != 'Total'].copy()
+def update_pie_summary(fig, summary_df):
+    # Filter data
+    summary_df_excl_total = summary_df[summary_df["Phase"] != "Total"]
+    summary_df_total = summary_df[summary_df["Phase"] == "Total"]
 
-    # Compute key time points
-    summary_df_excl_total['Start Time (s)'] = summary_df_excl_total['Duration (s)'].cumsum() - summary_df_excl_total['Duration (s)']
-    summary_df_excl_total['End Time (s)'] = summary_df_excl_total['Duration (s)'].cumsum()
-    summary_df_excl_total['Mid Time (s)'] = (summary_df_excl_total['Start Time (s)'] + summary_df_excl_total['End Time (s)']) / 2
+    # Extract values
+    phases = summary_df_excl_total["Phase"]
+    co_em = summary_df_excl_total["CO Emissions (g)"]
+    nox_em = summary_df_excl_total["NOx Emissions (g)"]
+    hc_em = summary_df_excl_total["HC Emissions (g)"]
 
-    # Get values for flat extrapolation
-    start_time = summary_df_excl_total['Start Time (s)'].iloc[0]
-    end_time = summary_df_excl_total['End Time (s)'].iloc[-1]
-    first_flow = summary_df_excl_total['Fuel Flow (kg/s)'].iloc[0]
-    last_flow = summary_df_excl_total['Fuel Flow (kg/s)'].iloc[-1]
 
-    # Construct extended x and y
-    x_extended = [start_time] + summary_df_excl_total['Mid Time (s)'].tolist() + [end_time]
-    y_extended = [first_flow] + summary_df_excl_total['Fuel Flow (kg/s)'].tolist() + [last_flow]
+    # Sort by value descending
+    sorted_co_data = sorted(zip(phases, co_em), key=lambda x: x[1], reverse=True)
+    sorted_nox_data = sorted(zip(phases, nox_em), key=lambda x: x[1], reverse=True)
+    sorted_hc_data = sorted(zip(phases, hc_em), key=lambda x: x[1], reverse=True)
+
+    # Your color palette from largest to smallest
+    color_palette_co = ["#4197CA", "#64B6E2", "#9AD3F1", "#BCE3F6", "#DEF2FA"]
+    color_palette_nox = ["#CB8712", "#E69F00", "#F1B733", "#F7CD66", "#FCE399"]
+    color_palette_hc = ["#00664E", "#009E73", "#33B384", "#66C495", "#99D6B1"]
+
+    # Unzip
+    sorted_co_phases, sorted_co_em = zip(*sorted_co_data)
+    sorted_nox_phases, sorted_nox_em = zip(*sorted_nox_data)
+    sorted_hc_phases, sorted_hc_em = zip(*sorted_hc_data)
+
+    # Assign colors
+    sorted_colors_co = color_palette_co[:len(sorted_co_em)]
+    sorted_colors_nox = color_palette_nox[:len(sorted_co_em)]
+    sorted_colors_hc = color_palette_hc[:len(sorted_co_em)]
+
+    sorted_nox_phases = [f"NOx / {phase}" for phase in sorted_nox_phases]
+    sorted_co_phases = [f"CO / {phase}" for phase in sorted_co_phases]
+    sorted_hc_phases = [f"HC / {phase}" for phase in sorted_hc_phases]
+
+    em_data = sorted_nox_em + sorted_co_em + sorted_hc_em
+    em_phases = sorted_nox_phases + sorted_co_phases + sorted_hc_phases
+    em_colors = color_palette_nox + color_palette_co + color_palette_hc
+
+    total_co = summary_df_total["CO Emissions (g)"]
+    total_nox = summary_df_total["NOx Emissions (g)"]
+    total_hc = summary_df_total["HC Emissions (g)"]
+
+    total_em = pd.concat([total_nox, total_co, total_hc])
+
+    inner, outer, nox_pie, co_pie, hc_pie = fig.data
+    with fig.batch_update():
+        inner.values = total_em
+
+        outer.labels = em_phases
+        outer.values = em_data
+        outer.marker.colors = em_colors
+
+        for pie, labels, values, colors in (
+            (nox_pie, sorted_nox_phases, sorted_nox_em, sorted_colors_nox),
+            (co_pie, sorted_co_phases, sorted_co_em, sorted_colors_co),
+            (hc_pie, sorted_hc_phases, sorted_hc_em, sorted_colors_hc),
+        ):
+            pie.labels = labels
+            pie.values = values
+            pie.marker.colors = colors
+
+    return fig
+
+def plot_pie_summary(summary_df):
+    return update_pie_summary(_from_template("pie", _build_pie_template), summary_df)
+
+
+def _build_fuel_flow_template(webgl):
+    import plotly.graph_objects as go
+
+    scatter = go.Scattergl if webgl else go.Scatter
 
     # Plot with filled area
     fig = go.Figure()
 
-    fig.add_trace(go.Scatter(
-        x=x_extended,
-        y=y_extended,
+    fig.add_trace(scatter(
         mode='lines+markers',
         name='Fuel Flow (kg/s)',
         line=dict(color='rgba(255,0,0,0.3)'),
         marker=dict(color="#C44E52"),
-        text=["Flat Start"] + summary_df_excl_total['Phase'].tolist() + ["Flat End"],
         hovertemplate="Fuel Flow: %{y:.2f} kg/s<br>Time: %{x:.0f} s<extra></extra>"
     ))
 
-    fig.add_trace(go.Scatter(
-        x=x_extended,
-        y=y_extended,
+    fig.add_trace(scatter(
         mode='lines',
         fill='tozeroy',
         name='Fuel Used (kg)',
         line=dict(color='rgba(255,0,0,0.3)'),
         marker=dict(color="#C44E52"),
-        text=["Flat Start"] + summary_df_excl_total['Phase'].tolist() + ["Flat End"],
         hovertemplate="Fuel Flow: %{y:.2f} kg/s<br>Time: %{x:.0f} s<extra></extra>"
     ))
 
@@ -349,26 +367,19 @@ def plot_fuel_flow_summary(summary_df):
             showgrid=True,
             gridwidth=1,
             gridcolor='lightgrey',
-            range=[0 , x_extended[-1]]
         ),
         yaxis=dict(
-            showgrid=True, 
-            gridwidth=1, 
+            showgrid=True,
+            gridwidth=1,
             gridcolor='lightgrey'
         )
     )
 
     return fig
 
-def plot_emissions_line_summary(summary_df):
+def update_fuel_flow_summary(fig, summary_df):
     summary_df_excl_total = summary_df[summary_df['Phase'] != 'Total'].copy()
 
-    # Extract values
-    phases = summary_df_excl_total["Phase"]
-    co_em = summary_df_excl_total["CO Emissions (g)"]
-    nox_em = summary_df_excl_total["NOx Emissions (g)"]
-    hc_em = summary_df_excl_total["HC Emissions (g)"]
-
     # Compute key time points
     summary_df_excl_total['Start Time (s)'] = summary_df_excl_total['Duration (s)'].cumsum() - summary_df_excl_total['Duration (s)']
     summary_df_excl_total['End Time (s)'] = summary_df_excl_total['Duration (s)'].cumsum()
@@ -377,53 +388,58 @@ def plot_emissions_line_summary(summary_df):
     # Get values for flat extrapolation
     start_time = summary_df_excl_total['Start Time (s)'].iloc[0]
     end_time = summary_df_excl_total['End Time (s)'].iloc[-1]
-    nox_start = summary_df_excl_total['NOx Emissions (g)'].iloc[0]
-    nox_end = summary_df_excl_total['NOx Emissions (g)'].iloc[-1]
-    co_start = summary_df_excl_total['CO Emissions (g)'].iloc[0]
-    co_end = summary_df_excl_total['CO Emissions (g)'].iloc[-1]
-    hc_start = summary_df_excl_total['HC Emissions (g)'].iloc[0]
-    hc_end = summary_df_excl_total['HC Emissions (g)'].iloc[-1]
+    first_flow = summary_df_excl_total['Fuel Flow (kg/s)'].iloc[0]
+    last_flow = summary_df_excl_total['Fuel Flow (kg/s)'].iloc[-1]
 
     # Construct extended x and y
-    time_extended = [start_time] + summary_df_excl_total['Mid Time (s)'].tolist() + [end_time]
-    nox_extended = [nox_start] + summary_df_excl_total['NOx Emissions (g)'].tolist() + [nox_end]
-    co_extended = [co_start] + summary_df_excl_total['CO Emissions (g)'].tolist() + [co_end]
-    hc_extended = [hc_start] + summary_df_excl_total['HC Emissions (g)'].tolist() + [hc_end]
+    x_extended = [start_time] + summary_df_excl_total['Mid Time (s)'].tolist() + [end_time]
+    y_extended = [first_flow] + summary_df_excl_total['Fuel Flow (kg/s)'].tolist() + [last_flow]
+    text = ["Flat Start"] + summary_df_excl_total['Phase'].tolist() + ["Flat End"]
+
+    with fig.batch_update():
+        for trace in fig.data:
+            trace.x = x_extended
+            trace.y = y_extended
+            trace.text = text
+        fig.layout.xaxis.range = [0 , x_extended[-1]]
+
+    return fig
+
+def plot_fuel_flow_summary(summary_df):
+    webgl = _use_webgl(len(summary_df) + 1)
+    return update_fuel_flow_summary(_from_template("fuel_flow", _build_fuel_flow_template, webgl), summary_df)
+
+
+def _build_emissions_line_template(webgl):
+    import plotly.graph_objects as go
+
+    scatter = go.Scattergl if webgl else go.Scatter
 
     # Plot with filled area
     fig = go.Figure()
 
 
-    fig.add_trace(go.Scatter(
-        x=time_extended,
-        y=nox_extended,
+    fig.add_trace(scatter(
         mode='lines+markers',
         name='NOx Emitted (g)',
         line=dict(color='#E69F00'),
         marker=dict(color="#E69F00"),
-        text=["Flat Start"] + phases.tolist() + ["Flat End"],
         hovertemplate="NOx Emitted: %{y:.2f} g<br>Time: %{x:.0f} s<br>Phase: %{text}<extra></extra>"
     ))
 
-    fig.add_trace(go.Scatter(
-        x=time_extended,
-        y=co_extended,
+    fig.add_trace(scatter(
         mode='lines+markers',
         name='CO Emitted (g)',
         line=dict(color='#56B4E9'),
         marker=dict(color="#56B4E9"),
-        text=["Flat Start"] + phases.tolist() + ["Flat End"],
         hovertemplate="NOx Emitted: %{y:.2f} g<br>Time: %{x:.0f} s<br>Phase: %{text}<extra></extra>"
     ))
 
-    fig.add_trace(go.Scatter(
-        x=time_extended,
-        y=hc_extended,
+    fig.add_trace(scatter(
         mode='lines+markers',
         name='HC Emitted (g)',
         line=dict(color='#009E73'),
         marker=dict(color="#009E73"),
-        text=["Flat Start"] + phases.tolist() + ["Flat End"],
         hovertemplate="NOx Emitted: %{y:.2f} g<br>Time: %{x:.0f} s<br>Phase: %{text}<extra></extra>"
     ))
 
@@ -437,7 +453,6 @@ def plot_emissions_line_summary(summary_df):
             showgrid=True,
             gridwidth=1,
             gridcolor='lightgrey',
-            range=[0 , time_extended[-1]]
         ),
         yaxis=dict(
             type='log',
@@ -450,4 +465,166 @@ def plot_emissions_line_summary(summary_df):
     )
 
     return fig
-    
\ No newline at end of file
+
+def update_emissions_line_summary(fig, summary_df):
+    summary_df_excl_total = summary_df[summary_df['Phase'] != 'Total'].copy()
+
+    # Extract values
+    phases = summary_df_excl_total["Phase"]
+
+    # Compute key time points
+    summary_df_excl_total['Start Time (s)'] = summary_df_excl_total['Duration (s)'].cumsum() - summary_df_excl_total['Duration (s)']
+    summary_df_excl_total['End Time (s)'] = summary_df_excl_total['Duration (s)'].cumsum()
+    summary_df_excl_total['Mid Time (s)'] = (summary_df_excl_total['Start Time (s)'] + summary_df_excl_total['End Time (s)']) / 2
+
+    # Get values for flat extrapolation
+    start_time = summary_df_excl_total['Start Time (s)'].iloc[0]
+    end_time = summary_df_excl_total['End Time (s)'].iloc[-1]
+    nox_start = summary_df_excl_total['NOx Emissions (g)'].iloc[0]
+    nox_end = summary_df_excl_total['NOx Emissions (g)'].iloc[-1]
+    co_start = summary_df_excl_total['CO Emissions (g)'].iloc[0]
+    co_end = summary_df_excl_total['CO Emissions (g)'].iloc[-1]
+    hc_start = summary_df_excl_total['HC Emissions (g)'].iloc[0]
+    hc_end = summary_df_excl_total['HC Emissions (g)'].iloc[-1]
+
+    # Construct extended x and y
+    time_extended = [start_time] + summary_df_excl_total['Mid Time (s)'].tolist() + [end_time]
+    nox_extended = [nox_start] + summary_df_excl_total['NOx Emissions (g)'].tolist() + [nox_end]
+    co_extended = [co_start] + summary_df_excl_total['CO Emissions (g)'].tolist() + [co_end]
+    hc_extended = [hc_start] + summary_df_excl_total['HC Emissions (g)'].tolist() + [hc_end]
+    text = ["Flat Start"] + phases.tolist() + ["Flat End"]
+
+    with fig.batch_update():
+        for trace, y in zip(fig.data, (nox_extended, co_extended, hc_extended)):
+            trace.x = time_extended
+            trace.y = y
+            trace.text = text
+        fig.layout.xaxis.range = [0 , time_extended[-1]]
+
+    return fig
+
+def plot_emissions_line_summary(summary_df):
+    webgl = _use_webgl(len(summary_df) + 1)
+    return update_emissions_line_summary(_from_template("emissions_line", _build_emissions_line_template, webgl), summary_df)
+
+
+# ---Multi-Flight Time Series---
+
+def _build_multi_flight_template(webgl, y_title):
+    import plotly.graph_objects as go
+
+    scatter = go.Scattergl if webgl else go.Scatter
+
+    fig = go.Figure()
+
+    fig.add_trace(scatter(
+        mode='lines',
+        name='Flights',
+        line=dict(color='rgba(196,78,82,0.25)', width=1),
+        hovertemplate="Flight: %{text}<br>Value: %{y:.2f}<br>Time: %{x:.0f} s<extra></extra>"
+    ))
+
+    fig.update_layout(
+        xaxis_title='Time (s)',
+        yaxis_title=y_title,
+        template='simple_white',
+        showlegend=False,
+        xaxis=dict(
+            showgrid=True,
+            gridwidth=1,
+            gridcolor='lightgrey',
+        ),
+        yaxis=dict(
+            showgrid=True,
+            gridwidth=1,
+            gridcolor='lightgrey'
+        )
+    )
+
+    return fig
+
+def update_multi_flight_timeseries(fig, timeseries_df, value_column):
+    # All flights go into one trace, separated by NaN gaps, so thousands of flights cost one WebGL draw call
+    timeseries_df = timeseries_df.sort_values(["Flight", "Time (s)"], kind="mergesort")
+    flight = timeseries_df["Flight"].to_numpy()
+    breaks = np.flatnonzero(flight[1:] != flight[:-1]) + 1
+
+    x = np.insert(timeseries_df["Time (s)"].to_numpy(dtype=np.float64), breaks, np.nan)
+    y = np.insert(timeseries_df[value_column].to_numpy(dtype=np.float64), breaks, np.nan)
+    text = np.insert(flight.astype(str), breaks, "")
+    n_flights = len(breaks) + 1 if len(flight) else 0
+
+    with fig.batch_update():
+        fig.data[0].x = x
+        fig.data[0].y = y
+        fig.data[0].text = text
+        # The title carries the flight count, so it is set here rather than kept in the cached template
+        fig.layout.title.text = f'<b>{value_column} over Time (s)</b><br><sup>{n_flights} flights</sup>'
+
+    return fig
+
+def plot_multi_flight_timeseries(timeseries_df, value_column="Fuel Flow (kg/s)"):
+    # timeseries_df: long format with "Flight", "Time (s)" and value_column, e.g. concatenated
+    # chunks from emissions_calculator.iter_emission_timeseries()
+    webgl = _use_webgl(len(timeseries_df))
+    fig = _from_template("multi_flight", _build_multi_flight_template, webgl, value_column)
+    return update_multi_flight_timeseries(fig, timeseries_df, value_column)
+
+
+# ---Duration Sweep---
+
+def _build_duration_sweep_template(webgl):
+    import plotly.graph_objects as go
+
+    scatter = go.Scattergl if webgl else go.Scatter
+
+    fig = go.Figure()
+
+    for pollutant, color in (("NOx", "#E69F00"), ("CO", "#56B4E9"), ("HC", "#009E73")):
+        fig.add_trace(scatter(
+            mode='lines',
+            name=f'Total {pollutant} (g)',
+            line=dict(color=color),
+            hovertemplate=f"Total {pollutant}: %{{y:.1f}} g<br>Phase Duration: %{{x:.0f}} s<extra></extra>"
+        ))
+
+    fig.update_layout(
+        xaxis_title='Phase Duration (s)',
+        template='simple_white',
+        showlegend=True,
+        shapes=[dict(type='line', xref='x', yref='paper', y0=0, y1=1, line=dict(color='grey', dash='dot'))],
+        xaxis=dict(
+            showgrid=True,
+            gridwidth=1,
+            gridcolor='lightgrey',
+        ),
+        yaxis=dict(
+            type='log',
+            title='Flight Total Emissions (g)',
+            showgrid=True,
+            gridcolor='lightgrey',
+            gridwidth=1
+        )
+    )
+
+    return fig
+
+def update_duration_sweep(fig, sweep_df, phase, current_duration=None):
+    # sweep_df: WhatIfEvaluator.sweep() output; current_duration is marked with a vertical line
+    x = sweep_df["Duration (s)"]
+
+    with fig.batch_update():
+        for trace, pollutant in zip(fig.data, ("NOx", "CO", "HC")):
+            trace.x = x
+            trace.y = sweep_df[f"Total {pollutant} Emissions (g)"]
+        fig.layout.title = f'<b>Flight Totals vs. {phase} Duration</b><br><sup>Other phases held at their current durations</sup>'
+        fig.layout.shapes[0].visible = current_duration is not None
+        if current_duration is not None:
+            fig.layout.shapes[0].x0 = fig.layout.shapes[0].x1 = current_duration
+
+    return fig
+
+def plot_duration_sweep(sweep_df, phase, current_duration=None):
+    webgl = _use_webgl(len(sweep_df))
+    fig = _from_template("duration_sweep", _build_duration_sweep_template, webgl)
+    return update_duration_sweep(fig, sweep_df, phase, current_duration)
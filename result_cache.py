@@ -0,0 +1,254 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:     # Windows: no advisory locks, concurrent evictions may race but never corrupt entries
+    fcntl = None
+
+# Persistent, content-addressed cache of per-route results (emissions summaries, flight paths, rendered maps),
+# shared by every process using the same directory and kept across sessions.
+#
+#     cache = ResultCache(max_bytes=512 * 2**20)
+#     key = result_key("summary", engine=engine, engine_data=registry.signature, profile=content_digest(profile.data))
+#     artifacts = cache.get(key)                  # {name: value} or None
+#     if artifacts is None:
+#         artifacts = {"summary": summarize_emissions(profile, engine)}
+#         cache.put(key, artifacts)
+#
+# Keys hash everything the result depends on, including the reference-data version (EngineRegistry.signature),
+# so changed inputs or engine data simply miss and stale entries age out. Values are DataFrames (Parquet),
+# strings (UTF-8 text, e.g. map HTML), bytes, or anything JSON can hold.
+#
+# Layout: <root>/<key[:2]>/<key>/ holds one file per artifact plus meta.json. An entry is written into
+# <root>/tmp/ and renamed into place, so readers see a whole entry or none; when two processes compute the same
+# key the first rename wins and the other copy is dropped. meta.json's mtime is the entry's last use (set on every
+# hit). <root>/size.json keeps the running byte total of all entries, updated under an exclusive lock on
+# <root>/.lock by every put and removal, so a put only scans the entries (and removes least recently used ones)
+# when it takes the cache over max_bytes.
+
+CACHE_DIR = os.path.join("output", "cache", "results")
+DEFAULT_MAX_BYTES = 512 * 2**20
+CACHE_VERSION = 1       # Bump when the stored results change shape, so old entries are no longer used
+STALE_TMP_SECONDS = 3600
+
+
+def content_digest(*values):
+    # sha256 hex of arrays, DataFrames/Series and JSON-able values (order matters)
+    sha = hashlib.sha256()
+    for value in values:
+        if isinstance(value, np.ndarray):
+            sha.update(str(value.dtype).encode())
+            sha.update(np.ascontiguousarray(value).tobytes())
+        elif isinstance(value, (pd.DataFrame, pd.Series)):
+            sha.update(json.dumps(list(map(str, value.index)) + list(map(str, getattr(value, "columns", [])))).encode())
+            sha.update(pd.util.hash_pandas_object(value, index=False).to_numpy().tobytes())
+        else:
+            sha.update(json.dumps(value, sort_keys=True, default=str).encode())
+        sha.update(b"\0")
+    return sha.hexdigest()
+
+def result_key(kind, **inputs):
+    return content_digest(kind, CACHE_VERSION, inputs)
+
+
+def _write_artifact(directory, stem, value):
+    # -> (file name, format)
+    if isinstance(value, pd.DataFrame):
+        file_name, fmt = f"{stem}.parquet", "parquet"
+        value.to_parquet(os.path.join(directory, file_name))
+    elif isinstance(value, str):
+        file_name, fmt = f"{stem}.txt", "text"
+        with open(os.path.join(directory, file_name), "w", encoding="utf-8") as f:
+            f.write(value)
+    elif isinstance(value, bytes):
+        file_name, fmt = f"{stem}.bin", "bytes"
+        with open(os.path.join(directory, file_name), "wb") as f:
+            f.write(value)
+    else:
+        file_name, fmt = f"{stem}.json", "json"
+        with open(os.path.join(directory, file_name), "w") as f:
+            json.dump(value, f)
+    return file_name, fmt
+
+def _read_artifact(path, fmt):
+    if fmt == "parquet":
+        return pd.read_parquet(path)
+    if fmt == "text":
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    if fmt == "bytes":
+        with open(path, "rb") as f:
+            return f.read()
+    with open(path) as f:
+        return json.load(f)
+
+
+class ResultCache:
+
+    def __init__(self, root=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._tmp_dir = os.path.join(root, "tmp")
+        os.makedirs(self._tmp_dir, exist_ok=True)
+
+    def _entry_dir(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def _read_total(self):
+        # Running byte total of all entries; rebuilt from a scan when the index is missing or unreadable.
+        # Caller holds the lock
+        try:
+            with open(os.path.join(self.root, "size.json")) as f:
+                return json.load(f)["bytes"]
+        except (OSError, ValueError, KeyError):
+            total = self.size()
+            self._write_total(total)
+            return total
+
+    def _write_total(self, total):
+        tmp_path = os.path.join(self._tmp_dir, f"size-{uuid.uuid4().hex}.json")
+        with open(tmp_path, "w") as f:
+            json.dump({"bytes": max(total, 0)}, f)
+        os.replace(tmp_path, os.path.join(self.root, "size.json"))
+
+    @contextmanager
+    def _locked(self):
+        # Exclusive across processes (and threads, each opening its own descriptor)
+        with open(os.path.join(self.root, ".lock"), "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def __contains__(self, key):
+        return os.path.exists(os.path.join(self._entry_dir(key), "meta.json"))
+
+    def get(self, key):
+        # {name: value} for a stored key (marking it as just used), otherwise None
+        entry_dir = self._entry_dir(key)
+        meta_path = os.path.join(entry_dir, "meta.json")
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            artifacts = {
+                name: _read_artifact(os.path.join(entry_dir, a["file"]), a["format"]) for name, a in meta["artifacts"].items()
+            }
+            os.utime(meta_path)
+        except OSError:
+            # Missing, or evicted by another process while being read
+            self.misses += 1
+            return None
+        self.hits += 1
+        return artifacts
+
+    def put(self, key, artifacts):
+        # Stores {name: value} under key; returns False when the entry alone would exceed max_bytes
+        entry_dir = self._entry_dir(key)
+        if key in self:
+            return True
+
+        tmp_dir = os.path.join(self._tmp_dir, uuid.uuid4().hex)
+        os.makedirs(tmp_dir)
+        try:
+            meta = {"key": key, "created": time.time(), "artifacts": {}}
+            for i, (name, value) in enumerate(artifacts.items()):
+                # Numbered file names, so no artifact name can clash with meta.json or another artifact
+                file_name, fmt = _write_artifact(tmp_dir, f"{i}-{name}", value)
+                meta["artifacts"][name] = {"file": file_name, "format": fmt}
+            meta["bytes"] = sum(e.stat().st_size for e in os.scandir(tmp_dir))
+            with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+                json.dump(meta, f)
+            size = sum(e.stat().st_size for e in os.scandir(tmp_dir))     # As entries() counts it, with meta.json
+
+            if self.max_bytes is not None and size > self.max_bytes:
+                return False
+            with self._locked():
+                total = self._read_total()
+                os.makedirs(os.path.dirname(entry_dir), exist_ok=True)
+                try:
+                    os.rename(tmp_dir, entry_dir)
+                except OSError:
+                    return True     # Another process stored the same key first
+                total += size
+                if self.max_bytes is not None and total > self.max_bytes:
+                    self._evict(self.max_bytes, keep=key)
+                else:
+                    self._write_total(total)
+            return True
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def entries(self):
+        # [(key, last use, bytes)] of every stored entry
+        entries = []
+        for shard in os.scandir(self.root):
+            if not shard.is_dir() or len(shard.name) != 2:
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    last_use = os.stat(os.path.join(entry.path, "meta.json")).st_mtime
+                    size = sum(f.stat().st_size for f in os.scandir(entry.path))
+                except OSError:
+                    continue
+                entries.append((entry.name, last_use, size))
+        return entries
+
+    def size(self):
+        return sum(size for _, _, size in self.entries())
+
+    def _evict(self, max_bytes, keep=None):
+        # Removes least recently used entries until the cache fits max_bytes and resets the running total from the
+        # scan; caller holds the lock
+        entries = sorted(self.entries(), key=lambda e: e[1])
+        total = sum(size for _, _, size in entries)
+        for key, _, size in entries:
+            if total <= max_bytes:
+                break
+            if key == keep:
+                continue
+            if self._remove(key):
+                total -= size
+        self._write_total(total)
+
+        # Leftovers of writers that died mid-put
+        now = time.time()
+        for entry in os.scandir(self._tmp_dir):
+            try:
+                if now - entry.stat().st_mtime > STALE_TMP_SECONDS:
+                    if entry.is_dir():
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                    else:
+                        os.remove(entry.path)
+            except OSError:
+                pass
+
+    def _remove(self, key):
+        # Renamed out of the shard first, so readers never find a half-deleted entry
+        trash = os.path.join(self._tmp_dir, f"evicted-{uuid.uuid4().hex}")
+        try:
+            os.rename(self._entry_dir(key), trash)
+        except OSError:
+            return False
+        shutil.rmtree(trash, ignore_errors=True)
+        return True
+
+    def evict(self, max_bytes=None):
+        with self._locked():
+            self._evict(self.max_bytes if max_bytes is None else max_bytes)
+
+    def clear(self):
+        self.evict(0)
@@ -0,0 +1,103 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from engine_registry import load_engine_registry, CACHE_DIR
+from emissions_calculator import POLLUTANTS, load_profile_durations
+from geo.airport_index import load_airport_index, AIRPORTS_CSV_PATH
+from geo.route_mapper import great_circle_distance_km
+
+# Fans a table of (origin, destination, aircraft, engine, profile) scenarios out over a process pool.
+# Each worker loads the reference data once in its initializer (the engine registry is memory-mapped, so its
+# pages are shared between workers); tasks only carry their slice of the scenario table.
+
+SCENARIO_COLUMNS = ["origin", "destination", "aircraft", "engine", "profile"]
+RESULT_COLUMNS = ["Distance (km)", "Duration (s)", "Fuel Burned (kg)"] + [f"{p} Emissions (g)" for p in POLLUTANTS]
+
+_registry = None
+_airport_index = None
+
+
+def _init_worker(registry_cache_dir=CACHE_DIR, airports_csv_path=AIRPORTS_CSV_PATH):
+    global _registry, _airport_index
+    _registry = load_engine_registry(cache_dir=registry_cache_dir)
+    _airport_index = load_airport_index(airports_csv_path)
+
+
+@lru_cache(maxsize=256)
+def _profile_durations(profile_path):
+    # Phase durations (s) of a profile file, or None when it is missing or unreadable
+    try:
+        return load_profile_durations([profile_path])[0]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def evaluate_chunk(scenarios):
+    # Totals per scenario for one chunk of the scenario table; unknown airports or engines and missing or
+    # unreadable profiles give NaN rows
+    if _registry is None:
+        _init_worker()
+
+    results = pd.DataFrame(np.nan, index=scenarios.index, columns=RESULT_COLUMNS)
+
+    origin = _airport_index.positions(scenarios["origin"])
+    destin = _airport_index.positions(scenarios["destination"])
+    engine_ids = np.fromiter((_registry.ids.get(e, -1) for e in scenarios["engine"]), dtype=np.intp)
+    profiles = scenarios["profile"]
+    durations = {path: _profile_durations(path) for path in pd.unique(profiles.dropna())}
+    durations = {
+        path: d for path, d in durations.items() if d is not None and len(d) == _registry.fuel_flow.shape[1]
+    }
+    valid = (origin >= 0) & (destin >= 0) & (engine_ids >= 0) & profiles.isin(list(durations)).to_numpy()
+
+    origin_lat, origin_lon = _airport_index.coordinates(origin[valid])
+    destin_lat, destin_lon = _airport_index.coordinates(destin[valid])
+    results.loc[valid, "Distance (km)"] = great_circle_distance_km(origin_lat, origin_lon, destin_lat, destin_lon)
+
+    # One broadcast per distinct profile in the chunk
+    profiles = profiles.to_numpy()
+    for profile_path in pd.unique(profiles[valid]):
+        rows = valid & (profiles == profile_path)
+        profile_durations = durations[profile_path]
+        fuel_burned = profile_durations * _registry.fuel_flow[engine_ids[rows]]                # (n, P) kg
+        emissions = fuel_burned[..., None] * _registry.emission_indices[engine_ids[rows]]     # (n, P, 3) g
+
+        results.loc[rows, "Duration (s)"] = profile_durations.sum()
+        results.loc[rows, "Fuel Burned (kg)"] = fuel_burned.sum(axis=1)
+        results.loc[rows, RESULT_COLUMNS[3:]] = emissions.sum(axis=1)
+
+    return results
+
+
+def run_scenarios(scenarios, max_workers=None, chunk_size=5000, ordered=True):
+    # Yields one result DataFrame per chunk (indexed like `scenarios`), in input order or as chunks complete
+    chunks = [scenarios.iloc[start:start + chunk_size][SCENARIO_COLUMNS] for start in range(0, len(scenarios), chunk_size)]
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker) as executor:
+        if ordered:
+            yield from executor.map(evaluate_chunk, chunks)
+        else:
+            futures = [executor.submit(evaluate_chunk, chunk) for chunk in chunks]
+            for future in as_completed(futures):
+                yield future.result()
+
+
+def evaluate_scenarios(scenarios, max_workers=None, chunk_size=5000):
+    results = pd.concat(run_scenarios(scenarios, max_workers, chunk_size, ordered=False)).sort_index()
+    return scenarios.join(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate a table of route/engine/profile scenarios in parallel")
+    parser.add_argument("scenarios", help=f"CSV with columns {', '.join(SCENARIO_COLUMNS)}")
+    parser.add_argument("output", help="CSV to write the scenarios with their totals to")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    evaluate_scenarios(pd.read_csv(args.scenarios), args.workers, args.chunk_size).to_csv(args.output, index=False)
@@ -0,0 +1,241 @@
+import argparse
+import json
+import os
+import shutil
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from engine_registry import load_engine_registry
+from emissions_calculator import calc_fleet_emissions
+from emissions_store import fleet_emission_tables
+from flight_profile import FlightProfile
+from geo.airport_index import load_airport_index
+from geo.route_mapper import great_circle_distance_km, great_circle_points
+from instrumentation import span
+from scenario_runner import RESULT_COLUMNS
+
+# Out-of-core processing of an airline schedule: one CSV row per flight, far more rows than fit in memory.
+#
+#     python schedule_runner.py schedule.csv output/schedule/2024 --chunk-size 100000 --workers 4 --phases
+#
+# The schedule is read chunk_size rows at a time. Each chunk's airports are resolved against data/airports.csv,
+# its flights are placed on their great circles and their emissions computed in one batch, and its results are
+# written as their own Parquet part files:
+#   <output>/totals/part-NNNNNN.parquet  one row per schedule row (NaN results where an airport or engine is unknown)
+#   <output>/phases/part-NNNNNN.parquet  one row per flight and phase, with the phase midpoint (with --phases)
+# (the same two-table layout as emissions_store, so read_emissions(output, "totals") reads a run back).
+#
+# <output>/checkpoint.json records how many chunks are complete. Parts and checkpoint are written to a temporary
+# name and renamed into place, so an interrupted run (Ctrl-C, killed job) leaves every file either whole or
+# absent; running the same command again skips the completed rows and carries on from the next chunk. A chunk
+# that was written but not yet checkpointed is simply written again under the same name.
+
+SCHEDULE_COLUMNS = ["origin", "destination", "engine"]     # Required; "profile" (a profile CSV per flight) is optional
+DEFAULT_PROFILE = os.path.join("flight-profiles", "test_flight_profile.csv")
+OUTPUT_DIR = os.path.join("output", "schedule")
+CHECKPOINT_NAME = "checkpoint.json"
+
+
+@lru_cache(maxsize=256)
+def _load_profile(profile_path):
+    return FlightProfile.from_csv(profile_path)
+
+
+def _positions(lookup, codes):
+    # lookup() on the distinct codes of a chunk only, then spread back to every row
+    inverse, uniques = pd.factorize(codes)
+    return np.append(lookup(uniques), -1)[inverse]     # Missing codes (inverse -1) pick the trailing -1
+
+
+def evaluate_schedule_chunk(schedule, first_row=0, default_profile=DEFAULT_PROFILE, phases=False):
+    # (totals_df, phases_df) for one chunk of the schedule; phases_df is None unless phases is set.
+    # Both carry the schedule's columns plus "row", the flight's 0-based row number in the schedule file.
+    registry = load_engine_registry()
+    airports = load_airport_index()
+
+    flights_df = schedule.reset_index(drop=True)
+    flights_df.insert(0, "row", np.arange(first_row, first_row + len(flights_df)))
+
+    origin = _positions(airports.positions, flights_df["origin"])
+    destin = _positions(airports.positions, flights_df["destination"])
+    engine_ids = _positions(lambda names: np.array([registry.ids.get(n, -1) for n in names], dtype=np.intp), flights_df["engine"])
+    profiles = flights_df["profile"].fillna(default_profile) if "profile" in flights_df else pd.Series(default_profile, index=flights_df.index)
+    valid = (origin >= 0) & (destin >= 0) & (engine_ids >= 0)
+
+    totals, phase_tables = [flights_df[~valid]] if not valid.all() else [], []
+    for profile_path in pd.unique(profiles[valid]):
+        rows = np.flatnonzero(valid & (profiles == profile_path).to_numpy())
+        profile = _load_profile(profile_path)
+        origin_lat, origin_lon = airports.coordinates(origin[rows])
+        destin_lat, destin_lon = airports.coordinates(destin[rows])
+
+        fuel_burned, emissions = calc_fleet_emissions(profile.durations_s, registry.fuel_flow, registry.emission_indices, engine_ids[rows])
+        phases_df, totals_df = fleet_emission_tables(flights_df.iloc[rows], profile.phases, profile.durations_s, fuel_burned, emissions)
+        totals_df.insert(len(flights_df.columns), "Distance (km)", great_circle_distance_km(origin_lat, origin_lon, destin_lat, destin_lon))
+        totals.append(totals_df)
+
+        if phases:
+            # Phase midpoints on each great circle, as build_flight_path() places them
+            phase_distances = profile.speeds_kts * profile.durations_s
+            cumulative = np.concatenate([[0], np.cumsum(phase_distances / phase_distances.sum())])
+            lat, lon = great_circle_points(
+                origin_lat[:, None], origin_lon[:, None], destin_lat[:, None], destin_lon[:, None],
+                (cumulative[:-1] + cumulative[1:]) / 2,
+            )
+            phases_df["Latitude"] = lat.ravel()
+            phases_df["Longitude"] = lon.ravel()
+            phases_df["Altitude (ft)"] = np.tile(profile.altitudes_ft, len(rows))
+            phase_tables.append(phases_df)
+
+    # Unresolved rows keep NaN results; the columns are the same even for a chunk without a single valid flight
+    totals_df = pd.concat(totals, ignore_index=True).reindex(columns=list(flights_df.columns) + RESULT_COLUMNS)
+    totals_df = totals_df.sort_values("row", ignore_index=True)
+    if not phases:
+        return totals_df, None
+    return totals_df, pd.concat(phase_tables, ignore_index=True) if phase_tables else None
+
+
+# ---Part Files and Checkpoint---
+
+def _replace_atomically(path, write):
+    # write(tmp_path), then rename over path; the temporary name is hidden, so dataset readers skip it
+    tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp")
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+def _write_part(df, output_dir, table, chunk):
+    directory = os.path.join(output_dir, table)
+    os.makedirs(directory, exist_ok=True)
+    _replace_atomically(os.path.join(directory, f"part-{chunk:06d}.parquet"), lambda path: df.to_parquet(path, index=False))
+
+def process_chunk(chunk, schedule, first_row, output_dir, default_profile=DEFAULT_PROFILE, phases=False):
+    # Evaluates one chunk and writes its part files; returns (rows, flights evaluated)
+    with span("schedule.chunk", chunk=chunk, rows=len(schedule)):
+        totals_df, phases_df = evaluate_schedule_chunk(schedule, first_row, default_profile, phases)
+        if phases_df is not None:
+            _write_part(phases_df, output_dir, "phases", chunk)
+        _write_part(totals_df, output_dir, "totals", chunk)
+    return len(schedule), int(totals_df["Fuel Burned (kg)"].notna().sum())
+
+def _fingerprint(schedule_path, chunk_size, default_profile, phases):
+    # What a checkpoint is only valid for: the same schedule file, chunking and outputs
+    stat = os.stat(schedule_path)
+    return {
+        "schedule": os.path.abspath(schedule_path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+        "chunk_size": chunk_size, "default_profile": default_profile, "phases": phases,
+    }
+
+def read_checkpoint(output_dir):
+    path = os.path.join(output_dir, CHECKPOINT_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def write_checkpoint(output_dir, checkpoint):
+    def write(path):
+        with open(path, "w") as f:
+            json.dump(checkpoint, f, indent=2)
+            f.write("\n")
+            f.flush()
+            os.fsync(f.fileno())
+    _replace_atomically(os.path.join(output_dir, CHECKPOINT_NAME), write)
+
+
+# ---Runner---
+
+def _start(schedule_path, output_dir, chunk_size, default_profile, phases, restart):
+    # The checkpoint to continue from: the stored one when it matches this run, otherwise a fresh one
+    fingerprint = _fingerprint(schedule_path, chunk_size, default_profile, phases)
+    checkpoint = None if restart else read_checkpoint(output_dir)
+    if checkpoint is not None:
+        if checkpoint["input"] != fingerprint:
+            raise ValueError(
+                f"{os.path.join(output_dir, CHECKPOINT_NAME)} belongs to a different schedule or settings; "
+                "pass restart=True (--restart) to discard it"
+            )
+        return checkpoint
+
+    for table in ("totals", "phases"):
+        shutil.rmtree(os.path.join(output_dir, table), ignore_errors=True)
+    os.makedirs(output_dir, exist_ok=True)
+    checkpoint = {"input": fingerprint, "chunks_done": 0, "rows_done": 0, "flights_evaluated": 0, "complete": False}
+    write_checkpoint(output_dir, checkpoint)
+    return checkpoint
+
+def run_schedule(schedule_path, output_dir=OUTPUT_DIR, chunk_size=100_000, max_workers=1,
+                 default_profile=DEFAULT_PROFILE, phases=False, restart=False, progress=None):
+    # Processes the schedule chunk by chunk, resuming from output_dir's checkpoint; returns the final checkpoint.
+    # With max_workers > 1, chunks are evaluated in a process pool with at most 2 * max_workers of them in memory;
+    # the checkpoint only ever advances over a contiguous run of finished chunks.
+    # progress(checkpoint) is called after every checkpoint update.
+    checkpoint = _start(schedule_path, output_dir, chunk_size, default_profile, phases, restart)
+    if checkpoint["complete"]:
+        return checkpoint
+
+    # All columns are read as strings, so every part file has the same schema whatever a chunk happens to contain
+    missing = [c for c in SCHEDULE_COLUMNS if c not in pd.read_csv(schedule_path, nrows=0).columns]
+    if missing:
+        raise ValueError(f"{schedule_path} is missing schedule columns {missing}")
+
+    rows_done = checkpoint["rows_done"]
+    reader = pd.read_csv(schedule_path, dtype=str, chunksize=chunk_size, skiprows=lambda i: 0 < i <= rows_done)
+
+    def commit(rows, flights):
+        checkpoint["chunks_done"] += 1
+        checkpoint["rows_done"] += rows
+        checkpoint["flights_evaluated"] += flights
+        checkpoint["updated"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        write_checkpoint(output_dir, checkpoint)
+        if progress is not None:
+            progress(checkpoint)
+
+    with reader:
+        chunk, first_row = checkpoint["chunks_done"], rows_done
+        if max_workers <= 1:
+            for schedule in reader:
+                commit(*process_chunk(chunk, schedule, first_row, output_dir, default_profile, phases))
+                chunk, first_row = chunk + 1, first_row + len(schedule)
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                pending = deque()
+                for schedule in reader:
+                    pending.append(executor.submit(process_chunk, chunk, schedule, first_row, output_dir, default_profile, phases))
+                    chunk, first_row = chunk + 1, first_row + len(schedule)
+                    while len(pending) >= 2 * max_workers:
+                        commit(*pending.popleft().result())
+                while pending:
+                    commit(*pending.popleft().result())
+
+    checkpoint["complete"] = True
+    write_checkpoint(output_dir, checkpoint)
+    return checkpoint
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute routes and emissions for a schedule CSV in resumable chunks")
+    parser.add_argument("schedule", help=f"CSV with one row per flight and columns {', '.join(SCHEDULE_COLUMNS)} (and optionally profile)")
+    parser.add_argument("output", nargs="?", default=OUTPUT_DIR, help="Directory for the part files and checkpoint")
+    parser.add_argument("--chunk-size", type=int, default=100_000, help="Schedule rows per chunk")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--profile", default=DEFAULT_PROFILE, help="Profile for rows without a profile column value")
+    parser.add_argument("--phases", action="store_true", help="Also write per-phase rows with their positions")
+    parser.add_argument("--restart", action="store_true", help="Discard the checkpoint and earlier results")
+    args = parser.parse_args()
+
+    def report(checkpoint):
+        print(f"chunk {checkpoint['chunks_done']:>6}: {checkpoint['rows_done']:,} rows, "
+              f"{checkpoint['flights_evaluated']:,} flights evaluated", flush=True)
+
+    try:
+        checkpoint = run_schedule(
+            args.schedule, args.output, args.chunk_size, args.workers, args.profile, args.phases, args.restart, report,
+        )
+    except KeyboardInterrupt:
+        raise SystemExit(f"Interrupted; run the same command again to resume from {os.path.join(args.output, CHECKPOINT_NAME)}")
+    print(f"Done: {checkpoint['rows_done']:,} rows, {checkpoint['flights_evaluated']:,} flights evaluated -> {args.output}")
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+from engine_registry import POLLUTANTS
+from emissions_calculator import load_engine_arrays, summarize_emissions
+from flight_profile import as_flight_profile
+
+# Incremental what-if evaluation for phase-duration edits. Fuel and emissions are linear in phase duration, so
+# with the per-phase rates (kg/s fuel, g/s per pollutant) kept around, an edit only rewrites the edited phase's
+# row and shifts the "Total" row by the change, instead of recomputing the summary from files.
+
+EMISSION_COLUMNS = [f"{p} Emissions (g)" for p in POLLUTANTS]
+SWEEP_COLUMNS = ["Duration (s)", "Total Duration (s)", "Total Fuel Burned (kg)"] + [f"Total {c}" for c in EMISSION_COLUMNS]
+
+
+class WhatIfEvaluator:
+
+    def __init__(self, profile_df, engine_name="CFM56-5B4/2P", summary_df=None, registry=None):
+        # summary_df: an existing summarize_emissions() result for the same profile and engine (e.g. with noise
+        # filled in); it is copied, and the copy is what set_duration() updates
+        fuel_flow_rates, emission_indices = load_engine_arrays([engine_name], registry)
+        profile = as_flight_profile(profile_df)
+
+        self.phases = list(profile.phases)
+        self.fuel_flow = fuel_flow_rates[0]                                      # (P,) kg/s
+        self.emission_rates = fuel_flow_rates[0][:, None] * emission_indices[0]  # (P, 3) g/s
+        self.base_durations = profile.durations_s                               # (P,) s, as in the profile
+        self.durations = self.base_durations.copy()
+
+        if summary_df is None:
+            summary_df = summarize_emissions(profile, engine_name)
+        self.summary = summary_df.copy()
+
+        # Positional access to the cells an edit touches
+        self._total_row = int(np.flatnonzero(self.summary["Phase"] == "Total")[0])
+        self._duration_col = self.summary.columns.get_loc("Duration (s)")
+        self._fuel_col = self.summary.columns.get_loc("Fuel Burned (kg)")
+        self._emission_cols = [self.summary.columns.get_loc(c) for c in EMISSION_COLUMNS]
+
+    def phase_index(self, phase):
+        return self.phases.index(phase)
+
+    def set_duration(self, phase, duration_s):
+        # Updates the phase's row and the "Total" row in place and returns the summary
+        i = self.phase_index(phase)
+        delta = float(duration_s) - self.durations[i]
+        if delta == 0:
+            return self.summary
+        self.durations[i] = float(duration_s)
+
+        summary, total = self.summary, self._total_row
+        summary.iat[i, self._duration_col] = self.durations[i]
+        summary.iat[i, self._fuel_col] = self.fuel_flow[i] * self.durations[i]
+        summary.iat[total, self._duration_col] += delta
+        summary.iat[total, self._fuel_col] += self.fuel_flow[i] * delta
+        for k, col in enumerate(self._emission_cols):
+            summary.iat[i, col] = self.emission_rates[i, k] * self.durations[i]
+            summary.iat[total, col] += self.emission_rates[i, k] * delta
+
+        return summary
+
+    def reset(self):
+        for phase, duration_s in zip(self.phases, self.base_durations):
+            self.set_duration(phase, duration_s)
+        return self.summary
+
+    def sweep(self, phase, durations_s):
+        # Flight totals for every candidate duration of one phase (other phases as currently set), in one broadcast
+        i = self.phase_index(phase)
+        durations_s = np.asarray(durations_s, dtype=np.float64)
+        others = np.delete(np.arange(len(self.phases)), i)
+
+        fixed_duration = self.durations[others].sum()
+        fixed_fuel = self.fuel_flow[others] @ self.durations[others]
+        fixed_emissions = self.durations[others] @ self.emission_rates[others]      # (3,)
+
+        return pd.DataFrame(
+            np.column_stack([
+                durations_s,
+                fixed_duration + durations_s,
+                fixed_fuel + self.fuel_flow[i] * durations_s,
+                fixed_emissions + durations_s[:, None] * self.emission_rates[i],
+            ]),
+            columns=SWEEP_COLUMNS,
+        )